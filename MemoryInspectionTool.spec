@@ -0,0 +1,65 @@
+# -*- mode: python ; coding: utf-8 -*-
+# 打包：pyinstaller MemoryInspectionTool.spec
+#
+# - 目录模式（onedir）：单文件模式每次启动都要把整个运行时解压到临时目录，是启动慢的主要原因
+# - 排除未使用的库：pandas（只有SampleStore.to_frame用到，界面和报告不调用）、setuptools、
+#   Qt/IPython等可选依赖，以及matplotlib的WebAgg后端
+# - 不使用UPX：压缩后的DLL每次加载都要解压，且容易被杀毒软件误报
+import os
+
+EXCLUDES = [
+    "pandas",
+    "setuptools",
+    "pkg_resources",
+    "IPython",
+    "tornado",
+    "PyQt5",
+    "PyQt6",
+    "PySide2",
+    "PySide6",
+    "scipy",
+    "pytest",
+    "numpy.f2py",
+    "numpy.distutils",
+    "matplotlib.backends.backend_webagg",
+    "matplotlib.backends.backend_webagg_core",
+    "PIL.ImageQt",
+]
+
+datas = [("app_icon.ico", ".")] if os.path.exists("app_icon.ico") else []
+
+a = Analysis(
+    ["main.py"],
+    pathex=[],
+    binaries=[],
+    datas=datas,
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=EXCLUDES,
+    noarchive=False,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name="MemoryInspectionTool",
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    icon="app_icon.ico" if datas else None,
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    name="MemoryInspectionTool",
+)
@@ -0,0 +1,434 @@
+"""性能基准：启动耗时、进程选择列表、采样周期耗时、远程采集、实时图表重绘、悬停查找、报告生成，结果输出为JSON
+
+示例：
+    python benchmark.py --children 20 --sizes 10000 100000 1000000 -o bench.json
+    python benchmark.py -o new.json --baseline bench.json  # 与基线比较，超出容差时退出码为1
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+import numpy as np
+import psutil
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from collectors import available_modes, create_collector
+from live_chart import LiveChart, NS_PER_DAY
+from process_picker import ProcessCatalog
+from remote_agent import RemoteAgent
+from remote_collector import RemoteCollector
+from report import write_report
+from report_charts import CHART_MODES
+from sample_store import SampleStore
+from sampler import ProcessSampler
+from scheduler import TickScheduler, MIN_INTERVAL
+from stats import BYTES_PER_MB
+
+PATTERNS = ("flat", "leak", "sawtooth", "spike")
+DEFAULT_SIZES = (10000, 100000, 1000000)
+DEFAULT_TOLERANCE = 0.2  # 与基线相比中位数变慢超过20%视为退化
+STARTUP_MODULES = ("main", "monitor_cli")
+CHILD_NAME = "membench_child"  # 采样周期基准中子进程的进程名
+HEAVY_MODULES = ("matplotlib", "pandas", "openpyxl")  # 启动时不应导入的模块
+# 启动探针：在新解释器中导入入口模块，(有显示器时)创建主窗口并绘制，再创建实时图表，每步输出一行
+_STARTUP_PROBE = """
+import json, sys
+import {module}
+print(json.dumps(["import", [m for m in {heavy!r} if m in sys.modules]]), flush=True)
+if {window!r}:
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        sys.exit(0)
+    app = {module}.MemoryMonitorApp(root)
+    root.update_idletasks()
+    print(json.dumps(["window", []]), flush=True)
+    app._ensure_chart()
+    root.update()
+    print(json.dumps(["chart", []]), flush=True)
+    root.destroy()
+"""
+
+
+def _allocation_child(pattern, rate_mb, stop):
+    """合成子进程：按pattern分配内存（每秒rate_mb MB），直到stop被设置"""
+    chunks = [b"\x01" * BYTES_PER_MB * 8]  # 逐字节写入，确保计入RSS
+    step = 0
+    while not stop.wait(0.1):
+        step += 1
+        size = max(1, int(rate_mb * BYTES_PER_MB / 10))
+        if pattern == "leak":
+            chunks.append(b"\x01" * size)
+        elif pattern == "sawtooth":
+            chunks.append(b"\x01" * size)
+            if step % 50 == 0:
+                del chunks[1:]
+        elif pattern == "spike" and step % 20 == 0:
+            chunks.append(b"\x01" * size * 10)  # 短暂持有后释放
+            stop.wait(0.2)
+            chunks.pop()
+
+
+def child_executable(directory):
+    """在directory中创建指向当前解释器的链接，子进程以CHILD_NAME为进程名，不与本机其他python进程混淆
+
+    无法创建链接时（如Windows未开启符号链接权限）退回当前解释器，此时可能匹配到其他python进程
+    """
+    link = os.path.join(directory, CHILD_NAME + os.path.splitext(sys.executable)[1])
+    try:
+        os.symlink(sys.executable, link)
+    except (OSError, NotImplementedError) as e:
+        print(f"无法创建子进程解释器链接（{e}），按解释器名匹配可能包含其他python进程", file=sys.stderr)
+        return sys.executable
+    return link
+
+
+def spawn_children(count, pattern, rate_mb, executable=None):
+    ctx = mp.get_context("spawn")
+    stop = ctx.Event()
+    children = [ctx.Process(target=_allocation_child, args=(pattern, rate_mb, stop), daemon=True)
+                for _ in range(count)]
+    ctx.set_executable(executable or sys.executable)
+    try:
+        for child in children:
+            child.start()
+    finally:
+        ctx.set_executable(sys.executable)
+    return stop, children
+
+
+def stop_children(stop, children):
+    stop.set()
+    for child in children:
+        child.join(5)
+        if child.is_alive():
+            child.terminate()
+
+
+def summarize(samples_ms):
+    """耗时样本（毫秒）的汇总"""
+    ordered = sorted(samples_ms)
+    return {
+        "n": len(ordered),
+        "min": round(ordered[0], 4),
+        "median": round(statistics.median(ordered), 4),
+        "mean": round(statistics.fmean(ordered), 4),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def synthetic_store(n_series, n_samples, seed=0):
+    """n_series个序列、每个n_samples个样本（1秒间隔的随机游走，单位字节）"""
+    rng = np.random.default_rng(seed)
+    store = SampleStore()
+    start = time.time_ns() - n_samples * 10 ** 9
+    timestamps = start + np.arange(n_samples, dtype=np.int64) * 10 ** 9
+    for i in range(n_series):
+        walk = np.cumsum(rng.normal(0, 0.2, n_samples)) + 100 + 50 * i
+        store.extend(f"proc{i}.exe", timestamps, (np.abs(walk) * BYTES_PER_MB).astype(np.int64))
+    return store
+
+
+class _ManualRoot:
+    """代替Tk根窗口：只记录after请求，由基准代码直接调用绘制"""
+
+    def after(self, ms, func, *args):
+        return "after#bench"
+
+
+def bench_ticks(args, results):
+    with tempfile.TemporaryDirectory() as path:
+        stop, children = spawn_children(args.children, args.pattern, args.rate, child_executable(path))
+        try:
+            _sample_children(children, args, results)
+        finally:
+            stop_children(stop, children)
+
+
+def _sample_children(children, args, results):
+    """各采集方式下的采样周期耗时，监控名为子进程的进程名（其余为不存在的进程）"""
+    time.sleep(1.0)  # 等待子进程启动并完成初始分配
+    child_name = psutil.Process(children[0].pid).name()
+    names = [child_name] + [f"absent{i}.exe" for i in range(args.names - 1)]
+    for mode in available_modes():
+        scheduler = TickScheduler(args.interval)
+        sampler = ProcessSampler(names, create_collector(mode))
+        for _ in scheduler.ticks(args.interval * args.ticks + args.interval / 2):
+            sampler.sample()
+        sampler.close()
+        durations = scheduler.timings["duration"].values / 1e6
+        periods = scheduler.timings["period"].values / 1e6
+        results.append({
+            "name": "tick_duration", "unit": "ms",
+            "params": {"collector": mode, "children": args.children, "names": args.names,
+                       "pattern": args.pattern, "interval": args.interval},
+            "stats": summarize(durations.tolist()),
+            "period_std_ms": round(float(periods.std()), 4),
+            "missed": scheduler.missed,
+        })
+
+
+def _probe_startup(module):
+    """在新进程中启动一次，返回 {阶段: (距进程创建的毫秒数, 已导入的重模块)}"""
+    code = _STARTUP_PROBE.format(module=module, heavy=HEAVY_MODULES, window=module == "main")
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    stages = {}
+    for line in proc.stdout:
+        stage, heavy = json.loads(line)
+        stages[stage] = ((time.perf_counter() - start) * 1000, heavy)
+    proc.wait()
+    return stages
+
+
+def bench_startup(args, results):
+    """启动耗时（含解释器启动）：入口模块导入、主窗口显示、实时图表就绪"""
+    for module in STARTUP_MODULES:
+        runs = [_probe_startup(module) for _ in range(args.startup_repeat)]
+        for stage in ("import", "window", "chart"):
+            samples = [run[stage][0] for run in runs if stage in run]
+            if not samples:
+                continue  # 无显示器时跳过窗口相关阶段
+            result = {"name": f"startup_{stage}", "unit": "ms", "params": {"module": module},
+                      "stats": summarize(samples)}
+            if stage == "import":
+                result["heavy_modules"] = runs[0][stage][1]
+            results.append(result)
+
+
+def bench_picker(args, results):
+    """进程选择列表：大量进程时的快照增量更新（1%进程变化）和逐字输入过滤"""
+    rng = np.random.default_rng(2)
+    pool = [f"proc{i}_{kind}.exe" for i, kind in enumerate(rng.choice(["svc", "app", "helper"], args.picker_names * 2))]
+    catalog = ProcessCatalog()
+    current = set(rng.choice(pool, args.picker_names, replace=False).tolist())
+    catalog.update(current)
+    params = {"processes": args.picker_names}
+    churn = max(1, args.picker_names // 100)
+    snapshots = []  # 预先生成各次快照，计时只包含catalog.update
+    for _ in range(args.repeat * 4):
+        gone = set(rng.choice(sorted(current), churn, replace=False).tolist())
+        current = (current - gone) | set(rng.choice(pool, churn, replace=False).tolist())
+        snapshots.append(current)
+    snapshots = iter(snapshots)
+
+    results.append({"name": "picker_update", "unit": "ms", "params": params,
+                    "stats": measure(lambda: catalog.update(next(snapshots)), args.repeat * 4)})
+    queries = iter(["h", "he", "hel", "help", "helpe", "helper", ""] * args.repeat)
+    results.append({"name": "picker_filter", "unit": "ms", "params": params,
+                    "stats": measure(lambda: catalog.filter(next(queries)), 7 * args.repeat)})
+
+
+def bench_remote(args, results):
+    """远程采集：代理每批的封装耗时和每行字节数，以及多个代理经本机回环发送到采集端的吞吐量"""
+    store = synthetic_store(args.series, args.remote_rows)
+    timestamps = store[next(iter(store))].timestamps
+    rows = np.column_stack([store[name].values for name in store])
+    batch = 20  # 1秒间隔、默认批时长下每批的行数量级
+    collector = RemoteCollector("127.0.0.1", 0)
+    collector.start()
+    agents = [RemoteAgent(collector.address, list(store), 1.0, host_name=f"bench{i}", batch_interval=float("inf"),
+                          max_pending_rows=args.remote_rows + 1) for i in range(args.remote_agents)]
+    seal_ms = []
+    received = SampleStore()
+    start = time.perf_counter()
+    for agent in agents:
+        agent.start_sender()
+    for i in range(len(rows)):
+        for agent in agents:
+            agent.add_row(int(timestamps[i]), rows[i].tolist())
+        if (i + 1) % batch == 0:
+            for agent in agents:
+                seal_start = time.perf_counter()
+                agent.seal()
+                seal_ms.append((time.perf_counter() - seal_start) * 1000)
+        collector.drain(received)
+    for agent in agents:
+        agent.seal()
+    while any(agent.pending for agent in agents):
+        collector.drain(received)
+        time.sleep(0.001)
+    collector.drain(received)
+    elapsed = time.perf_counter() - start
+    for agent in agents:
+        agent.close(1)
+    collector.close()
+    sent = sum(agent.bytes_sent for agent in agents)
+    params = {"agents": args.remote_agents, "rows": args.remote_rows, "series": args.series, "batch_rows": batch}
+    results.append({"name": "remote_seal", "unit": "ms", "params": params, "stats": summarize(seal_ms),
+                    "bytes_per_row": round(sent / (len(rows) * len(agents)), 2),
+                    "rows_per_s": round(sum(len(series) for series in received.values()) / args.series / elapsed)})
+
+
+def bench_chart(store, size, args, results):
+    fig = Figure(figsize=(10, 5))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    chart = LiveChart(_ManualRoot(), fig, ax, canvas)
+    params = {"samples": size, "series": args.series}
+
+    def full_redraw():
+        chart.set_store(store)
+        chart._render()
+
+    results.append({"name": "chart_full_redraw", "unit": "ms", "params": params,
+                    "stats": measure(full_redraw, args.repeat)})
+
+    # 追加一个采样周期后的增量刷新（统计表 + blit）
+    last_ts = store[next(iter(store.keys()))].last()[0]
+    state = {"ts": last_ts}
+
+    def incremental():
+        state["ts"] += 10 ** 9
+        store.append_ns(state["ts"], {name: 100 * BYTES_PER_MB for name in store.keys()})
+        for name in store.keys():
+            store.stats[name].summary(scale=BYTES_PER_MB)
+        chart._render()
+
+    results.append({"name": "chart_update", "unit": "ms", "params": params,
+                    "stats": measure(incremental, args.repeat * 5)})
+
+    # 悬停查找：在数据范围内随机取鼠标位置
+    rng = np.random.default_rng(1)
+    timestamps, values = store[next(iter(store.keys()))].snapshot()
+    picks = rng.integers(0, len(timestamps), args.repeat * 20)
+    positions = iter([(timestamps[i] / NS_PER_DAY, values[i] / BYTES_PER_MB) for i in picks])
+
+    def hover():
+        chart.nearest_point(*next(positions))
+
+    results.append({"name": "hover_lookup", "unit": "ms", "params": params,
+                    "stats": measure(hover, len(picks))})
+
+
+def bench_report(store, size, args, results):
+    names = list(store.keys())
+    with tempfile.TemporaryDirectory() as path:
+        for mode in CHART_MODES:
+            results.append({
+                "name": "report", "unit": "ms",
+                "params": {"samples": size, "series": args.series, "chart_mode": mode},
+                "stats": measure(lambda: write_report(path, store, merge_names=names[:2], chart_mode=mode),
+                                 args.report_repeat),
+            })
+
+
+def result_key(result):
+    return result["name"] + json.dumps(result["params"], sort_keys=True, ensure_ascii=False)
+
+
+def compare(results, baseline, tolerance):
+    """与基线比较中位数，返回退化列表 [(名称, 参数, 基线ms, 当前ms), ...]"""
+    previous = {result_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        old_median, new_median = old["stats"]["median"], result["stats"]["median"]
+        if old_median > 0 and new_median > old_median * (1 + tolerance):
+            regressions.append((result["name"], result["params"], old_median, new_median))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="内存监控工具性能基准")
+    parser.add_argument("--children", type=int, default=10, help="合成子进程数")
+    parser.add_argument("--pattern", choices=PATTERNS, default="leak", help="子进程内存分配模式")
+    parser.add_argument("--rate", type=float, default=1.0, help="子进程分配速率（MB/秒）")
+    parser.add_argument("--names", type=int, default=10, help="监控的进程名数量（其余为不存在的进程名）")
+    parser.add_argument("--ticks", type=int, default=50, help="采样周期数")
+    parser.add_argument("--interval", type=float, default=0.1, help="采样间隔（秒）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="每个序列的样本数")
+    parser.add_argument("--series", type=int, default=4, help="图表/报告基准的序列数")
+    parser.add_argument("--repeat", type=int, default=5, help="图表基准重复次数")
+    parser.add_argument("--report-repeat", type=int, default=1, help="报告基准重复次数")
+    parser.add_argument("--startup-repeat", type=int, default=5, help="启动基准重复次数")
+    parser.add_argument("--picker-names", type=int, default=20000, help="进程选择列表基准的进程名数量")
+    parser.add_argument("--remote-agents", type=int, default=4, help="远程采集基准的代理数")
+    parser.add_argument("--remote-rows", type=int, default=20000, help="远程采集基准中每个代理发送的行数")
+    parser.add_argument("--skip", nargs="+", default=[],
+                        choices=("startup", "picker", "ticks", "remote", "chart", "report"),
+                        help="跳过的基准")
+    parser.add_argument("-o", "--output", help="JSON结果文件，默认输出到标准输出")
+    parser.add_argument("--baseline", help="基线JSON文件，用于比较")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的变慢比例")
+    args = parser.parse_args(argv)
+    if args.interval < MIN_INTERVAL:
+        parser.error(f"采样间隔不能小于 {MIN_INTERVAL} 秒")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    if "startup" not in args.skip:
+        bench_startup(args, results)
+    if "picker" not in args.skip:
+        bench_picker(args, results)
+    if "ticks" not in args.skip:
+        bench_ticks(args, results)
+    if "remote" not in args.skip:
+        bench_remote(args, results)
+    # 图表和报告都跳过时不必生成合成数据
+    sizes = args.sizes if {"chart", "report"} - set(args.skip) else []
+    for size in sizes:
+        store = synthetic_store(args.series, size)
+        if "chart" not in args.skip:
+            bench_chart(store, size, args, results)
+        if "report" not in args.skip:
+            bench_report(store, size, args, results)
+        print(f"完成 {size} 样本", file=sys.stderr)
+
+    output = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    text = json.dumps(output, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, params, old, new in regressions:
+            print(f"退化：{name} {params} {old:.3f} ms -> {new:.3f} ms", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    mp.freeze_support()
+    sys.exit(main())
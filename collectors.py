@@ -0,0 +1,167 @@
+import abc
+import os
+import sys
+import time
+
+import psutil
+
+# 采集方式：界面显示名 -> (后端, 指标)
+COLLECTOR_MODES = {
+    "psutil RSS": ("psutil", "rss"),
+    "/proc RSS": ("proc", "rss"),
+    "/proc PSS": ("proc", "pss"),
+    "/proc USS": ("proc", "uss"),
+    "/proc Swap": ("proc", "swap"),
+}
+DEFAULT_MODE = "psutil RSS"
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class BaseCollector(abc.ABC):
+    """采集后端基类：批量读取一组PID的内存，并记录每个采样周期的耗时；子类实现_read"""
+
+    backend = ""
+
+    def __init__(self, metric="rss"):
+        self.metric = metric
+        self.last_cost = 0.0  # 最近一次采集耗时（秒）
+        self.total_cost = 0.0
+        self.ticks = 0
+
+    def read(self, procs):
+        """读取 {pid: psutil.Process} 中各进程的内存，返回 {pid: 字节数}"""
+        start = time.perf_counter()
+        result = self._read(procs)
+        self.last_cost = time.perf_counter() - start
+        self.total_cost += self.last_cost
+        self.ticks += 1
+        return result
+
+    @abc.abstractmethod
+    def _read(self, procs):
+        """{pid: psutil.Process} -> {pid: 字节数}，无法读取的进程不出现在结果中"""
+
+    @property
+    def avg_cost(self):
+        return self.total_cost / self.ticks if self.ticks else 0.0
+
+    def close(self):
+        pass
+
+
+class PsutilCollector(BaseCollector):
+    """psutil后端（默认/兜底）：memory_info().rss"""
+
+    backend = "psutil"
+
+    def _read(self, procs):
+        result = {}
+        for pid, proc in procs.items():
+            try:
+                result[pid] = proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+        return result
+
+
+class ProcCollector(BaseCollector):
+    """Linux /proc 后端：rss读取statm，pss/uss/swap读取smaps_rollup
+
+    每个PID只做 open/readv/close 三次系统调用，读缓冲区在各PID间复用。
+    """
+
+    backend = "proc"
+
+    def __init__(self, metric="rss"):
+        super().__init__(metric)
+        self._buf = bytearray(4096)
+        if metric == "rss":
+            self._filename = "statm"
+            self._parse = self._parse_statm
+        else:
+            self._filename = "smaps_rollup"
+            self._parse = self._parse_smaps_rollup
+
+    @staticmethod
+    def is_supported():
+        return sys.platform.startswith("linux") and os.path.exists("/proc/self/smaps_rollup")
+
+    def _read_file(self, path):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            size = os.readv(fd, [self._buf])
+            if size < len(self._buf):
+                return self._buf[:size]
+            # smaps_rollup 一般不足1KB，缓冲区不够时读完剩余内容并扩容供后续复用
+            chunks = [bytes(self._buf)]
+            chunk = os.read(fd, 65536)
+            while chunk:
+                chunks.append(chunk)
+                chunk = os.read(fd, 65536)
+        finally:
+            os.close(fd)
+        data = b"".join(chunks)
+        self._buf = bytearray(len(data) * 2)
+        return data
+
+    def _read(self, procs):
+        result = {}
+        for pid in procs:
+            try:
+                data = self._read_file(f"/proc/{pid}/{self._filename}")
+            except (FileNotFoundError, ProcessLookupError, PermissionError):
+                continue
+            value = self._parse(data)
+            if value is not None:
+                result[pid] = value
+        return result
+
+    @staticmethod
+    def _parse_statm(data):
+        fields = data.split()
+        if len(fields) < 2:
+            return None
+        return int(fields[1]) * PAGE_SIZE
+
+    def _parse_smaps_rollup(self, data):
+        values = {}
+        for line in data.split(b"\n")[1:]:
+            key, _, rest = line.partition(b":")
+            if rest:
+                values[bytes(key)] = int(rest.split()[0]) * 1024  # kB
+        if self.metric == "pss":
+            return values.get(b"Pss")
+        if self.metric == "uss":
+            return (values.get(b"Private_Clean", 0) + values.get(b"Private_Dirty", 0)
+                    + values.get(b"Private_Hugetlb", 0))
+        if self.metric == "swap":
+            return values.get(b"Swap")
+        return values.get(b"Rss")
+
+
+def available_modes():
+    """当前平台可用的采集方式"""
+    if ProcCollector.is_supported():
+        return list(COLLECTOR_MODES)
+    return [mode for mode, (backend, _) in COLLECTOR_MODES.items() if backend == "psutil"]
+
+
+def create_collector(mode=DEFAULT_MODE):
+    """按界面显示名创建采集后端，不支持的平台回退到psutil"""
+    backend, metric = COLLECTOR_MODES.get(mode, COLLECTOR_MODES[DEFAULT_MODE])
+    if backend == "proc" and ProcCollector.is_supported():
+        return ProcCollector(metric)
+    return PsutilCollector("rss")
+
+
+def measure_costs(procs, repeat=3):
+    """评估各采集方式的单周期耗时，返回 {采集方式: 平均秒数}"""
+    costs = {}
+    for mode in available_modes():
+        collector = create_collector(mode)
+        for _ in range(repeat):
+            collector.read(procs)
+        costs[mode] = collector.avg_cost
+        collector.close()
+    return costs
@@ -0,0 +1,74 @@
+"""运行对比：从运行索引中载入基线和一个或多个对比运行，生成统计差异和叠加曲线的Excel报告
+
+示例：
+    python compare_runs.py --list -d ./reports/监控记录
+    python compare_runs.py v1.2 v1.3 -d ./reports/监控记录 -o ./reports  # 运行ID（或唯一前缀）或标签
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+from report import write_comparison_report
+from run_index import RunIndex, COMPARE_POINTS, RUNS_DIR
+
+EXIT_OK = 0
+EXIT_USAGE = 2
+EXIT_IO_ERROR = 3
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="对比多次监控运行的内存表现")
+    parser.add_argument("runs", nargs="*", metavar="RUN", help="基线运行和对比运行（运行ID、唯一前缀或标签）")
+    parser.add_argument("-d", "--index", default=os.path.join(os.getcwd(), RUNS_DIR), help="运行索引目录")
+    parser.add_argument("-o", "--output", default=os.getcwd(), help="对比报告的保存目录，默认当前目录")
+    parser.add_argument("--names", nargs="+", metavar="NAME", help="只对比这些进程，默认为基线的全部进程")
+    parser.add_argument("--points", type=int, default=COMPARE_POINTS, help="对齐后每条曲线的点数上限")
+    parser.add_argument("--list", action="store_true", help="列出索引中的运行")
+    args = parser.parse_args(argv)
+    if not args.list and len(args.runs) < 2:
+        parser.error("至少指定基线和一个对比运行")
+    if not os.path.isdir(args.index):
+        parser.error(f"运行索引目录不存在：{args.index}")
+    if args.points < 2:
+        parser.error("点数上限不能小于2")
+    return args
+
+
+def _format_time(timestamp_ns):
+    return str(np.datetime64(timestamp_ns, "ns").astype("datetime64[s]")).replace("T", " ") if timestamp_ns else ""
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    index = RunIndex(args.index)
+    try:
+        if args.list:
+            for run_id, label, started, finished, n_series in index.runs():
+                duration = (finished - started) / 1e9 if started else 0
+                print(f"{run_id}\t{label or ''}\t{_format_time(started)}\t{duration:.0f} s\t{n_series} 个序列")
+            return EXIT_OK
+        try:
+            runs = [index.load(key) for key in args.runs]
+        except KeyError as e:
+            print(e.args[0], file=sys.stderr)
+            return EXIT_USAGE
+        try:
+            print(f"对比报告已生成：{write_comparison_report(args.output, runs, args.names, args.points)}")
+        except (OSError, sqlite3.Error) as e:
+            print(f"保存对比报告失败：{e}", file=sys.stderr)
+            return EXIT_IO_ERROR
+        for run in runs[1:]:
+            for name in runs[0].stats:
+                if name in run.stats and (not args.names or name in args.names):
+                    old, new = runs[0].stats[name]["max_mb"], run.stats[name]["max_mb"]
+                    print(f"{name}：{run.title} 最大值 {new} MB（基线 {old} MB，差值 {new - old:+.2f}）")
+        return EXIT_OK
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import numpy as np
+
+METHODS = ("minmax", "lttb")
+MARKER_LIMIT = 200  # 折线点数不超过该值时才绘制数据点标记（实时图表和报告图表共用）
+
+
+def minmax_downsample(x, y, n_buckets):
+    """最小/最大值分桶：每桶保留最小值和最大值两个点（按时间顺序），峰谷不会丢失"""
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return x, y
+    size = -(-n // n_buckets)  # 每桶点数（向上取整）
+    n_buckets = -(-n // size)
+    padded = np.empty(n_buckets * size, dtype=y.dtype)
+    padded[:n] = y
+    padded[n:] = y[-1]
+    buckets = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    idx_min = np.minimum(buckets.argmin(axis=1) + offsets, n - 1)
+    idx_max = np.minimum(buckets.argmax(axis=1) + offsets, n - 1)
+    idx = np.sort(np.concatenate([idx_min, idx_max]))
+    idx = np.concatenate([[0], idx, [n - 1]])
+    idx = idx[np.concatenate([[True], np.diff(idx) != 0])]
+    return x[idx], y[idx]
+
+
+def lttb_downsample(x, y, n_out):
+    """Largest-Triangle-Three-Buckets降采样，并强制保留全局最大/最小值点"""
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return x, y
+    xf = np.asarray(x, dtype=np.float64)
+    yf = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = xf[next_start:next_end].mean()
+        avg_y = yf[next_start:next_end].mean()
+        # 与前一选中点、后一桶均值构成的三角形面积最大的点
+        area = np.abs((xf[a] - avg_x) * (yf[start:end] - yf[a])
+                      - (xf[a] - xf[start:end]) * (avg_y - yf[a]))
+        a = start + int(area.argmax())
+        idx[i + 1] = a
+    idx = np.unique(np.concatenate([idx, [yf.argmax(), yf.argmin()]]))
+    return x[idx], y[idx]
+
+
+def downsample(x, y, n_points, method="minmax"):
+    """将序列降采样到约n_points个点（通常取绘图区域像素宽度）"""
+    n_points = max(int(n_points), 3)
+    if method == "lttb":
+        return lttb_downsample(x, y, n_points)
+    return minmax_downsample(x, y, n_points // 2)
@@ -0,0 +1,205 @@
+from stats import BYTES_PER_MB, P2Quantile
+
+NS_PER_HOUR = 3600 * 10 ** 9
+LEAK_SLOPE_MB_H = 10.0  # 稳健斜率不低于该值（MB/小时）判定为疑似泄漏
+MIN_GROWTH_MB = 5.0  # 且按斜率推算的总增长不低于该值，避免短时监控的噪声误报
+MIN_SAMPLES = 30  # 样本数或监控时长不足时不做判定
+MIN_SPAN_SECONDS = 300
+# 判定需连续保持疑似泄漏这么久才告警，较短的锯齿上升段不会误报；持续时间从首次判定为疑似泄漏算起，
+# 判定本身又需要MIN_SPAN_SECONDS的数据，因此最早在监控开始后约 MIN_SPAN_SECONDS+LEAK_PERSIST_SECONDS（10分钟）告警
+LEAK_PERSIST_SECONDS = MIN_SPAN_SECONDS
+STEP_MIN_MB = 10.0  # 识别为阶跃的最小增长幅度
+HUBER_K = 1.345  # Huber权重阈值（以稳健尺度为单位）
+MAD_TO_SIGMA = 1.4826
+BASELINE_ALPHA = 0.01  # 阶跃检测基线（EWMA）的更新系数
+
+VERDICT_PENDING = "数据不足"
+VERDICT_OK = "正常"
+VERDICT_STEP = "阶跃增长"
+VERDICT_LEAK = "疑似泄漏"
+
+
+class RobustTrend:
+    """在线Huber加权线性回归，估计内存增长斜率（MB/小时），每个样本O(1)
+
+    残差超过 HUBER_K*稳健尺度 的样本按比例降权，偶发尖峰（如GC前的峰值）不会拉高斜率。
+    稳健尺度为残差绝对值中位数（P²估计）*1.4826。
+    回归覆盖从首个样本起的全部数据（不开窗、无遗忘），斜率反映整个监控期间的趋势：
+    早期的增长停止后，斜率随监控时长增加逐渐回落，不会立即降到阈值以下。
+    """
+
+    def __init__(self, huber_k=HUBER_K):
+        self.huber_k = huber_k
+        self.count = 0
+        self.t0 = None
+        self.last_t = 0.0  # 最新样本距首个样本的小时数
+        self._sw = self._st = self._sy = self._stt = self._sty = 0.0
+        self._abs_residual = P2Quantile(0.5)
+
+    def add(self, timestamp_ns, value_mb):
+        if self.t0 is None:
+            self.t0 = timestamp_ns
+        t = (timestamp_ns - self.t0) / NS_PER_HOUR
+        weight = 1.0
+        if self.count >= 5:
+            residual = value_mb - self.predict(t)
+            scale = max(self._abs_residual.value() * MAD_TO_SIGMA, 1e-3)
+            self._abs_residual.add(abs(residual))
+            if abs(residual) > self.huber_k * scale:
+                weight = self.huber_k * scale / abs(residual)
+        self.count += 1
+        self.last_t = t
+        self._sw += weight
+        self._st += weight * t
+        self._sy += weight * value_mb
+        self._stt += weight * t * t
+        self._sty += weight * t * value_mb
+
+    @property
+    def slope(self):
+        """MB/小时"""
+        denominator = self._sw * self._stt - self._st * self._st
+        if self.count < 2 or denominator <= 0:
+            return 0.0
+        return (self._sw * self._sty - self._st * self._sy) / denominator
+
+    def predict(self, t):
+        if not self._sw:
+            return 0.0
+        slope = self.slope
+        return (self._sy - slope * self._st) / self._sw + slope * t
+
+    @property
+    def span_hours(self):
+        return self.last_t
+
+
+class StepDetector:
+    """单边CUSUM检测内存阶跃增长，每个样本O(1)
+
+    基线为稳定期样本的EWMA（可跟随缓慢漂移）；单个样本对累积量的贡献有上限，
+    需连续多个样本高于基线才会报警，偶发尖峰不计为阶跃。幅度小于min_step的
+    抬升（如快速的锯齿形增长）只并入基线，不计为阶跃。
+    """
+
+    def __init__(self, min_step_mb=STEP_MIN_MB, alpha=BASELINE_ALPHA):
+        self.min_step = min_step_mb
+        self.alpha = alpha
+        self.baseline = None
+        self._previous = None
+        self._noise = P2Quantile(0.5)  # 相邻样本差值绝对值的中位数
+        self._cusum = 0.0
+        self._run_start = None
+        self._run_sum = 0.0
+        self._run_count = 0
+        self.change_points = []  # [(开始时间ns, 阶跃幅度MB), ...]
+        self.offset = 0.0  # 已识别阶跃的累计幅度，趋势估计时扣除
+
+    def add(self, timestamp_ns, value_mb):
+        """检测到阶跃时返回 (开始时间ns, 幅度MB)，否则返回None"""
+        if self.baseline is None:
+            self.baseline = self._previous = value_mb
+            return None
+        self._noise.add(abs(value_mb - self._previous))
+        self._previous = value_mb
+        delta = max(self.min_step, 4 * self._noise.value() * MAD_TO_SIGMA)
+        threshold = 2 * delta
+        deviation = value_mb - self.baseline
+        self._cusum = max(0.0, self._cusum + min(deviation - delta / 2, threshold / 4))
+        if self._cusum == 0:
+            self.baseline += self.alpha * (value_mb - self.baseline)
+            self._run_count = 0
+            self._run_sum = 0.0
+            return None
+        if not self._run_count:
+            self._run_start = timestamp_ns
+        self._run_sum += deviation
+        self._run_count += 1
+        if self._cusum <= threshold:
+            return None
+        step = self._run_sum / self._run_count
+        run_start = self._run_start
+        self.baseline += step
+        self._cusum = 0.0
+        self._run_count = 0
+        self._run_sum = 0.0
+        if step < self.min_step:
+            return None
+        self.offset += step
+        self.change_points.append((run_start, step))
+        return run_start, step
+
+
+class LeakMonitor:
+    """在线泄漏分析：每个序列一个RobustTrend和StepDetector
+
+    趋势斜率扣除已识别的阶跃，阶跃和持续增长分别判定。
+    接口与SessionWriter一致（append/extend），可作为SampleStore的sink随采样同步更新。
+    出现阶跃、疑似泄漏的判定持续LEAK_PERSIST_SECONDS、或已告警的泄漏判定回落时调用on_alert(序列名, 提示信息)。
+    """
+
+    def __init__(self, slope_threshold=LEAK_SLOPE_MB_H, min_growth=MIN_GROWTH_MB,
+                 min_step=STEP_MIN_MB, on_alert=None):
+        self.slope_threshold = slope_threshold
+        self.min_growth = min_growth
+        self.min_step = min_step
+        self.on_alert = on_alert
+        self.trends = {}
+        self.steps = {}
+        self._leak_alerted = set()
+        self._leak_since = {}  # {序列名: 判定连续为疑似泄漏的起始时间ns}
+        self.alerts = []  # [(序列名, 提示信息), ...]
+
+    def append(self, name, timestamp_ns, value):
+        trend = self.trends.get(name)
+        if trend is None:
+            trend = self.trends[name] = RobustTrend()
+            self.steps[name] = StepDetector(self.min_step)
+        value_mb = value / BYTES_PER_MB
+        steps = self.steps[name]
+        change_point = steps.add(timestamp_ns, value_mb)
+        trend.add(timestamp_ns, value_mb - steps.offset)
+        if change_point is not None:
+            self._alert(name, f"{name} 内存阶跃增长 {change_point[1]:.1f} MB")
+        verdict = self.verdict(name)
+        if verdict == VERDICT_LEAK:
+            since = self._leak_since.setdefault(name, timestamp_ns)
+            if name not in self._leak_alerted and timestamp_ns - since >= LEAK_PERSIST_SECONDS * 10 ** 9:
+                self._leak_alerted.add(name)
+                self._alert(name, f"{name} 疑似内存泄漏，增长趋势 {trend.slope:.1f} MB/h")
+        else:
+            self._leak_since.pop(name, None)
+            if name in self._leak_alerted:
+                self._leak_alerted.discard(name)
+                self._alert(name, f"{name} 增长趋势已回落至 {trend.slope:.1f} MB/h，撤销疑似泄漏告警")
+
+    def extend(self, name, timestamps_ns, values):
+        for timestamp_ns, value in zip(timestamps_ns.tolist(), values.tolist()):
+            self.append(name, timestamp_ns, value)
+
+    def _alert(self, name, message):
+        self.alerts.append((name, message))
+        if self.on_alert:
+            self.on_alert(name, message)
+
+    def verdict(self, name):
+        trend = self.trends.get(name)
+        if trend is None or trend.count < MIN_SAMPLES or trend.span_hours * 3600 < MIN_SPAN_SECONDS:
+            return VERDICT_PENDING
+        slope = trend.slope
+        if slope >= self.slope_threshold and slope * trend.span_hours >= self.min_growth:
+            return VERDICT_LEAK
+        if self.steps[name].change_points:
+            return VERDICT_STEP
+        return VERDICT_OK
+
+    def summary(self, name, ndigits=2):
+        """返回 [斜率 (MB/h), 阶跃次数, 判定]"""
+        trend = self.trends.get(name)
+        if trend is None:
+            return [0, 0, VERDICT_PENDING]
+        return [round(trend.slope, ndigits), len(self.steps[name].change_points), self.verdict(name)]
+
+    def leaking(self):
+        """判定为疑似泄漏的序列名"""
+        return [name for name in self.trends if self.verdict(name) == VERDICT_LEAK]
@@ -0,0 +1,220 @@
+import time
+
+import numpy as np
+
+from downsample import downsample, MARKER_LIMIT
+from stats import BYTES_PER_MB
+
+NS_PER_DAY = 86400 * 10 ** 9
+
+
+def ns_to_datenum(timestamps):
+    """int64纳秒时间戳 -> matplotlib日期数值（默认epoch为1970-01-01）"""
+    return timestamps / NS_PER_DAY
+
+
+class LiveChart:
+    """增量刷新的实时图表
+
+    - 每个序列持久保留一个Line2D，新数据通过set_data更新，不再ax.clear()重绘
+    - 数据超出当前坐标范围时才重新设定坐标轴（预留余量）并整图重绘
+    - 其余情况使用blit：恢复背景后只重绘折线
+    - 重绘按max_fps合并，与采样频率无关
+    - 按绘图区像素宽度对可见范围降采样；滚轮缩放时从全分辨率数据重新降采样，双击恢复自动跟随
+    """
+
+    def __init__(self, root, fig, ax, canvas, max_fps=4, method="minmax"):
+        self.root = root
+        self.fig = fig
+        self.ax = ax
+        self.canvas = canvas
+        self.min_frame_interval = 1.0 / max_fps
+        self.method = method
+        self.follow = True  # 自动跟随最新数据；滚轮缩放后关闭
+        self.store = None
+        self.lines = {}  # {序列名: Line2D}
+        self.overlays = []  # 悬停标注等随blit一起绘制的动态元素
+        self._background = None
+        self._pending = None  # 已排队的root.after任务
+        self._last_render = 0.0
+        self._needs_full_draw = True
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.mpl_connect("scroll_event", self._on_scroll)
+        self.canvas.mpl_connect("button_press_event", self._on_button_press)
+        self._setup_axes()
+
+    def _setup_axes(self):
+        import matplotlib.dates as mdates  # 本模块不在导入时加载matplotlib（报告、命令行只用ns_to_datenum）
+
+        self.ax.set_title('实时内存使用监控')
+        self.ax.set_xlabel('时间')
+        self.ax.set_ylabel('内存使用 (MB)')
+        self.ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=10))
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+
+    def set_store(self, store):
+        """切换数据源（开始新一轮监控时调用），清除旧折线"""
+        for line in self.lines.values():
+            line.remove()
+        self.lines = {}
+        legend = self.ax.get_legend()
+        if legend is not None:
+            legend.remove()
+        self.store = store
+        self.follow = True
+        self._needs_full_draw = True
+        self.request_update()
+
+    def request_update(self):
+        """请求刷新；多次请求在一帧间隔内合并为一次绘制"""
+        if self._pending is not None:
+            return
+        delay = self.min_frame_interval - (time.monotonic() - self._last_render)
+        self._pending = self.root.after(max(0, int(delay * 1000)), self._render)
+
+    def add_overlay(self, artist):
+        """注册动态元素（如悬停标注），其变化只需blit刷新"""
+        artist.set_animated(self.canvas.supports_blit)
+        self.overlays.append(artist)
+
+    def refresh_overlays(self):
+        self._blit()
+
+    def nearest_point(self, x, y, max_seconds=5, max_mb=10):
+        """查找鼠标附近的数据点，返回 (序列名, 时间戳ns, 内存MB)，没有时返回None
+
+        各序列的时间戳本身有序，先二分定位 鼠标±max_seconds 的时间窗，
+        再用NumPy向量化计算距离，每个序列每次事件O(log n + 窗口点数)。
+        直接在全分辨率数据上查找，不受图表降采样影响。
+        """
+        if self.store is None:
+            return None
+        mouse_ns = x * NS_PER_DAY
+        window_ns = max_seconds * 10 ** 9
+        best, best_dist = None, np.inf
+        for name in self.lines:
+            timestamps, values = self.store[name].snapshot()
+            start = int(np.searchsorted(timestamps, mouse_ns - window_ns))
+            end = int(np.searchsorted(timestamps, mouse_ns + window_ns, side='right'))
+            if start >= end:
+                continue
+            time_diff = np.abs(timestamps[start:end] - mouse_ns) / 10 ** 9
+            memory_diff = np.abs(values[start:end] / BYTES_PER_MB - y)
+            dist = np.where((time_diff < max_seconds) & (memory_diff < max_mb),
+                            time_diff * 0.1 + memory_diff * 0.01, np.inf)
+            i = int(dist.argmin())
+            if dist[i] < best_dist:
+                best_dist = dist[i]
+                best = (name, int(timestamps[start + i]), float(values[start + i]) / BYTES_PER_MB)
+        return best
+
+    def series_data(self, series):
+        """返回某序列可见范围内、降采样到约像素宽度的 (x日期数值, y MB)"""
+        timestamps, values = series.snapshot()
+        if not self.follow:
+            lo, hi = self.ax.get_xlim()
+            start = max(int(np.searchsorted(timestamps, lo * NS_PER_DAY)) - 1, 0)
+            end = int(np.searchsorted(timestamps, hi * NS_PER_DAY, side='right')) + 1
+            timestamps, values = timestamps[start:end], values[start:end]
+        timestamps, values = downsample(timestamps, values, self.ax.bbox.width, self.method)
+        return ns_to_datenum(timestamps), values / BYTES_PER_MB
+
+    def _render(self):
+        self._pending = None
+        self._last_render = time.monotonic()
+        if self.store is None:
+            return
+
+        limits = None
+        # 采样线程可能同时新增序列（远程代理、按PID细分的新实例），遍历快照
+        for name, series in list(self.store.items()):
+            if not series:
+                continue
+            x, y = self.series_data(series)
+            line = self.lines.get(name)
+            if line is None:
+                line, = self.ax.plot(x, y, marker='o', markersize=3, linestyle='-', label=name,
+                                     animated=self.canvas.supports_blit)
+                self.lines[name] = line
+                self._needs_full_draw = True
+            else:
+                line.set_data(x, y)
+            line.set_marker('o' if len(x) <= MARKER_LIMIT else '')
+            if not len(x):
+                continue
+            bounds = (x[0], x[-1], y.min(), y.max())
+            if limits is None:
+                limits = list(bounds)
+            else:
+                limits = [min(limits[0], bounds[0]), max(limits[1], bounds[1]),
+                          min(limits[2], bounds[2]), max(limits[3], bounds[3])]
+
+        if limits is None and self.follow:
+            return
+        if (limits is not None and self._update_limits(*limits)) or self._needs_full_draw:
+            self._full_draw()
+        else:
+            self._blit()
+
+    def _update_limits(self, xmin, xmax, ymin, ymax):
+        """数据超出当前坐标范围时扩展坐标轴（预留余量），返回是否改变"""
+        if not self.follow:
+            return False
+        cur_xmin, cur_xmax = self.ax.get_xlim()
+        cur_ymin, cur_ymax = self.ax.get_ylim()
+        if (not self._needs_full_draw and cur_xmin <= xmin and xmax <= cur_xmax
+                and cur_ymin <= ymin and ymax <= cur_ymax):
+            return False
+        x_span = max(xmax - xmin, 1.0 / 86400)  # 至少1秒
+        y_span = max(ymax - ymin, 1.0)
+        self.ax.set_xlim(xmin - x_span * 0.02, xmax + x_span * 0.2)
+        self.ax.set_ylim(max(0.0, ymin - y_span * 0.1), ymax + y_span * 0.1)
+        return True
+
+    def _on_scroll(self, event):
+        """滚轮缩放时间轴（以鼠标位置为中心），缩放后按新范围重新降采样"""
+        if event.inaxes != self.ax or event.xdata is None:
+            return
+        factor = 0.8 if event.button == 'up' else 1.25
+        lo, hi = self.ax.get_xlim()
+        self.ax.set_xlim(event.xdata - (event.xdata - lo) * factor, event.xdata + (hi - event.xdata) * factor)
+        self.follow = False
+        self._needs_full_draw = True
+        self.request_update()
+
+    def _on_button_press(self, event):
+        """双击恢复自动跟随最新数据"""
+        if event.dblclick and event.inaxes == self.ax:
+            self.follow = True
+            self._needs_full_draw = True
+            self.request_update()
+
+    def _full_draw(self):
+        self._needs_full_draw = False
+        self.ax.legend(handles=list(self.lines.values()), loc='upper left')
+        for label in self.ax.get_xticklabels():
+            label.set_rotation(45)
+            label.set_ha('right')
+        self.fig.tight_layout()
+        self.canvas.draw_idle()
+
+    def _on_draw(self, event):
+        """整图重绘后缓存背景，并在其上绘制动态折线"""
+        if not self.canvas.supports_blit:
+            return
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for line in self.lines.values():
+            self.ax.draw_artist(line)
+        for artist in self.overlays:
+            self.ax.draw_artist(artist)
+
+    def _blit(self):
+        if self._background is None or not self.canvas.supports_blit:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_lines()
+        self.canvas.blit(self.fig.bbox)
@@ -2,28 +2,41 @@
 # 2. 增加版本号显示
 # 3. 统计信息保存至内存监控报告中
 
-import psutil
-import pandas as pd
-import time
+import functools
 import threading
+import time
+import multiprocessing
+import sqlite3
 import os
-import matplotlib.pyplot as plt
-from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image
-from openpyxl.styles import Alignment
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib
-from io import BytesIO
-import matplotlib.dates as mdates
 import numpy as np
-
-matplotlib.use('TkAgg')
-# ---------------------- 添加字体配置 ----------------------
-plt.rcParams["font.family"] = ["SimHei", "Microsoft YaHei"]  # 解决中文显示问题
-plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
+from sampler import ProcessSampler
+from collectors import available_modes, measure_costs, DEFAULT_MODE
+from sample_store import SampleStore
+from live_chart import LiveChart
+from scheduler import MIN_INTERVAL
+from session_log import SessionReader, SESSION_SUFFIX
+from monitor_engine import MonitorEngine
+from leak_detector import LeakMonitor
+from profiler import StageProfiler, STAGE_CHART, STAGE_REPORT
+from report_charts import CHART_MODES, DEFAULT_CHART_MODE, CHART_RC
+from process_metrics import available_metrics, METRIC_SCALES
+from process_picker import ProcessCatalog, snapshot_process_names
+from shared_scheduler import SharedScheduler
+from stats import BYTES_PER_MB
+from remote_protocol import DEFAULT_PORT, parse_address
+
+# 启动时只导入界面所需的模块：matplotlib在窗口显示后再加载，openpyxl/pandas在生成报告时才加载
+
+HOVER_INTERVAL_MS = 33  # 悬停提示最多约30次/秒
+SHM_POLL_INTERVAL_MS = 200  # 独立采样进程模式下读取共享内存的间隔
+REPORT_POLL_INTERVAL_MS = 100  # 后台生成报告时检查是否完成的间隔
+PROFILE_REFRESH_MS = 1000  # 工具自身开销面板的刷新间隔
+CHART_INIT_DELAY_MS = 10  # 窗口显示后再创建实时图表（导入matplotlib）
+PROCESS_REFRESH_MS = 5000  # 未监控时后台刷新可用进程列表的间隔
+PROCESS_POLL_MS = 50  # 检查后台进程表快照是否完成的间隔
+FILTER_DELAY_MS = 100  # 输入过滤条件后延迟刷新列表，连续输入只过滤一次
 
 
 class MemoryMonitorApp:
@@ -35,11 +48,18 @@ class MemoryMonitorApp:
         self.root.resizable(True, True)
 
         # 初始化变量
-        self.monitoring = False
-        self.monitor_thread = None
-        self.process_data = {}  # {进程名: DataFrame}
-        self.selected_processes = set()
-        self.merge_processes = set()
+        self.engine = None  # 当前显示的MonitorEngine（采样、会话文件、报告数据）
+        self.sessions = []  # 本轮的全部监控会话（可同时运行多个，各自的进程、间隔和时长）
+        self.shared_scheduler = SharedScheduler()  # 线程模式的会话共用，同一时刻的采样合并为一次遍历
+        self.leaks = None  # 当前数据的LeakMonitor（泄漏分析结果）
+        self.profiler = None  # 开启性能剖析时的StageProfiler
+        self.report_thread = None  # 后台生成报告的线程
+        self.process_data = SampleStore()  # {进程名: SeriesStore}
+        self.selected_processes = set()  # 当前监控进程（与monitor_listbox一致，用于去重）
+        self.merge_processes = set()  # 合并图表的进程（与merge_target_listbox一致）
+        self.process_catalog = ProcessCatalog()  # 可用进程（后台快照增量更新）
+        self.process_thread = None  # 后台遍历进程表的线程
+        self._filter_pending = None
         self.save_path = os.getcwd()
 
         # 统计信息相关变量
@@ -48,6 +68,11 @@ class MemoryMonitorApp:
         # 创建UI界面
         self._create_widgets()
 
+    @property
+    def monitoring(self):
+        """是否有会话正在监控"""
+        return any(engine.monitoring for engine in self.sessions)
+
     def _create_widgets(self):
         """创建UI组件"""
         main_frame = ttk.Frame(self.root, padding="10")
@@ -57,7 +82,17 @@ class MemoryMonitorApp:
         process_frame = ttk.LabelFrame(main_frame, text="进程选择", padding="10")
         process_frame.pack(fill=tk.X, pady=(0, 10))
 
-        ttk.Label(process_frame, text="可用进程:").grid(row=0, column=0, sticky=tk.W)
+        filter_frame = ttk.Frame(process_frame)
+        filter_frame.grid(row=0, column=0, sticky=tk.EW)
+        self.process_count_var = tk.StringVar(value="可用进程:")
+        ttk.Label(filter_frame, textvariable=self.process_count_var).pack(side=tk.LEFT)
+        # 过滤：按子串匹配（不区分大小写），回车添加选中的（或第一个匹配的）进程
+        self.filter_var = tk.StringVar(value="")
+        self.filter_var.trace_add("write", self._schedule_filter)
+        filter_entry = ttk.Entry(filter_frame, textvariable=self.filter_var, width=24)
+        filter_entry.pack(side=tk.RIGHT, padx=(0, 10))
+        filter_entry.bind("<Return>", self._add_filtered)
+        ttk.Label(filter_frame, text="筛选:").pack(side=tk.RIGHT)
         self.process_listbox = tk.Listbox(process_frame, selectmode=tk.EXTENDED, height=6, width=50)
         self.process_listbox.grid(row=1, column=0, padx=(0, 10), pady=5)
 
@@ -98,6 +133,60 @@ class MemoryMonitorApp:
         ttk.Entry(param_frame, textvariable=self.path_var, width=30).grid(row=0, column=7, sticky=tk.W, pady=5)
         ttk.Button(param_frame, text="浏览...", command=self._browse_path).grid(row=0, column=8, padx=5, pady=5)
 
+        # 采集方式：psutil RSS为默认，Linux下可选/proc直读（RSS/PSS/USS/Swap）
+        ttk.Label(param_frame, text="采集方式:").grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
+        self.collector_mode = ttk.Combobox(param_frame, values=available_modes(), width=12, state="readonly")
+        self.collector_mode.set(DEFAULT_MODE)
+        self.collector_mode.grid(row=1, column=1, columnspan=2, sticky=tk.W, pady=5)
+        ttk.Button(param_frame, text="评估开销", command=self._measure_collector_costs).grid(
+            row=1, column=3, padx=5, pady=5)
+
+        ttk.Label(param_frame, text="样本上限:").grid(row=1, column=4, sticky=tk.W, padx=5, pady=5)
+        self.capacity_var = tk.StringVar(value="0")
+        ttk.Entry(param_frame, textvariable=self.capacity_var, width=10).grid(row=1, column=5, sticky=tk.W, pady=5)
+        ttk.Label(param_frame, text="（0为不限，超出后只保留最近样本）").grid(
+            row=1, column=6, columnspan=2, sticky=tk.W, pady=5)
+
+        # 独立采样进程：采样不受界面绘图/报告生成影响
+        self.process_mode_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(param_frame, text="独立采样进程", variable=self.process_mode_var).grid(
+            row=1, column=8, sticky=tk.W, padx=5, pady=5)
+
+        # 会话文件：样本边采样边写入磁盘，程序异常退出后仍可打开
+        self.session_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(param_frame, text="保存会话文件", variable=self.session_var).grid(
+            row=1, column=9, sticky=tk.W, padx=5, pady=5)
+
+        # 报告图表：Excel原生折线图（文件小、可缩放）或PNG图片
+        ttk.Label(param_frame, text="报告图表:").grid(row=2, column=0, sticky=tk.W, padx=5, pady=5)
+        self.chart_mode = ttk.Combobox(param_frame, values=CHART_MODES, width=12, state="readonly")
+        self.chart_mode.set(DEFAULT_CHART_MODE)
+        self.chart_mode.grid(row=2, column=1, columnspan=2, sticky=tk.W, pady=5)
+
+        # 性能剖析：统计本工具自身的RSS/CPU和各阶段耗时（关闭时无额外开销）
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(param_frame, text="性能剖析", variable=self.profile_var).grid(
+            row=2, column=3, sticky=tk.W, padx=5, pady=5)
+
+        # 按PID细分和附加指标（仅线程模式）：同名多实例时定位具体实例，VMS/线程数/句柄等辅助判断泄漏类型
+        self.per_pid_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(param_frame, text="按PID细分", variable=self.per_pid_var).grid(
+            row=2, column=4, sticky=tk.W, padx=5, pady=5)
+        ttk.Label(param_frame, text="附加指标:").grid(row=2, column=5, sticky=tk.W, padx=5, pady=5)
+        metric_frame = ttk.Frame(param_frame)
+        metric_frame.grid(row=2, column=6, columnspan=4, sticky=tk.W, pady=5)
+        self.metric_vars = {}
+        for metric in available_metrics():
+            self.metric_vars[metric] = tk.BooleanVar(value=False)
+            ttk.Checkbutton(metric_frame, text=metric, variable=self.metric_vars[metric]).pack(side=tk.LEFT, padx=(0, 5))
+
+        # 远程采集：其他机器上的remote_agent.py把样本发到本机该端口，序列名为 主机:进程名
+        ttk.Label(param_frame, text="远程采集端口:").grid(row=3, column=0, sticky=tk.W, padx=5, pady=5)
+        self.listen_var = tk.StringVar(value="")
+        ttk.Entry(param_frame, textvariable=self.listen_var, width=10).grid(row=3, column=1, sticky=tk.W, pady=5)
+        ttk.Label(param_frame, text=f"（留空不启用；代理：python remote_agent.py 进程名 -c 本机地址:{DEFAULT_PORT}）").grid(
+            row=3, column=2, columnspan=7, sticky=tk.W, pady=5)
+
         # 3. 图表合并配置
         merge_frame = ttk.LabelFrame(main_frame, text="图表合并配置", padding="10")
         merge_frame.pack(fill=tk.X, pady=(0, 10))
@@ -133,28 +222,35 @@ class MemoryMonitorApp:
         self.stop_btn.pack(side=tk.LEFT, padx=5)
         self.report_btn = ttk.Button(control_frame, text="生成报告", command=self._generate_report, state=tk.DISABLED)
         self.report_btn.pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="打开会话...", command=self._open_session).pack(side=tk.LEFT, padx=5)
         self.status_var = tk.StringVar(value="就绪")
         ttk.Label(control_frame, textvariable=self.status_var).pack(side=tk.RIGHT, padx=5)
-
-        # 5. 实时图表区域
-        chart_frame = ttk.LabelFrame(main_frame, text="实时监控图表", padding="10")
-        chart_frame.pack(fill=tk.BOTH, expand=True)  # 图表区域占满剩余空间
-
-        self.fig, self.ax = plt.subplots(figsize=(10, 6))
-        self.canvas = FigureCanvasTkAgg(self.fig, master=chart_frame)
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-        # 初始化悬停标注框
-        self.annotation = self.ax.annotate(
-            "",
-            xy=(0, 0),
-            xytext=(15, 15),
-            textcoords="offset points",
-            bbox=dict(boxstyle="round,pad=0.5", fc="white", ec="gray", alpha=0.9),
-            arrowprops=dict(arrowstyle="->", connectionstyle="arc3,rad=0.2")
-        )
-        self.annotation.set_visible(False)
-        self.canvas.mpl_connect("motion_notify_event", self._on_mouse_hover)
+        # 泄漏告警：显示最近一条，不弹窗打断监控
+        self.alert_var = tk.StringVar(value="")
+        ttk.Label(control_frame, textvariable=self.alert_var, foreground="red").pack(side=tk.RIGHT, padx=5)
+
+        # 监控会话列表：监控中可再开始新的会话，选中一行在图表和统计表中显示该会话
+        session_frame = ttk.LabelFrame(main_frame, text="监控会话", padding="5")
+        session_frame.pack(fill=tk.X, pady=(0, 10))
+        session_columns = ("label", "procs", "interval", "duration", "state")
+        self.session_tree = ttk.Treeview(session_frame, columns=session_columns, show="headings", height=3,
+                                         selectmode="browse")
+        for column, text, width in (("label", "会话", 80), ("procs", "进程", 400), ("interval", "间隔 (秒)", 80),
+                                    ("duration", "时长 (秒)", 80), ("state", "状态", 100)):
+            self.session_tree.heading(column, text=text)
+            self.session_tree.column(column, width=width, anchor="w" if column == "procs" else "center")
+        self.session_tree.pack(fill=tk.X)
+        self.session_tree.bind("<<TreeviewSelect>>", self._on_session_select)
+
+        # 5. 实时图表区域（图表在窗口显示后创建，见_ensure_chart）
+        self.chart_frame = ttk.LabelFrame(main_frame, text="实时监控图表", padding="10")
+        self.chart_frame.pack(fill=tk.BOTH, expand=True)  # 图表区域占满剩余空间
+        self.chart_placeholder = ttk.Label(self.chart_frame, text="图表加载中...")
+        self.chart_placeholder.pack(expand=True)
+        self.live_chart = None
+        self._hover_event = None
+        self._hover_pending = None
+        self.root.after(CHART_INIT_DELAY_MS, self._ensure_chart)
 
         # ---------------------- 修改2：调整统计信息模块位置（上移以完全显示） ----------------------
         stats_frame = ttk.LabelFrame(main_frame, text="统计信息", padding="10")
@@ -162,8 +258,10 @@ class MemoryMonitorApp:
         stats_frame.pack(fill=tk.X, pady=(5, 0))
 
         # 创建统计数据表格（Treeview控件）并设置居中显示
-        columns = ("proc", "max", "min", "avg", "3sigma")
-        self.stats_tree = ttk.Treeview(stats_frame, columns=columns, show="headings", height=6)  # 增加height为6行
+        columns = ("proc", "max", "min", "avg", "3sigma", "p50", "p95", "p99", "trend", "steps", "verdict", "metrics")
+        # 树形显示：按PID细分时，各实例作为进程名的子行
+        self.stats_tree = ttk.Treeview(stats_frame, columns=columns, show="tree headings", height=6)  # 增加height为6行
+        self.stats_tree.column("#0", width=30, stretch=False)
 
         # 设置表头
         self.stats_tree.heading("proc", text="进程名")
@@ -171,6 +269,13 @@ class MemoryMonitorApp:
         self.stats_tree.heading("min", text="最小值 (MB)")
         self.stats_tree.heading("avg", text="平均值 (MB)")
         self.stats_tree.heading("3sigma", text="3σ值 (MB)")
+        self.stats_tree.heading("p50", text="P50 (MB)")
+        self.stats_tree.heading("p95", text="P95 (MB)")
+        self.stats_tree.heading("p99", text="P99 (MB)")
+        self.stats_tree.heading("trend", text="趋势 (MB/h)")
+        self.stats_tree.heading("steps", text="阶跃次数")
+        self.stats_tree.heading("verdict", text="判定")
+        self.stats_tree.heading("metrics", text="附加指标（最新）")
 
         # 设置列宽和居中对齐
         self.stats_tree.column("proc", width=150, anchor="center")
@@ -178,12 +283,54 @@ class MemoryMonitorApp:
         self.stats_tree.column("min", width=100, anchor="center")
         self.stats_tree.column("avg", width=100, anchor="center")
         self.stats_tree.column("3sigma", width=100, anchor="center")
+        self.stats_tree.column("p50", width=100, anchor="center")
+        self.stats_tree.column("p95", width=100, anchor="center")
+        self.stats_tree.column("p99", width=100, anchor="center")
+        self.stats_tree.column("trend", width=100, anchor="center")
+        self.stats_tree.column("steps", width=80, anchor="center")
+        self.stats_tree.column("verdict", width=80, anchor="center")
+        self.stats_tree.column("metrics", width=220, anchor="w")
 
         self.stats_tree.pack(fill=tk.X)
 
-        self._refresh_processes()
+        # 工具自身开销面板（开启性能剖析时显示）
+        self.profile_frame = ttk.LabelFrame(main_frame, text="工具自身开销", padding="5")
+        self.profile_text = tk.StringVar(value="")
+        ttk.Label(self.profile_frame, textvariable=self.profile_text, justify=tk.LEFT).pack(anchor=tk.W)
+
+        self._auto_refresh_processes()
 
     # 图表合并相关方法
+    def _ensure_chart(self):
+        """创建实时图表；首次调用时才导入matplotlib（不经过pyplot），窗口无需等待其加载"""
+        if self.live_chart is not None:
+            return
+        import matplotlib
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        matplotlib.rcParams.update(CHART_RC)  # 解决中文和负号显示问题
+        self.fig = Figure(figsize=(10, 6))
+        self.ax = self.fig.add_subplot()
+        self.chart_placeholder.destroy()
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.chart_frame)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.live_chart = LiveChart(self.root, self.fig, self.ax, self.canvas)
+
+        # 初始化悬停标注框
+        self.annotation = self.ax.annotate(
+            "",
+            xy=(0, 0),
+            xytext=(15, 15),
+            textcoords="offset points",
+            bbox=dict(boxstyle="round,pad=0.5", fc="white", ec="gray", alpha=0.9),
+            arrowprops=dict(arrowstyle="->", connectionstyle="arc3,rad=0.2")
+        )
+        self.annotation.set_visible(False)
+        self.live_chart.add_overlay(self.annotation)
+        self.canvas.mpl_connect("motion_notify_event", self._on_mouse_hover)
+        self.live_chart.set_store(self.process_data)
+
     def _toggle_merge_options(self):
         state = tk.NORMAL if self.merge_var.get() else tk.DISABLED
         self.merge_source_listbox.config(state=state)
@@ -203,42 +350,121 @@ class MemoryMonitorApp:
         selected_indices = self.merge_source_listbox.curselection()
         for i in selected_indices:
             proc_name = self.merge_source_listbox.get(i)
-            if proc_name not in [self.merge_target_listbox.get(j) for j in range(self.merge_target_listbox.size())]:
+            if proc_name not in self.merge_processes:
+                self.merge_processes.add(proc_name)
                 self.merge_target_listbox.insert(tk.END, proc_name)
 
     def _remove_from_merge(self):
         selected_indices = self.merge_target_listbox.curselection()
         for i in sorted(selected_indices, reverse=True):
+            self.merge_processes.discard(self.merge_target_listbox.get(i))
             self.merge_target_listbox.delete(i)
 
     # 进程管理相关方法
     def _refresh_processes(self):
+        """在后台线程遍历进程表，完成后增量更新可用进程列表（界面线程不做遍历）"""
+        if self.process_thread is not None and self.process_thread.is_alive():
+            return
+        result = {}
+
+        def snapshot():
+            result["names"] = snapshot_process_names()
+
+        self.process_thread = threading.Thread(target=snapshot, daemon=True)
+        self.process_thread.start()
+        self._poll_process_snapshot(result)
+
+    def _auto_refresh_processes(self):
+        # 监控期间不自动刷新，避免与采样争用CPU（可手动刷新）
+        if not self.monitoring:
+            self._refresh_processes()
+        self.root.after(PROCESS_REFRESH_MS, self._auto_refresh_processes)
+
+    def _poll_process_snapshot(self, result):
+        if self.process_thread.is_alive():
+            self.root.after(PROCESS_POLL_MS, self._poll_process_snapshot, result)
+            return
+        if "names" not in result:
+            return
+        ops = self.process_catalog.update(result["names"])
+        if ops is None:
+            self._rebuild_process_list()
+        else:
+            for op in ops:
+                if op[0] == "delete":
+                    self.process_listbox.delete(op[1])
+                else:
+                    self.process_listbox.insert(op[1], op[2])
+        self._update_process_count()
+
+    def _rebuild_process_list(self):
         self.process_listbox.delete(0, tk.END)
-        processes = set()
-        for proc in psutil.process_iter(['name']):
-            try:
-                processes.add(proc.info['name'])
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
-        for proc_name in sorted(processes):
-            self.process_listbox.insert(tk.END, proc_name)
+        if self.process_catalog.view:
+            self.process_listbox.insert(tk.END, *self.process_catalog.view)
+
+    def _update_process_count(self):
+        catalog = self.process_catalog
+        count = f"{len(catalog.view)}/{len(catalog)}" if catalog.query else f"{len(catalog)}"
+        self.process_count_var.set(f"可用进程（{count}）:")
+
+    def _schedule_filter(self, *args):
+        if self._filter_pending is not None:
+            self.root.after_cancel(self._filter_pending)
+        self._filter_pending = self.root.after(FILTER_DELAY_MS, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_pending = None
+        self.process_catalog.filter(self.filter_var.get())
+        self._rebuild_process_list()
+        self._update_process_count()
+        if self.process_catalog.view:
+            self.process_listbox.see(self.process_catalog.first_prefix_match())
+
+    def _add_filtered(self, event=None):
+        """筛选框回车：添加选中的进程，未选中时添加第一个前缀匹配（或子串匹配）的进程"""
+        if self._filter_pending is not None:
+            self.root.after_cancel(self._filter_pending)
+            self._apply_filter()
+        if not self.process_listbox.curselection() and self.process_catalog.view:
+            self.process_listbox.selection_set(self.process_catalog.first_prefix_match())
+        self._add_monitor()
 
     def _add_monitor(self):
         selected_indices = self.process_listbox.curselection()
         for i in selected_indices:
             proc_name = self.process_listbox.get(i)
-            if proc_name not in [self.monitor_listbox.get(j) for j in range(self.monitor_listbox.size())]:
+            if proc_name not in self.selected_processes:
+                self.selected_processes.add(proc_name)
                 self.monitor_listbox.insert(tk.END, proc_name)
+                if self.engine is not None and self.engine.monitoring:
+                    self.engine.add(proc_name)
                 if self.merge_var.get():
                     self._sync_merge_source_list()
 
     def _remove_monitor(self):
         selected_indices = self.monitor_listbox.curselection()
         for i in sorted(selected_indices, reverse=True):
+            proc_name = self.monitor_listbox.get(i)
+            if self.engine is not None and self.engine.monitoring:
+                self.engine.remove(proc_name)
+            self.selected_processes.discard(proc_name)
             self.monitor_listbox.delete(i)
             if self.merge_var.get():
                 self._sync_merge_source_list()
 
+    def _measure_collector_costs(self):
+        """对当前监控进程评估各采集方式的单周期耗时"""
+        proc_names = self.monitor_listbox.get(0, tk.END)
+        if not proc_names:
+            messagebox.showwarning("警告", "请至少选择一个进程进行监控")
+            return
+        sampler = ProcessSampler(proc_names)
+        sampler.scan()
+        costs = measure_costs(sampler.procs)
+        lines = [f"{mode}: {cost * 1000:.2f} ms/次" for mode, cost in costs.items()]
+        lines.append(f"进程表遍历: {sampler.last_scan_cost * 1000:.2f} ms/次")
+        messagebox.showinfo("采集开销", f"匹配进程数: {len(sampler.procs)}\n" + "\n".join(lines))
+
     def _browse_path(self):
         path = filedialog.askdirectory()
         if path:
@@ -247,9 +473,17 @@ class MemoryMonitorApp:
 
     # 监控控制方法
     def _start_monitoring(self):
-        if self.monitor_listbox.size() == 0:
+        listen = None
+        if self.listen_var.get().strip():
+            try:
+                listen = parse_address(self.listen_var.get().strip(), default_host="0.0.0.0")
+            except ValueError:
+                messagebox.showwarning("警告", "请输入有效的远程采集端口")
+                return
+        if self.monitor_listbox.size() == 0 and listen is None:
             messagebox.showwarning("警告", "请至少选择一个进程进行监控")
             return
+        self._ensure_chart()
 
         try:
             duration_value = int(self.duration_var.get())
@@ -261,163 +495,265 @@ class MemoryMonitorApp:
             else:
                 duration = duration_value
 
-            interval_value = int(self.interval_var.get())
+            interval_value = float(self.interval_var.get())
             interval_unit = self.interval_unit.get()
             if interval_unit == "分钟":
                 interval = interval_value * 60
             else:
                 interval = interval_value
 
-            if duration <= 0 or interval <= 0 or interval > duration:
+            if duration <= 0 or interval < MIN_INTERVAL or interval > duration:
+                raise ValueError
+
+            # 样本上限：0表示不限，否则每个进程只保留最近N个样本（环形缓冲）
+            capacity = int(self.capacity_var.get() or 0)
+            if capacity < 0:
                 raise ValueError
         except ValueError:
-            messagebox.showwarning("警告", "请输入有效的监控参数（正整数，且间隔不大于时长）")
+            messagebox.showwarning("警告", f"请输入有效的监控参数（时长为正整数，间隔不小于{MIN_INTERVAL}秒且不大于时长）")
             return
-
-        self.process_data = {}
-        for i in range(self.monitor_listbox.size()):
-            proc_name = self.monitor_listbox.get(i)
-            self.process_data[proc_name] = []
-
-        self.status_var.set("监控中...")
-        self.start_btn.config(state=tk.DISABLED)
-        self.stop_btn.config(state=tk.NORMAL)
-        self.report_btn.config(state=tk.DISABLED)
-        self.monitoring = True
-
-        self.monitor_thread = threading.Thread(
-            target=self._monitor_processes,
-            args=(duration, interval),
-            daemon=True
-        )
-        self.monitor_thread.start()
+        capacity = capacity or None
+
+        running = self.monitoring
+        if not running:
+            # 没有正在运行的会话时开始新的一轮，清除已结束的会话
+            self.sessions = []
+            self.session_tree.delete(*self.session_tree.get_children())
+        # 与其他会话同时运行时加上会话标签，会话文件、报告和运行索引互不覆盖
+        engine = MonitorEngine(
+            self.monitor_listbox.get(0, tk.END), duration, interval, self.collector_mode.get(), capacity,
+            save_path=self.save_path, session=self.session_var.get(), process_mode=self.process_mode_var.get(),
+            on_alert=self._on_leak_alert, profiler=self._start_profiler(running), per_pid=self.per_pid_var.get(),
+            metrics=[metric for metric, var in self.metric_vars.items() if var.get()],
+            shared=self.shared_scheduler, label=f"会话{len(self.sessions) + 1}" if running else None, listen=listen)
+        engine.on_sample = functools.partial(self._on_engine_sample, engine)
+        engine.on_finish = functools.partial(self._on_engine_finish, engine)
+        try:
+            engine.start()
+        except sqlite3.Error as e:
+            messagebox.showerror("错误", f"创建会话文件失败：{str(e)}")
+            return
+        except ValueError as e:
+            messagebox.showwarning("警告", str(e))
+            return
+        except OSError as e:
+            messagebox.showerror("错误", f"远程采集端口监听失败：{str(e)}")
+            return
+        self.sessions.append(engine)
+        self.session_tree.insert("", "end", iid=str(len(self.sessions) - 1), values=self._session_values(engine))
+        self.alert_var.set("")
+        self.session_tree.selection_set(str(len(self.sessions) - 1))
+        self._show_session(engine)
+        if not running:
+            self._refresh_profile()
+        if engine.process_mode:
+            self._poll_sampler_process(engine)
+
+    def _session_values(self, engine, state=None):
+        if state is None:
+            state = "监控中" if engine.monitoring else "已完成"
+        procs = "、".join(engine.names)
+        if engine.listen is not None:
+            procs = f"{procs}（远程端口 {engine.listen[1]}）" if procs else f"远程端口 {engine.listen[1]}"
+        return (engine.label or "会话1", procs, f"{engine.interval:g}", f"{engine.duration:g}", state)
+
+    def _update_session_row(self, engine, state=None):
+        if engine in self.sessions:
+            self.session_tree.item(str(self.sessions.index(engine)), values=self._session_values(engine, state))
+
+    def _on_session_select(self, event=None):
+        selection = self.session_tree.selection()
+        if selection and self.sessions[int(selection[0])] is not self.engine:
+            self._show_session(self.sessions[int(selection[0])])
+
+    def _show_session(self, engine):
+        """在图表、统计表和按钮状态中显示指定会话"""
+        self.engine = engine
+        self.process_data = engine.store
+        self.leaks = engine.leaks
+        self.live_chart.set_store(self.process_data)
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        self._update_chart()
+        self.status_var.set(engine.status() if engine.monitoring else "监控已结束，可生成报告")
+        self.stop_btn.config(state=tk.NORMAL if engine.monitoring else tk.DISABLED)
+        self.report_btn.config(state=tk.DISABLED if engine.monitoring else tk.NORMAL)
+
+    def _start_profiler(self, running=False):
+        """按开关创建新的StageProfiler，并移除上一轮的计时包装；已有会话在运行时沿用当前的剖析器"""
+        if running:
+            return self.profiler if self.profile_var.get() else None
+        if self.profiler is not None:
+            self.profiler.uninstrument()
+        self.profiler = StageProfiler() if self.profile_var.get() else None
+        if self.profiler is None:
+            self.profile_frame.pack_forget()
+            return None
+        self.profiler.wrap(self.live_chart, "_render", STAGE_CHART)
+        self.profile_frame.pack(fill=tk.X, pady=(5, 0))
+        return self.profiler
+
+    def _refresh_profile(self):
+        if self.profiler is None:
+            return
+        self.profile_text.set(self.profiler.summary_text())
+        if self.monitoring or (self.report_thread is not None and self.report_thread.is_alive()):
+            self.root.after(PROFILE_REFRESH_MS, self._refresh_profile)
 
     def _stop_monitoring(self):
-        self.monitoring = False
+        """停止当前显示的会话，其他会话继续监控"""
+        engine = self.engine
+        if engine is None:
+            return
+        engine.stop()
+        self._update_session_row(engine, "已停止")
+        self._update_chart()
         self.status_var.set("监控已停止，准备生成报告")
-        self.start_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         self.report_btn.config(state=tk.NORMAL)
 
-    def _monitor_processes(self, duration, interval):
-        end_time = time.time() + duration
-        while self.monitoring and time.time() < end_time:
-            timestamp = datetime.now()
-            for proc_name in self.process_data.keys():
-                mem_usage = 0
-                for proc in psutil.process_iter(['name', 'memory_info']):
-                    try:
-                        if proc.info['name'] == proc_name:
-                            mem_usage += proc.info['memory_info'].rss
-                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                        continue
-                self.process_data[proc_name].append({'Timestamp': timestamp, 'Memory_Bytes': mem_usage})
-            self.root.after(0, self._update_chart)
-            time.sleep(interval)
+    def _on_engine_sample(self, engine):
+        # 线程模式下由采样线程调用，界面更新统一转到Tk主线程；只刷新当前显示的会话
+        if engine is not self.engine:
+            return
+        status = engine.status()
+        self.root.after(0, lambda: engine is self.engine and engine.monitoring and self.status_var.set(status))
+        self.root.after(0, self._update_chart)
+
+    def _on_leak_alert(self, proc_name, message):
+        self.root.after(0, lambda: self.alert_var.set(f"⚠ {message}"))
+
+    def _on_engine_finish(self, engine):
+        self.root.after(0, self._monitoring_finished, engine)
+
+    def _monitoring_finished(self, engine):
+        # 保存到运行索引，供compare_runs.py与其他版本的运行对比
+        try:
+            run_id = engine.save_run()
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("错误", f"保存到运行索引失败：{str(e)}")
+            run_id = None
+        self._update_session_row(engine)
+        if engine is not self.engine:
+            return
+        self._update_chart()
+        self.status_var.set(f"监控完成（运行ID {run_id}），准备生成报告" if run_id else "监控完成，准备生成报告")
+        self.stop_btn.config(state=tk.DISABLED)
+        self.report_btn.config(state=tk.NORMAL)
+
+    def _poll_sampler_process(self, engine):
+        """独立采样进程模式：定时从共享内存读取新样本"""
+        if engine.monitoring and engine.poll():
+            self.root.after(SHM_POLL_INTERVAL_MS, self._poll_sampler_process, engine)
+
+    def _open_session(self):
+        """打开会话文件（包括异常退出时未正常结束的会话），逐块载入用于图表和报告"""
         if self.monitoring:
-            self.root.after(0, lambda: self.status_var.set("监控完成，准备生成报告"))
-            self.root.after(0, lambda: self.start_btn.config(state=tk.NORMAL))
-            self.root.after(0, lambda: self.stop_btn.config(state=tk.DISABLED))
-            self.root.after(0, lambda: self.report_btn.config(state=tk.NORMAL))
-            self.monitoring = False
+            messagebox.showwarning("警告", "请先停止当前监控")
+            return
+        path = filedialog.askopenfilename(filetypes=[("监控会话", f"*{SESSION_SUFFIX}")], initialdir=self.save_path)
+        if not path:
+            return
+        try:
+            reader = SessionReader(path)
+            leaks = LeakMonitor()
+            store = reader.to_store(sinks=[leaks])
+            crashed = reader.crashed
+            reader.close()
+        except sqlite3.Error as e:
+            messagebox.showerror("错误", f"打开会话文件失败：{str(e)}")
+            return
+        self.process_data = store
+        self.leaks = leaks
+        self.engine = None
+        self.session_tree.selection_remove(*self.session_tree.selection())
+        self.alert_var.set(f"⚠ 疑似泄漏：{'、'.join(leaks.leaking())}" if leaks.leaking() else "")
+        self._ensure_chart()
+        self.live_chart.set_store(store)
+        self._update_chart()
+        self.monitor_listbox.delete(0, tk.END)
+        self.selected_processes = set(store.keys())
+        for proc_name in store.keys():
+            self.monitor_listbox.insert(tk.END, proc_name)
+        if self.merge_var.get():
+            self._sync_merge_source_list()
+        state = "（监控未正常结束）" if crashed else ""
+        self.status_var.set(f"已打开会话{state}：{os.path.basename(path)}")
+        self.report_btn.config(state=tk.NORMAL)
 
     # 更新统计信息表格
     def _update_stats_table(self, stats_data):
-        """更新UI中的统计信息表格"""
+        """更新UI中的统计信息表格；stats_data为 [(行, [实例行, ...]), ...]，保留各进程的展开状态"""
+        opened = {item for item in self.stats_tree.get_children() if self.stats_tree.item(item, "open")}
         for item in self.stats_tree.get_children():
             self.stats_tree.delete(item)
-        for data in stats_data:
-            self.stats_tree.insert("", "end", values=data)
+        for data, children in stats_data:
+            parent = self.stats_tree.insert("", "end", iid=data[0], values=data, open=data[0] in opened)
+            for child in children:
+                self.stats_tree.insert(parent, "end", values=child)
+
+    def _stats_row(self, store, name):
+        """统计表中一行：统计值、泄漏分析、附加指标最新值"""
+        row = [name] + store.stats[name].summary(scale=BYTES_PER_MB)
+        if self.leaks is not None:
+            row += self.leaks.summary(name)
+        else:
+            row += ["", "", ""]
+        if self.engine is not None and self.engine.metrics:
+            latest = []
+            for metric, metric_store in self.engine.metrics.items():
+                if name in metric_store and metric_store[name]:
+                    latest.append(f"{metric} {metric_store[name].last()[1] / METRIC_SCALES[metric]:g}")
+            row.append("，".join(latest))
+        return row
 
     # 更新图表
     def _update_chart(self):
-        """更新实时图表"""
-        self.ax.clear()
-        has_data = False
+        """更新统计表格，并请求刷新实时图表（按帧率合并重绘）"""
         stats_data = []
-
-        for proc_name, data in self.process_data.items():
-            if data:
-                has_data = True
-                df = pd.DataFrame(data)
-                df['Memory_MB'] = df['Memory_Bytes'] / (1024 * 1024)
-                self.ax.plot(df['Timestamp'], df['Memory_MB'], marker='o', linestyle='-', label=proc_name)
-
-                # 计算统计值
-                memory_values = df['Memory_MB'].values
-                max_val = np.max(memory_values) if len(memory_values) > 0 else 0
-                min_val = np.min(memory_values) if len(memory_values) > 0 else 0
-                avg_val = np.mean(memory_values) if len(memory_values) > 0 else 0
-                std_val = np.std(memory_values, ddof=1) if len(memory_values) >= 2 else 0
-                sigma3_val = 3 * std_val
-                stats_data.append(
-                    (proc_name, round(max_val, 2), round(min_val, 2), round(avg_val, 2), round(sigma3_val, 2)))
-
-        # 更新统计表格
+        # 按PID细分的实例按进程名分组，作为子行
+        children = {}
+        instances = self.engine.instances if self.engine is not None else None
+        if instances is not None:
+            for label, (proc_name, pid, create_time) in list(self.engine.instance_info.items()):
+                if label in instances and instances[label]:
+                    children.setdefault(proc_name, []).append(self._stats_row(instances, label))
+        # 采样线程可能同时新增序列（远程代理接入、新的进程实例），遍历快照
+        for proc_name, series in list(self.process_data.items()):
+            if series:
+                # 统计值由增量统计直接读取，无需重新扫描历史数据
+                stats_data.append((self._stats_row(self.process_data, proc_name), children.get(proc_name, [])))
         if stats_data:
             self._update_stats_table(stats_data)
-
-        # 图表样式设置
-        if has_data:
-            self.ax.set_title('实时内存使用监控')
-            self.ax.set_xlabel('时间')
-            self.ax.set_ylabel('内存使用 (MB)')
-            self.ax.legend(loc='upper left')
-            max_ticks = min(10, len(df))
-            self.ax.xaxis.set_major_locator(plt.MaxNLocator(max_ticks))
-            self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
-            plt.xticks(rotation=45, ha='right')
-            self.fig.tight_layout()
-
-        self.canvas.draw()
+        self.live_chart.request_update()
 
     # 鼠标悬停事件
     def _on_mouse_hover(self, event):
-        if event.inaxes != self.ax:
-            self.annotation.set_visible(False)
-            self.canvas.draw_idle()
-            return
-        if not self.ax.lines:
-            self.annotation.set_visible(False)
-            self.canvas.draw_idle()
-            return
-        mouse_x = event.xdata
-        mouse_y = event.ydata
-        if mouse_x is None or mouse_y is None:
-            self.annotation.set_visible(False)
-            self.canvas.draw_idle()
-            return
-        mouse_datetime = mdates.num2date(mouse_x)
-        min_dist = float('inf')
-        closest_point = None
-        for line in self.ax.lines:
-            proc_name = line.get_label()
-            x_data = line.get_xdata()
-            y_data = line.get_ydata()
-            for i in range(len(x_data)):
-                point_datetime = mdates.num2date(x_data[i])
-                time_diff = abs((mouse_datetime - point_datetime).total_seconds())
-                memory_diff = abs(mouse_y - y_data[i])
-                if time_diff < 5 and memory_diff < 10:
-                    distance = time_diff * 0.1 + memory_diff * 0.01
-                    if distance < min_dist:
-                        min_dist = distance
-                        closest_point = {
-                            "proc": proc_name,
-                            "time": point_datetime.strftime("%Y-%m-%d %H:%M:%S"),
-                            "memory": round(y_data[i], 2)
-                        }
-        if closest_point:
-            self.annotation.xy = (mouse_x, mouse_y)
+        """只记录最新的鼠标事件，按HOVER_INTERVAL_MS合并处理，避免事件堆积"""
+        self._hover_event = event
+        if self._hover_pending is None:
+            self._hover_pending = self.root.after(HOVER_INTERVAL_MS, self._process_hover)
+
+    def _process_hover(self):
+        self._hover_pending = None
+        event = self._hover_event
+        point = None
+        if event.inaxes == self.ax and event.xdata is not None and event.ydata is not None:
+            point = self.live_chart.nearest_point(event.xdata, event.ydata)
+        if point:
+            proc_name, timestamp_ns, memory = point
+            point_time = str(np.datetime64(timestamp_ns, 'ns').astype('datetime64[s]')).replace('T', ' ')
+            self.annotation.xy = (event.xdata, event.ydata)
             self.annotation.set_text(
-                f"进程: {closest_point['proc']}\n"
-                f"时间: {closest_point['time']}\n"
-                f"内存: {closest_point['memory']} MB"
+                f"进程: {proc_name}\n"
+                f"时间: {point_time}\n"
+                f"内存: {round(memory, 2)} MB"
             )
             self.annotation.set_visible(True)
-        else:
+        elif self.annotation.get_visible():
             self.annotation.set_visible(False)
-        self.canvas.draw_idle()
+        else:
+            return
+        self.live_chart.refresh_overlays()
 
     # ---------------------- 修改3：完善统计信息保存至Excel ----------------------
     def _generate_report(self):
@@ -425,157 +761,65 @@ class MemoryMonitorApp:
         if not self.process_data or all(len(data) == 0 for data in self.process_data.values()):
             messagebox.showwarning("警告", "没有监控数据可生成报告")
             return
-
-        # 报告路径调整为"内存监控报告.xlsx"
-        excel_path = os.path.join(self.save_path, "内存监控报告.xlsx")
-        wb = Workbook()
-
-        # 1. 创建内存数据工作表
-        data_ws = wb.active
-        data_ws.title = "内存监控数据"
-
-        # 写入内存数据
-        summary_data = {}
-        process_names = [self.monitor_listbox.get(i) for i in range(self.monitor_listbox.size())]
-        for proc_name in process_names:
-            if proc_name in self.process_data and self.process_data[proc_name]:
-                df = pd.DataFrame(self.process_data[proc_name])
-                df['Memory_MB'] = df['Memory_Bytes'] / (1024 * 1024)
-                df['Time'] = df['Timestamp'].dt.strftime('%H:%M:%S')
-
-                for _, row in df.iterrows():
-                    timestamp = row['Timestamp']
-                    if timestamp not in summary_data:
-                        summary_data[timestamp] = {'Timestamp': timestamp, 'Time': row['Time']}
-                    summary_data[timestamp][proc_name] = row['Memory_MB']
-
-        if summary_data:
-            summary_df = pd.DataFrame.from_dict(summary_data, orient='index').sort_values('Timestamp')
-            headers = ['时间'] + process_names
-            data_ws.append(headers)
-
-            for _, row in summary_df.iterrows():
-                row_data = [row['Timestamp']] + [row.get(proc, '') for proc in process_names]
-                data_ws.append(row_data)
-
-            # 设置数据表格格式
-            center_alignment = Alignment(horizontal='center', vertical='center')
-            for row in data_ws.iter_rows(min_row=1, max_row=data_ws.max_row, min_col=1, max_col=data_ws.max_column):
-                for cell in row:
-                    if isinstance(cell.value, (int, float)):
-                        cell.number_format = '0.00'
-                    cell.alignment = center_alignment
-            data_ws.column_dimensions['A'].width = 25
-            for col in range(2, 2 + len(process_names)):
-                data_ws.column_dimensions[chr(64 + col)].width = 18
-
-        # 2. 创建统计汇总工作表（确保统计信息保存）
-        stats_ws = wb.create_sheet(title="统计汇总")
-        stats_ws.append(["进程名", "最大值 (MB)", "最小值 (MB)", "平均值 (MB)", "3σ值 (MB)"])
-
-        # 计算并写入统计值
-        for proc_name in process_names:
-            if proc_name in self.process_data and self.process_data[proc_name]:
-                df = pd.DataFrame(self.process_data[proc_name])
-                df['Memory_MB'] = df['Memory_Bytes'] / (1024 * 1024)
-                memory_values = df['Memory_MB'].values
-
-                max_val = np.max(memory_values) if len(memory_values) > 0 else 0
-                min_val = np.min(memory_values) if len(memory_values) > 0 else 0
-                avg_val = np.mean(memory_values) if len(memory_values) > 0 else 0
-                std_val = np.std(memory_values, ddof=1) if len(memory_values) >= 2 else 0  # 样本标准差
-                sigma3_val = 3 * std_val
-
-                stats_ws.append([
-                    proc_name,
-                    round(max_val, 2),
-                    round(min_val, 2),
-                    round(avg_val, 2),
-                    round(sigma3_val, 2)
-                ])
-
-        # 设置统计表格格式
-        for row in stats_ws.iter_rows(min_row=2, max_row=stats_ws.max_row, min_col=2, max_col=5):
-            for cell in row:
-                cell.alignment = Alignment(horizontal='center')
-        stats_ws.column_dimensions['A'].width = 15
-        for col in ['B', 'C', 'D', 'E']:
-            stats_ws.column_dimensions[col].width = 12
-
-        # 生成图表
-        current_row = len(summary_df) + 3 if summary_data else 1
-        merge_chart_inserted = False
-        if self.merge_var.get() and self.merge_target_listbox.size() > 0:
-            merge_procs = [self.merge_target_listbox.get(i) for i in range(self.merge_target_listbox.size())]
-            if merge_procs:
-                fig, ax = plt.subplots(figsize=(12, 6))
-                colors = ['blue', 'green', 'red', 'purple', 'orange', 'brown', 'pink', 'gray']
-                color_idx = 0
-                for proc_name in merge_procs:
-                    if proc_name in self.process_data and self.process_data[proc_name]:
-                        df = pd.DataFrame(self.process_data[proc_name])
-                        df['Memory_MB'] = df['Memory_Bytes'] / (1024 * 1024)
-                        ax.plot(df['Timestamp'], df['Memory_MB'], marker='o', linestyle='-',
-                                label=proc_name, color=colors[color_idx % len(colors)])
-                        color_idx += 1
-                ax.set_title('多进程内存使用对比（合并图表）')
-                ax.set_xlabel('时间')
-                ax.set_ylabel('内存使用 (MB)')
-                ax.legend()
-                max_ticks = min(10, len(df)) if 'df' in locals() else 5
-                ax.xaxis.set_major_locator(plt.MaxNLocator(max_ticks))
-                ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
-                plt.xticks(rotation=45, ha='right')
-                plt.tight_layout()
-                img_data = BytesIO()
-                fig.savefig(img_data, format='png')
-                img_data.seek(0)
-                img = Image(img_data)
-                img.width = 800
-                img.height = 400
-                data_ws.add_image(img, f'A{current_row}')
-                current_row += 30
-                plt.close(fig)
-                merge_chart_inserted = True
-
-        if not merge_chart_inserted:
-            current_row = len(summary_df) + 3 if summary_data else 1
+        if self.report_thread is not None and self.report_thread.is_alive():
+            return
+        engine = self.engine
+        if engine is not None:
+            store = None  # 在后台线程中由engine.report_store()读取
+            jitter = engine.jitter_summary()
         else:
-            current_row += 5
-
-        for proc_name in process_names:
-            if proc_name in self.process_data and self.process_data[proc_name]:
-                df = pd.DataFrame(self.process_data[proc_name])
-                df['Memory_MB'] = df['Memory_Bytes'] / (1024 * 1024)
-                fig, ax = plt.subplots(figsize=(10, 4))
-                ax.plot(df['Timestamp'], df['Memory_MB'], marker='o', linestyle='-', color='blue')
-                ax.set_title(f'{proc_name} 内存使用趋势')
-                ax.set_xlabel('时间')
-                ax.set_ylabel('内存使用 (MB)')
-                max_ticks = min(10, len(df))
-                ax.xaxis.set_major_locator(plt.MaxNLocator(max_ticks))
-                ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
-                plt.xticks(rotation=45, ha='right')
-                plt.tight_layout()
-                img_data = BytesIO()
-                fig.savefig(img_data, format='png')
-                img_data.seek(0)
-                img = Image(img_data)
-                img.width = 600
-                img.height = 300
-                data_ws.add_image(img, f'A{current_row}')
-                current_row += 20
-                plt.close(fig)
-
-        try:
-            wb.save(excel_path)
-            messagebox.showinfo("成功", f"报告已生成：\n{excel_path}")
-            self.status_var.set("报告生成完成")
-        except Exception as e:
-            messagebox.showerror("错误", f"保存报告失败：{str(e)}")
+            store = self.process_data  # 打开的会话文件
+            jitter = None
+        leaks = self.leaks
+        profiler = self.profiler
+        extra = {}
+        label = None
+        if self.engine is not None:
+            extra = {"instances": self.engine.instances, "instance_info": dict(self.engine.instance_info),
+                     "metrics": self.engine.metrics}
+            label = self.engine.label
+        merge_procs = []
+        if self.merge_var.get():
+            merge_procs = list(self.merge_target_listbox.get(0, tk.END))
+        chart_mode = self.chart_mode.get()
+
+        # 读取会话文件、写表格和绘图（进程池）都放到后台线程，界面保持响应
+        result = {}
+
+        def build():
+            start = time.perf_counter()
+            try:
+                from report import write_report, report_file_name  # openpyxl只在生成报告时导入（后台线程中）
+
+                # 长时间监控时从会话文件载入全部数据，耗时与会话长度成正比
+                data = engine.report_store() if engine is not None else store
+                result["path"] = write_report(self.save_path, data, merge_names=merge_procs, jitter=jitter,
+                                              leaks=leaks, profiler=profiler, chart_mode=chart_mode,
+                                              file_name=report_file_name(label), **extra)
+            except Exception as e:
+                result["error"] = e
+            if profiler is not None:
+                profiler.record(STAGE_REPORT, time.perf_counter() - start)
+
+        self.status_var.set("正在生成报告...")
+        self.report_thread = threading.Thread(target=build, daemon=True)
+        self.report_thread.start()
+        self._poll_report(result)
+
+    def _poll_report(self, result):
+        if self.report_thread.is_alive():
+            self.root.after(REPORT_POLL_INTERVAL_MS, self._poll_report, result)
+            return
+        self._refresh_profile()
+        if "error" in result:
+            messagebox.showerror("错误", f"保存报告失败：{str(result['error'])}")
+            return
+        messagebox.showinfo("成功", f"报告已生成：\n{result['path']}")
+        self.status_var.set("报告生成完成")
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后的独立采样进程需要
     root = tk.Tk()
 
     # ---------------------- 添加图标设置代码 ----------------------
@@ -0,0 +1,202 @@
+"""命令行/无界面监控：不导入tkinter，可在无显示器的CI/压测机上运行
+
+示例：python monitor_cli.py app.exe helper.exe -d 3600 -i 1 -o ./reports
+     python monitor_cli.py app.exe -d 600 -i 0.5 --add-session svc.exe,db.exe 60 86400  # 同时运行多个会话
+     python monitor_cli.py -d 3600 --listen 47800  # 只接收各机器上remote_agent.py发来的样本
+"""
+import argparse
+import functools
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+
+from collectors import available_modes, DEFAULT_MODE
+from leak_detector import LEAK_SLOPE_MB_H
+from monitor_engine import MonitorEngine
+from process_metrics import available_metrics
+from profiler import StageProfiler
+from remote_protocol import DEFAULT_PORT, parse_address
+from report_charts import CHART_MODES, DEFAULT_CHART_MODE
+from scheduler import MIN_INTERVAL
+from shared_scheduler import SharedScheduler
+
+# 退出码
+EXIT_OK = 0
+EXIT_NO_DATA = 1  # 未采集到任何进程的内存（进程名不匹配或进程未运行）
+EXIT_USAGE = 2  # 参数错误（与argparse一致）
+EXIT_IO_ERROR = 3  # 会话文件或报告写入失败
+EXIT_LEAK = 4  # 指定--fail-on-leak且有进程判定为疑似泄漏
+EXIT_LISTEN_ERROR = 5  # --listen指定的远程采集端口无法监听（被占用或无权限）
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="多进程内存监控（命令行模式）")
+    parser.add_argument("names", nargs="*", help="监控的进程名，如 app.exe（使用--listen时可省略）")
+    parser.add_argument("-d", "--duration", type=float, required=True, help="监控时长（秒）")
+    parser.add_argument("-i", "--interval", type=float, default=1.0, help="采样间隔（秒），默认1")
+    parser.add_argument("-o", "--output", default=os.getcwd(), help="报告和会话文件的保存目录，默认当前目录")
+    parser.add_argument("--collector", choices=available_modes(), default=DEFAULT_MODE, help="采集方式")
+    parser.add_argument("--capacity", type=int, default=0, help="每个进程保留的样本上限，0为不限")
+    parser.add_argument("--merge", nargs="+", default=[], metavar="NAME", help="生成合并对比图表的进程")
+    parser.add_argument("--chart", choices=CHART_MODES, default=DEFAULT_CHART_MODE, help="报告图表类型")
+    parser.add_argument("--process-mode", action="store_true", help="在独立子进程中采样")
+    parser.add_argument("--per-pid", action="store_true", help="按PID细分同名进程的各个实例")
+    parser.add_argument("--metrics", nargs="+", default=[], choices=available_metrics(), help="同时采集的附加指标")
+    parser.add_argument("--listen", nargs="?", const=str(DEFAULT_PORT), metavar="[HOST:]PORT",
+                        help=f"同时作为远程采集端接收采样代理的数据，默认端口{DEFAULT_PORT}")
+    parser.add_argument("--no-session", action="store_true", help="不保存会话文件")
+    parser.add_argument("--no-index", action="store_true", help="不保存到运行索引（用于compare_runs.py对比）")
+    parser.add_argument("--label", help="运行标签（如版本号），对比时可代替运行ID")
+    parser.add_argument("--add-session", nargs=3, action="append", default=[], metavar=("NAMES", "INTERVAL", "DURATION"),
+                        help="同时运行的另一个会话：逗号分隔的进程名、采样间隔和时长（秒），可重复指定")
+    parser.add_argument("--no-report", action="store_true", help="不生成Excel报告")
+    parser.add_argument("--leak-slope", type=float, default=LEAK_SLOPE_MB_H,
+                        help=f"判定为疑似泄漏的增长趋势（MB/小时），默认{LEAK_SLOPE_MB_H:g}")
+    parser.add_argument("--fail-on-leak", action="store_true", help=f"有进程疑似泄漏时以退出码{EXIT_LEAK}结束")
+    parser.add_argument("--profile", action="store_true", help="统计本工具自身的开销并写入报告")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不输出采样状态")
+    args = parser.parse_args(argv)
+    if args.duration <= 0 or args.interval < MIN_INTERVAL or args.interval > args.duration:
+        parser.error(f"时长须为正数，间隔不小于{MIN_INTERVAL}秒且不大于时长")
+    if args.capacity < 0:
+        parser.error("样本上限不能为负数")
+    if not os.path.isdir(args.output):
+        parser.error(f"保存目录不存在：{args.output}")
+    if not args.names and not args.listen:
+        parser.error("请指定监控的进程名或--listen")
+    if args.listen:
+        try:
+            args.listen = parse_address(args.listen, default_host="0.0.0.0")
+        except ValueError:
+            parser.error(f"无效的监听地址：{args.listen}")
+    if args.add_session and args.process_mode:
+        parser.error("独立采样进程模式不支持多个会话")
+    sessions = [(args.names, args.interval, args.duration)]
+    for names, interval, duration in args.add_session:
+        names = [name for name in names.split(",") if name]
+        try:
+            interval, duration = float(interval), float(duration)
+        except ValueError:
+            parser.error(f"无效的会话参数：{interval} {duration}")
+        if not names or duration <= 0 or interval < MIN_INTERVAL or interval > duration:
+            parser.error(f"无效的会话：进程名不能为空，时长须为正数，间隔不小于{MIN_INTERVAL}秒且不大于时长")
+        sessions.append((names, interval, duration))
+    args.sessions = sessions
+    return args
+
+
+def _session_label(args, i):
+    """只有一个会话时不加标签（文件名与以往一致）"""
+    if len(args.sessions) == 1:
+        return None
+    return f"{args.label}_会话{i + 1}" if args.label else f"会话{i + 1}"
+
+
+def _print_summary(engine, prefix):
+    for name, series in engine.store.items():
+        if series:
+            slope, steps, verdict = engine.leaks.summary(name)
+            print(f"{prefix}{name}：{verdict}（趋势 {slope} MB/h，阶跃 {steps} 次）")
+    if engine.instances is not None:
+        for label, series in engine.instances.items():
+            if series:
+                slope, steps, verdict = engine.leaks.summary(label)
+                print(f"{prefix}  {label}：{verdict}（趋势 {slope} MB/h，阶跃 {steps} 次）")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # 多个会话共用一个调度线程，同一时刻到期的采样合并为一次进程表遍历
+    shared = SharedScheduler() if len(args.sessions) > 1 else None
+
+    def on_sample(engine):
+        if not args.quiet:
+            prefix = f"[{engine.label}] " if engine.label else ""
+            print(f"\r{prefix}{engine.status()}", end="", file=sys.stderr, flush=True)
+
+    def on_alert(name, message):
+        print(f"\n告警：{message}", file=sys.stderr, flush=True)
+
+    engines = []
+    for i, (names, interval, duration) in enumerate(args.sessions):
+        engine = MonitorEngine(
+            names, duration, interval, args.collector, args.capacity or None,
+            save_path=args.output, session=not args.no_session, process_mode=args.process_mode,
+            on_alert=on_alert, leak_slope=args.leak_slope,
+            profiler=StageProfiler() if args.profile else None, per_pid=args.per_pid, metrics=args.metrics,
+            shared=shared, label=_session_label(args, i), listen=args.listen if i == 0 else None)
+        engine.on_sample = functools.partial(on_sample, engine)
+        engines.append(engine)
+    started = []
+    for engine in engines:
+        try:
+            engine.start()
+        except (sqlite3.Error, ValueError, OSError) as e:
+            # 已启动的会话照常收尾：等待采样线程结束、关闭会话文件（标记为已完成）
+            for running in started:
+                running.stop()
+                running.wait()
+            if isinstance(e, sqlite3.Error):
+                print(f"创建会话文件失败：{e}", file=sys.stderr)
+                return EXIT_IO_ERROR
+            if isinstance(e, OSError):
+                print(f"远程采集端口监听失败：{e}", file=sys.stderr)
+                return EXIT_LISTEN_ERROR
+            print(e, file=sys.stderr)
+            return EXIT_USAGE
+        started.append(engine)
+
+    # Ctrl+C / SIGTERM：提前结束监控，照常保存已采集的数据
+    def request_stop(signum, frame):
+        for engine in engines:
+            engine.request_stop()
+
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, request_stop)
+    for engine in engines:
+        engine.wait()
+        engine.stop()
+    if not args.quiet:
+        print(file=sys.stderr)
+    for host, names, rows, dropped, connects, online in engines[0].remote_summary:
+        print(f"远程 {host}：{'、'.join(names)}，接收 {rows} 行，代理丢弃 {dropped} 行，连接 {connects} 次",
+              file=sys.stderr)
+    if shared is not None:
+        print(f"共享调度：{shared.ticks} 次采样合并为 {shared.scans} 次进程表遍历", file=sys.stderr)
+
+    # 未匹配到的进程每次采样记为0
+    if not any(series and engine.store.stats[name].max > 0
+               for engine in engines for name, series in engine.store.items()):
+        print("未采集到任何进程的内存，请检查进程名", file=sys.stderr)
+        return EXIT_NO_DATA
+    exit_code = EXIT_OK
+    for engine in engines:
+        prefix = f"[{engine.label}] " if engine.label else ""
+        _print_summary(engine, prefix)
+        if engine.session_file:
+            print(f"{prefix}会话文件：{engine.session_file}")
+        if not args.no_index:
+            try:
+                print(f"{prefix}运行ID：{engine.save_run(args.label if engine.label is None else None)}")
+            except (OSError, sqlite3.Error) as e:
+                print(f"{prefix}保存到运行索引失败：{e}", file=sys.stderr)
+                exit_code = EXIT_IO_ERROR
+        if not args.no_report:
+            try:
+                print(f"{prefix}报告已生成：{engine.write_report(args.merge, args.chart)}")
+            except (OSError, sqlite3.Error) as e:
+                print(f"{prefix}保存报告失败：{e}", file=sys.stderr)
+                exit_code = EXIT_IO_ERROR
+        if engine.profiler is not None:
+            print(f"{prefix}工具自身开销：\n{engine.profiler.summary_text()}", file=sys.stderr)
+    if exit_code == EXIT_OK and args.fail_on_leak and any(engine.leaks.leaking() for engine in engines):
+        return EXIT_LEAK
+    return exit_code
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后的独立采样进程需要
+    sys.exit(main())
@@ -0,0 +1,295 @@
+import threading
+import time
+from datetime import datetime
+
+from collectors import create_collector, DEFAULT_MODE
+from leak_detector import LeakMonitor, LEAK_SLOPE_MB_H
+from remote_collector import RemoteCollector
+from profiler import STAGE_LEAK, STAGE_READ, STAGE_REPORT, STAGE_SCAN, STAGE_SESSION
+from report_charts import DEFAULT_CHART_MODE
+from run_index import RunIndex, index_dir
+from sample_store import SampleStore
+from sampler import ProcessSampler
+from scheduler import TickScheduler, format_jitter
+from session_log import SessionWriter, SessionReader, session_path
+from shm_sampler import SamplerProcess
+
+PROCESS_POLL_INTERVAL = 0.2  # 独立采样进程模式下读取共享内存的间隔（秒）
+
+
+class MonitorEngine:
+    """与界面无关的监控引擎：采样（线程或独立进程）、样本存储、会话文件和报告
+
+    不依赖tkinter/TkAgg，界面和命令行共用。回调on_sample/on_finish/on_alert在线程模式下
+    由采样线程调用，在独立进程模式下由poll()的调用方线程调用。
+    样本同时送入LeakMonitor做在线泄漏分析（趋势斜率、阶跃检测）。
+    传入profiler（StageProfiler）时记录各阶段耗时，不传则不做任何计时包装。
+    per_pid/metrics启用按进程实例细分和附加指标（仅线程模式），分别存入instances和metrics。
+    传入shared（SharedScheduler）时线程模式不单独起采样线程，由共享调度器与其他会话合并采样；
+    label区分同时运行的多个会话（会话文件名、报告文件名和运行索引标签）。
+    listen=(主机, 端口)时同时作为远程采集端，采样代理发来的样本以 主机:进程名 写入同一存储，
+    在采样线程（独立进程模式下为poll的调用方）中写入，图表、统计、泄漏分析和报告与本机进程一致。
+    """
+
+    def __init__(self, names, duration, interval, collector_mode=DEFAULT_MODE, capacity=None,
+                 save_path=None, session=True, process_mode=False, on_sample=None, on_finish=None,
+                 on_alert=None, leak_slope=LEAK_SLOPE_MB_H, profiler=None, per_pid=False, metrics=(),
+                 shared=None, label=None, listen=None):
+        self.names = list(names)
+        self._name_set = set(self.names)
+        self.duration = duration
+        self.interval = interval
+        self.collector_mode = collector_mode
+        self.save_path = save_path
+        self.process_mode = process_mode
+        self.on_sample = on_sample
+        self.on_finish = on_finish
+        self.label = label
+        self.listen = listen
+        self.remote = None  # RemoteCollector
+        self.remote_summary = []  # 结束时各代理的接收情况，见RemoteCollector.summary
+        self.shared = shared
+        self.session_file = session_path(save_path, datetime.now(), label) if session else None
+        self.session_writer = None
+        self.scheduler = None  # TickScheduler或SamplerProcess，提供抖动统计
+        self.sampler_process = None
+        self.monitor_thread = None
+        self.monitoring = False
+        self.stop_event = threading.Event()
+        self._done = threading.Event()  # 共享调度模式下会话已收尾
+        self.leaks = LeakMonitor(leak_slope, on_alert=on_alert)
+        self.store = SampleStore(self.names, capacity, sinks=[self.leaks])
+        self.per_pid = per_pid
+        # 按进程实例细分的内存序列（同样做泄漏分析），序列名为 进程名[pid]
+        self.instances = SampleStore(capacity=capacity, sinks=[self.leaks]) if per_pid else None
+        self.instance_info = {}  # {实例序列名: (进程名, pid, 启动时间)}
+        self.metrics = {metric: SampleStore(capacity=capacity) for metric in metrics}  # {指标: SampleStore}
+        self.profiler = profiler
+        self._mode = collector_mode
+        self._scan_cost = 0.0
+
+    def start(self):
+        """开始采样；会话文件创建失败抛出sqlite3.Error，参数不支持或监控进程数超限抛出ValueError，
+        远程采集端口无法监听抛出OSError"""
+        if self.process_mode and (self.per_pid or self.metrics):
+            raise ValueError("独立采样进程模式不支持按PID细分和附加指标")
+        if self.session_file:
+            self.session_writer = SessionWriter(self.session_file, meta={
+                "names": self.names,
+                "duration": self.duration,
+                "interval": self.interval,
+                "collector": self.collector_mode,
+                "listen": self.listen,
+            })
+            self.store.sinks.append(self.session_writer)
+        if self.listen is not None:
+            try:
+                self.remote = RemoteCollector(*self.listen)
+            except OSError:
+                self._close_session()
+                raise
+        if self.profiler is not None:
+            self.profiler.instrument_store(self.store)
+            self.profiler.wrap(self.leaks, "append", STAGE_LEAK)
+            if self.session_writer is not None:
+                self.profiler.wrap(self.session_writer, "flush", STAGE_SESSION)
+        self.monitoring = True
+        if self.remote is not None:
+            self.remote.start()
+
+        if self.process_mode:
+            try:
+                self.sampler_process = SamplerProcess(self.names, self.duration, self.interval, self.collector_mode)
+            except ValueError:
+                self.monitoring = False
+                self._close_session()
+                raise
+            self.scheduler = self.sampler_process
+            self.sampler_process.start()
+            return
+
+        self.stop_event.clear()
+        self._done.clear()
+        if self.shared is not None:
+            self.scheduler = self.shared.add(self)
+            return
+        self.scheduler = TickScheduler(self.interval, sleep=self.stop_event.wait)
+        self.monitor_thread = threading.Thread(
+            target=self._run, args=(create_collector(self.collector_mode),), daemon=True)
+        self.monitor_thread.start()
+
+    def _run(self, collector):
+        # 每个采样周期只遍历一次进程表，仅读取匹配进程的内存
+        sampler = ProcessSampler(self.store.keys(), collector, self.per_pid, self.metrics)
+        self.instance_info = sampler.instance_info
+        if self.profiler is not None:
+            self.profiler.instrument_sampler(sampler)
+        self._mode = f"{sampler.collector.backend} {sampler.collector.metric.upper()}"
+        # 按截止时间调度，采集耗时不会累积到采样周期中
+        for _ in self.scheduler.ticks(self.duration, lambda: self.monitoring):
+            self._record(SampleStore.to_ns(datetime.now()), sampler.sample(), sampler)
+        sampler.close()
+        self._finish()
+
+    def _record(self, timestamp_ns, values, sampler, collect_cost=None):
+        """保存一次采样结果；collect_cost不为None表示由共享调度器采样，
+        sampler读取的是多个会话进程的并集，只取属于本会话的部分（扫描、读取耗时由调度器按合并后的采样记录）"""
+        instance_values = sampler.instance_values
+        metric_values = sampler.metric_values
+        if collect_cost is not None:
+            self._mode = f"共享调度 {sampler.collector.backend} {sampler.collector.metric.upper()}"
+            self.instance_info = sampler.instance_info
+            values = {name: values[name] for name in self.names}
+            # sampler的实例是所有会话进程的并集：只保留本会话进程的，本会话未按PID细分时一个也不保留
+            info = sampler.instance_info
+            instance_values = {label: value for label, value in instance_values.items()
+                               if info[label][0] in self._name_set} if self.instances is not None else {}
+            metric_values = {metric: {key: value for key, value in metric_values[metric].items()
+                                      if key in self._name_set or key in instance_values}
+                             for metric in self.metrics}
+        self.store.append_ns(timestamp_ns, values)
+        if self.instances is not None:
+            self.instances.append_ns(timestamp_ns, instance_values)
+        for metric, values in metric_values.items():
+            self.metrics[metric].append_ns(timestamp_ns, values)
+        if self.remote is not None:
+            self.remote.drain(self.store)
+        if self.profiler is not None:
+            self.profiler.track_rss()
+        self._scan_cost = sampler.last_scan_cost
+        if self.on_sample:
+            self.on_sample()
+
+    def _finish(self):
+        """采样结束（时长到达或请求停止）后收尾"""
+        self._close_session()
+        if self.monitoring:
+            self.monitoring = False
+            if self.on_finish:
+                self.on_finish()
+        self._done.set()
+
+    def poll(self):
+        """独立采样进程模式：从共享内存读取新样本，采样进程结束后收尾；返回是否仍在监控"""
+        if self.sampler_process is None:
+            return self.monitoring
+        remote_rows = self.remote.drain(self.store) if self.remote is not None else 0
+        if self.sampler_process.drain(self.store) or remote_rows:
+            self._scan_cost, collect_cost = self.sampler_process.costs()
+            if self.profiler is not None:
+                # 采样子进程内的耗时：每次读取时取最近一个周期的值
+                self.profiler.record(STAGE_SCAN, self._scan_cost)
+                self.profiler.record(STAGE_READ, collect_cost)
+                self.profiler.track_rss()
+            if self.on_sample:
+                self.on_sample()
+        if self.sampler_process.is_alive():
+            return True
+        # 采样进程已按时长结束
+        self._close_sampler_process()
+        self.monitoring = False
+        if self.on_finish:
+            self.on_finish()
+        return False
+
+    def wait(self):
+        """阻塞直到监控结束（时长到达或request_stop()）"""
+        if self.monitor_thread is not None:
+            while self.monitor_thread.is_alive():
+                self.monitor_thread.join(PROCESS_POLL_INTERVAL)  # 分段等待，主线程可及时处理信号
+        elif self.shared is not None and not self.process_mode and self.scheduler is not None:
+            while not self._done.wait(PROCESS_POLL_INTERVAL):
+                pass
+        while self.monitoring and self.poll():
+            time.sleep(PROCESS_POLL_INTERVAL)
+
+    def request_stop(self):
+        """只设置停止标志（可在信号处理函数中调用），随后由stop()收尾"""
+        self.monitoring = False
+        self.stop_event.set()
+        if self.shared is not None:
+            self.shared.wake()
+
+    def stop(self):
+        self.request_stop()
+        if self.sampler_process is not None:
+            self._close_sampler_process()
+
+    def add(self, name):
+        """监控过程中追加进程（仅独立进程模式支持）"""
+        if self.sampler_process is not None:
+            self.sampler_process.add(name)
+
+    def remove(self, name):
+        if self.sampler_process is not None:
+            self.sampler_process.remove(name)
+
+    def _close_sampler_process(self):
+        sampler_process, self.sampler_process = self.sampler_process, None
+        sampler_process.stop()
+        sampler_process.drain(self.store)
+        sampler_process.close()
+        self._close_session()
+
+    def _close_session(self):
+        remote, self.remote = self.remote, None
+        if remote is not None:
+            remote.drain(self.store)  # 连接关闭前写入并确认已接收的批
+            remote.close()
+            remote.drain(self.store)  # 关闭过程中放入队列的批（未确认，代理仍保留）
+            self.remote_summary = remote.summary()
+        session_writer, self.session_writer = self.session_writer, None
+        if session_writer is not None:
+            self.store.sinks.remove(session_writer)
+            session_writer.close()
+
+    def status(self):
+        """状态栏显示的采样状态"""
+        mode = "独立采样进程" if self.process_mode else self._mode
+        jitter = format_jitter(self.scheduler.jitter_summary()) if self.scheduler is not None else ""
+        if self.remote is not None:
+            mode = f"{mode}，{self.remote.status()}"
+        return f"监控中...（{mode}，遍历 {self._scan_cost * 1000:.1f} ms，{jitter}）"
+
+    def jitter_summary(self):
+        return self.scheduler.jitter_summary() if self.scheduler is not None else None
+
+    def report_store(self):
+        """报告数据源：环形缓冲区已丢弃旧样本时，从会话文件读取完整数据（不降采样）"""
+        session_writer = self.session_writer
+        if session_writer is not None:
+            session_writer.flush()  # 采样线程可能尚未关闭会话文件
+        store = self.store
+        if self.session_file and any(series.total_count > len(series) for series in store.values()):
+            reader = SessionReader(self.session_file)
+            store = reader.to_store(max_points=None)
+            reader.close()
+        return store
+
+    def write_report(self, merge_names=(), chart_mode=DEFAULT_CHART_MODE):
+        from report import write_report, report_file_name  # openpyxl只在生成报告时导入
+
+        start = time.perf_counter()
+        path = write_report(self.save_path, self.report_store(), merge_names=merge_names,
+                            jitter=self.jitter_summary(), leaks=self.leaks, profiler=self.profiler,
+                            instances=self.instances, instance_info=self.instance_info, metrics=self.metrics,
+                            chart_mode=chart_mode, file_name=report_file_name(self.label))
+        if self.profiler is not None:
+            self.profiler.record(STAGE_REPORT, time.perf_counter() - start)
+        return path
+
+    def save_run(self, label=None, root=None):
+        """把本次监控保存到运行索引（默认在保存路径下的监控记录目录），返回运行ID；
+        标签默认为会话标签"""
+        index = RunIndex(root or index_dir(self.save_path))
+        try:
+            return index.add_run(self.report_store(), meta={
+                "names": self.names,
+                "duration": self.duration,
+                "interval": self.interval,
+                "collector": self._mode,
+                "session_file": self.session_file,
+                "jitter": self.jitter_summary(),
+            }, leaks=self.leaks, label=label or self.label)
+        finally:
+            index.close()
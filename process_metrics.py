@@ -0,0 +1,56 @@
+import sys
+
+import psutil
+
+from stats import BYTES_PER_MB
+
+# 可选附加指标（只在启用时采集）：显示名 -> 单位换算（报告/界面显示值 = 原值 / scale）
+METRIC_VMS = "VMS"
+METRIC_THREADS = "线程数"
+METRIC_HANDLES = "句柄数" if sys.platform == "win32" else "文件描述符数"
+METRIC_PAGE_FAULTS = "缺页次数"
+METRIC_SCALES = {
+    METRIC_VMS: BYTES_PER_MB,
+    METRIC_THREADS: 1,
+    METRIC_HANDLES: 1,
+    METRIC_PAGE_FAULTS: 1,
+}
+METRIC_UNITS = {METRIC_VMS: "MB", METRIC_THREADS: "个", METRIC_HANDLES: "个", METRIC_PAGE_FAULTS: "次（累计）"}
+
+
+def _page_faults(proc):
+    if sys.platform == "win32":
+        return proc.memory_info().num_page_faults
+    # Linux: /proc/[pid]/stat 第10、12个字段为minflt、majflt（进程名可能含空格，从')'之后解析）
+    with open(f"/proc/{proc.pid}/stat", "rb") as f:
+        fields = f.read().rpartition(b")")[2].split()
+    return int(fields[7]) + int(fields[9])
+
+
+def _handles(proc):
+    return proc.num_handles() if sys.platform == "win32" else proc.num_fds()
+
+
+_READERS = {
+    METRIC_VMS: lambda proc: proc.memory_info().vms,
+    METRIC_THREADS: lambda proc: proc.num_threads(),
+    METRIC_HANDLES: _handles,
+    METRIC_PAGE_FAULTS: _page_faults,
+}
+
+
+def available_metrics():
+    """当前平台支持的附加指标"""
+    metrics = [METRIC_VMS, METRIC_THREADS, METRIC_HANDLES]
+    if sys.platform == "win32" or sys.platform.startswith("linux"):
+        metrics.append(METRIC_PAGE_FAULTS)
+    return metrics
+
+
+def read_metrics(proc, metrics):
+    """读取单个进程的一组附加指标，返回 {指标: 数值}；进程已退出或无权限时返回空字典"""
+    try:
+        with proc.oneshot():
+            return {metric: _READERS[metric](proc) for metric in metrics}
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, OSError):
+        return {}
@@ -0,0 +1,87 @@
+from bisect import bisect_left, insort
+
+import psutil
+
+REBUILD_RATIO = 0.25  # 变化超过视图的该比例时整体重建，而不是逐项增删
+
+
+def snapshot_process_names():
+    """遍历一次进程表，返回进程名集合（可在后台线程中调用）"""
+    names = set()
+    for proc in psutil.process_iter(['name']):
+        name = proc.info['name']
+        if name:
+            names.add(name)
+    return names
+
+
+class ProcessCatalog:
+    """可用进程名目录：有序列表 + 过滤视图，按进程表快照增量更新，与界面无关
+
+    - update()与上一次快照做集合差，只对增删的名称做二分插入/删除，返回视图的逐项变更，
+      界面据此增删列表框中的对应行（选中状态不受影响）
+    - filter()按子串过滤（不区分大小写），新条件是上一次条件的延伸时只在上次结果中筛选
+    """
+
+    def __init__(self):
+        self.names = []  # 全部进程名（排序）
+        self.view = []  # 当前过滤结果（保持排序）
+        self.query = ""  # 当前过滤条件（已casefold）
+        self._keys = {}  # {进程名: casefold后的名称}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._keys
+
+    def _matches(self, name):
+        return self.query in self._keys[name]
+
+    def update(self, names):
+        """应用新快照，返回视图变更 [("delete", 下标) 或 ("insert", 下标, 名称), ...]（按顺序执行）；
+        变化较多时返回None，表示应整体重建视图"""
+        names = set(names)
+        removed = [name for name in self._keys if name not in names]
+        added = sorted(name for name in names if name not in self._keys)
+        if not removed and not added:
+            return []
+        for name in added:
+            self._keys[name] = name.casefold()
+        if len(removed) + len(added) > max(len(self.names), 1) * REBUILD_RATIO:
+            for name in removed:
+                del self._keys[name]
+            self.names = sorted(names)
+            self.view = [name for name in self.names if self._matches(name)]
+            return None
+
+        ops = []
+        for name in sorted(removed, reverse=True):
+            del self.names[bisect_left(self.names, name)]
+            if self._matches(name):
+                index = bisect_left(self.view, name)
+                del self.view[index]
+                ops.append(("delete", index))
+            del self._keys[name]
+        for name in added:
+            insort(self.names, name)
+            if self._matches(name):
+                index = bisect_left(self.view, name)
+                self.view.insert(index, name)
+                ops.append(("insert", index, name))
+        return ops
+
+    def filter(self, query):
+        """设置过滤条件，返回过滤后的视图"""
+        query = query.strip().casefold()
+        candidates = self.view if self.query and query.startswith(self.query) else self.names
+        self.query = query
+        self.view = [name for name in candidates if self._matches(name)] if query else list(self.names)
+        return self.view
+
+    def first_prefix_match(self):
+        """视图中第一个以过滤条件开头的名称的下标，没有则为0"""
+        for index, name in enumerate(self.view):
+            if self._keys[name].startswith(self.query):
+                return index
+        return 0
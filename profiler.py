@@ -0,0 +1,187 @@
+import functools
+import os
+import time
+
+import psutil
+
+from stats import BYTES_PER_MB
+
+# 各阶段名称（界面/报告显示顺序）
+STAGE_SCAN = "进程扫描"
+STAGE_READ = "指标读取"
+STAGE_APPEND = "样本追加"  # 含统计更新和sink转发
+STAGE_STATS = "统计更新"
+STAGE_LEAK = "泄漏分析"
+STAGE_SESSION = "会话写入"
+STAGE_CHART = "图表重绘"
+STAGE_REPORT = "报告生成"
+STAGES = (STAGE_SCAN, STAGE_READ, STAGE_APPEND, STAGE_STATS, STAGE_LEAK, STAGE_SESSION, STAGE_CHART, STAGE_REPORT)
+
+CHILDREN_REFRESH = 5.0  # 跟踪峰值RSS时子进程列表的刷新间隔（秒），列出子进程需遍历进程表
+HISTOGRAM_BUCKETS = 32  # 第i个桶为 [2^(i-1), 2^i) 微秒，最后一桶约35分钟以上
+
+
+class LatencyHistogram:
+    """以2为底的对数分桶耗时直方图，每次记录O(1)，分位数按桶上界估计"""
+
+    def __init__(self):
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        index = min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)
+        self.buckets[index] += 1
+
+    def percentile(self, p):
+        """秒；取所在桶的上界（不超过最大值）"""
+        if not self.count:
+            return 0.0
+        rank = p * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min((1 << index) / 1e6, self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class StageProfiler:
+    """监控工具自身的开销：各阶段耗时直方图、自身（及采样子进程）的RSS和CPU时间
+
+    通过instrument*把计时包装到对象实例的方法上；不创建StageProfiler（剖析关闭）时
+    不做任何包装，热点路径没有额外开销。uninstrument()恢复原方法。
+    """
+
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.process = psutil.Process(os.getpid())
+        self.started = time.monotonic()
+        self.peak_rss = 0  # 每个采样周期由track_rss()更新
+        self._tracked_children = []
+        self._children_listed = None
+        self._cpu_start = self._cpu_times()
+        self._wrapped = []  # [(对象, 方法名)]
+
+    def record(self, stage, seconds):
+        self.histograms[stage].add(seconds)
+
+    def wrap(self, obj, method, stage):
+        """把obj.method替换为计时包装（只影响该实例）"""
+        original = getattr(obj, method)
+        histogram = self.histograms[stage]
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                histogram.add(time.perf_counter() - start)
+
+        setattr(obj, method, timed)
+        self._wrapped.append((obj, method))
+
+    def uninstrument(self):
+        """移除本剖析器加的所有计时包装（实例属性），恢复类上的方法"""
+        for obj, method in reversed(self._wrapped):
+            obj.__dict__.pop(method, None)
+        self._wrapped = []
+
+    def instrument_sampler(self, sampler):
+        self.wrap(sampler, "scan", STAGE_SCAN)
+        self.wrap(sampler.collector, "read", STAGE_READ)
+
+    def instrument_store(self, store):
+        """样本追加、各序列统计更新（包括之后新增的序列）"""
+        self.wrap(store, "append_ns", STAGE_APPEND)
+        self.wrap(store, "extend", STAGE_APPEND)
+        for stats in store.stats.values():
+            self.wrap(stats, "add", STAGE_STATS)
+        add_series = store.add_series
+
+        def add_series_instrumented(name):
+            is_new = name not in store
+            series = add_series(name)
+            if is_new:
+                self.wrap(store.stats[name], "add", STAGE_STATS)
+            return series
+
+        store.add_series = add_series_instrumented
+        self._wrapped.append((store, "add_series"))
+
+    def _cpu_times(self):
+        """本进程及子进程（独立采样进程）的CPU时间之和（秒）"""
+        total = 0.0
+        for proc in [self.process] + self._children():
+            try:
+                times = proc.cpu_times()
+                total += times.user + times.system
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total
+
+    def _children(self):
+        try:
+            return self.process.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return []
+
+    def track_rss(self):
+        """读取当前RSS（含子进程）并更新峰值，返回当前RSS（字节）；在采样路径上每个周期调用"""
+        now = time.monotonic()
+        if self._children_listed is None or now - self._children_listed >= CHILDREN_REFRESH:
+            self._tracked_children = self._children()
+            self._children_listed = now
+        rss = 0
+        for proc in [self.process] + self._tracked_children:
+            try:
+                rss += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def process_summary(self):
+        """自身资源占用：RSS（含子进程）、峰值RSS（按采样周期跟踪）、CPU时间、平均CPU占用率"""
+        self._children_listed = None  # 汇总时重新列出子进程
+        rss = self.track_rss()
+        cpu = self._cpu_times() - self._cpu_start
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "rss_mb": rss / BYTES_PER_MB,
+            "peak_rss_mb": self.peak_rss / BYTES_PER_MB,
+            "cpu_seconds": cpu,
+            "cpu_percent": cpu / elapsed * 100,
+        }
+
+    def stage_rows(self, ndigits=3):
+        """[[阶段, 次数, 平均(ms), P50(ms), P95(ms), P99(ms), 最大(ms), 合计(s)], ...]，只含有记录的阶段"""
+        rows = []
+        for stage, histogram in self.histograms.items():
+            if not histogram.count:
+                continue
+            rows.append([stage, histogram.count]
+                        + [round(v * 1000, ndigits) for v in (histogram.mean, histogram.percentile(0.5),
+                                                             histogram.percentile(0.95), histogram.percentile(0.99),
+                                                             histogram.max)]
+                        + [round(histogram.total, ndigits)])
+        return rows
+
+    def summary_text(self):
+        """界面面板显示的简短文本"""
+        process = self.process_summary()
+        lines = [f"RSS {process['rss_mb']:.1f} MB（峰值 {process['peak_rss_mb']:.1f}），"
+                 f"CPU {process['cpu_seconds']:.1f} s（{process['cpu_percent']:.1f}%）"]
+        for stage, count, mean, p50, p95, p99, max_ms, total in self.stage_rows(ndigits=2):
+            lines.append(f"{stage}: 平均 {mean} ms，P95 {p95} ms，最大 {max_ms} ms（{count}次）")
+        return "\n".join(lines)
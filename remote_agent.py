@@ -0,0 +1,279 @@
+"""采样代理：在被测机器上采样进程内存，按批发送给采集端（monitor_cli.py --listen 或界面中的远程采集端口）
+
+示例：
+    python remote_agent.py server.exe -c 192.168.1.10:47800 -i 1
+    python remote_agent.py python -c 127.0.0.1:47800 --host-name 节点A -d 600  # 本机多个代理时用不同主机名
+"""
+import argparse
+import collections
+import json
+import signal
+import socket
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from collectors import available_modes, create_collector, DEFAULT_MODE
+from remote_protocol import (MSG_ACK, MSG_HELLO, MSG_WELCOME, encode_batch, pack_json, parse_address,
+                             read_message, unpack_ack)
+from sample_store import SampleStore
+from sampler import ProcessSampler
+from scheduler import MIN_INTERVAL, TickScheduler
+
+BATCH_INTERVAL = 2.0  # 每批最多积累的时长（秒），批越大单样本开销越小
+MAX_PENDING_ROWS = 100000  # 未确认的行数上限，采集端不可达时超出则丢弃最旧的批
+SEND_WINDOW = 8  # 未确认的批数上限（背压：采集端处理不过来时代理不再继续发送）
+CONNECT_TIMEOUT = 5.0
+RETRY_MIN, RETRY_MAX = 0.5, 30.0  # 重连间隔（秒），失败后按倍数增加
+FLUSH_TIMEOUT = 10.0  # 结束时等待剩余批被确认的时长上限
+
+EXIT_OK = 0
+EXIT_USAGE = 2
+
+
+class RemoteAgent:
+    """采集行 -> 封批 -> 发送线程按序发送，收到确认后释放
+
+    采样线程只做采样和封批（差分+zlib，一批一次），发送在单独线程中进行，网络阻塞不影响采样时刻。
+    断线后按指数退避重连，重连时采集端告知已确认的批序号，从其后续传。
+    """
+
+    def __init__(self, address, names, interval, collector_mode=DEFAULT_MODE, host_name=None,
+                 batch_interval=BATCH_INTERVAL, max_pending_rows=MAX_PENDING_ROWS, window=SEND_WINDOW):
+        self.address = address
+        self.names = list(names)
+        self.interval = interval
+        self.collector_mode = collector_mode
+        self.host_name = host_name or socket.gethostname()
+        self.agent_id = uuid.uuid4().hex
+        self.batch_interval = batch_interval
+        self.max_pending_rows = max_pending_rows
+        self.window = window
+        self.pending = collections.deque()  # 未确认的批 [(批序号, 行数, 消息)]
+        self.pending_rows = 0
+        self.seq = 0  # 最近封装的批序号
+        self.acked = 0  # 采集端确认的最大批序号
+        self.dropped = 0  # 因缓冲满丢弃的行数（累计，随每一批发给采集端）
+        self.samples = 0
+        self.bytes_sent = 0
+        self.connects = 0
+        self.connected = False
+        self.last_error = ""
+        self.scheduler = None
+        self._rows = []  # 当前批 [(时间戳ns, [各进程内存])]
+        self._batch_start = None
+        self._cond = threading.Condition()
+        self._stopping = threading.Event()
+        self._sock = None
+        self._sender = None
+        self._sent = 0  # 本次连接已发送的最大批序号
+
+    # 采样线程
+    def add_row(self, timestamp_ns, values):
+        """追加一行（各进程内存，顺序与names一致），积累满一批时封批"""
+        self._rows.append((timestamp_ns, values))
+        self.samples += 1
+        now = time.monotonic()
+        if self._batch_start is None:
+            self._batch_start = now
+        if now - self._batch_start >= self.batch_interval:
+            self.seal()
+
+    def seal(self):
+        """把当前积累的行封装为一批交给发送线程"""
+        if not self._rows:
+            return
+        rows, self._rows, self._batch_start = self._rows, [], None
+        timestamps = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        values = np.array([row[1] for row in rows], dtype=np.int64).reshape(len(rows), len(self.names))
+        with self._cond:
+            self.pending_rows += len(rows)
+            # 缓冲超限时丢弃最旧的未发送批（保留最新数据，已发送的批仍可能被确认）
+            while self.pending_rows > self.max_pending_rows:
+                index = self._unsent_index()
+                if index >= len(self.pending):
+                    break
+                _, n, _ = self.pending[index]
+                del self.pending[index]
+                self.pending_rows -= n
+                self.dropped += n
+            self.seq += 1
+            self.pending.append((self.seq, len(rows), encode_batch(self.seq, timestamps, values, self.dropped)))
+            self._cond.notify_all()
+
+    def _unsent_index(self):
+        """pending中第一个未发送的批的下标（之前的都是已发送未确认的批，不超过窗口大小）"""
+        for index, item in enumerate(self.pending):
+            if item[0] > self._sent:
+                return index
+        return len(self.pending)
+
+    def run(self, duration=float("inf")):
+        """采样直到时长到达或stop()，结束时等待剩余的批发送完毕"""
+        sampler = ProcessSampler(self.names, create_collector(self.collector_mode))
+        self.scheduler = TickScheduler(self.interval, sleep=self._stopping.wait)
+        self.start_sender()
+        try:
+            for _ in self.scheduler.ticks(duration, lambda: not self._stopping.is_set()):
+                values = sampler.sample()
+                self.add_row(SampleStore.to_ns(datetime.now()), [values[name] for name in self.names])
+        finally:
+            sampler.close()
+            self.seal()
+            self.close()
+
+    def stop(self):
+        """请求结束（可在信号处理函数中调用）"""
+        self._stopping.set()
+
+    # 发送线程
+    def start_sender(self):
+        self._sender = threading.Thread(target=self._send_loop, daemon=True)
+        self._sender.start()
+
+    def _send_loop(self):
+        retry = RETRY_MIN
+        while not (self._stopping.is_set() and not self.pending):
+            try:
+                self._session()
+                retry = RETRY_MIN
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+            finally:
+                self.connected = False
+                with self._cond:
+                    self._sent = self.acked  # 断开后未确认的批都需要重发
+                sock, self._sock = self._sock, None
+                if sock is not None:
+                    sock.close()
+            if self._stopping.is_set() and not self.pending:
+                return
+            time.sleep(retry)
+            retry = min(retry * 2, RETRY_MAX)
+
+    def _session(self):
+        """一次连接：握手、续传未确认的批、按窗口发送新批"""
+        sock = self._sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = sock.makefile("rb")
+        sock.sendall(pack_json(MSG_HELLO, {"agent_id": self.agent_id, "host": self.host_name, "names": self.names,
+                                           "interval": self.interval, "clock_ns": SampleStore.to_ns(datetime.now())}))
+        message = read_message(stream)
+        if message is None or message[0] != MSG_WELCOME:
+            raise ValueError("采集端握手失败")
+        self._ack(json.loads(message[1])["acked"])
+        sock.settimeout(None)
+        self.connected = True
+        self.connects += 1
+        reader = threading.Thread(target=self._read_acks, args=(stream,), daemon=True)
+        reader.start()
+        with self._cond:
+            self._sent = self.acked
+        while True:
+            with self._cond:
+                while True:
+                    if not reader.is_alive():
+                        raise OSError("连接已断开")
+                    index = self._unsent_index()
+                    if index < len(self.pending) and index < self.window:
+                        break
+                    if self._stopping.is_set() and not self.pending:
+                        return
+                    self._cond.wait(0.5)
+                batch = self.pending[index]
+                self._sent = batch[0]
+            sock.sendall(batch[2])
+            self.bytes_sent += len(batch[2])
+
+    def _read_acks(self, stream):
+        try:
+            while True:
+                message = read_message(stream)
+                if message is None:
+                    break
+                if message[0] == MSG_ACK:
+                    self._ack(unpack_ack(message[1]))
+        except (OSError, ValueError):
+            pass
+        with self._cond:
+            self._cond.notify_all()
+
+    def _ack(self, seq):
+        with self._cond:
+            self.acked = max(self.acked, seq)
+            while self.pending and self.pending[0][0] <= self.acked:
+                _, n, _ = self.pending.popleft()
+                self.pending_rows -= n
+            self._cond.notify_all()
+
+    def close(self, timeout=FLUSH_TIMEOUT):
+        """停止采样，等待剩余的批被确认（最多timeout秒）后断开"""
+        self._stopping.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._sender is not None:
+            self._sender.join(timeout)
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def status(self):
+        state = "已连接" if self.connected else f"未连接（{self.last_error}）" if self.last_error else "连接中"
+        return (f"{state}，已采样 {self.samples} 行，待确认 {self.pending_rows} 行，丢弃 {self.dropped} 行，"
+                f"已发送 {self.bytes_sent / 1024:.1f} KB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="内存采样代理：把本机进程内存发送给采集端")
+    parser.add_argument("names", nargs="+", help="监控的进程名")
+    parser.add_argument("-c", "--connect", required=True, help="采集端地址 主机:端口")
+    parser.add_argument("-i", "--interval", type=float, default=1.0, help="采样间隔（秒），默认1")
+    parser.add_argument("-d", "--duration", type=float, default=0, help="采样时长（秒），0为直到Ctrl+C")
+    parser.add_argument("--collector", choices=available_modes(), default=DEFAULT_MODE, help="采集方式")
+    parser.add_argument("--host-name", help="序列名中的主机名，默认为本机名")
+    parser.add_argument("--batch", type=float, default=BATCH_INTERVAL, help=f"每批积累的时长（秒），默认{BATCH_INTERVAL:g}")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING_ROWS, help="采集端不可达时缓冲的行数上限")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不输出发送状态")
+    args = parser.parse_args(argv)
+    try:
+        args.address = parse_address(args.connect)
+    except ValueError:
+        parser.error(f"无效的采集端地址：{args.connect}")
+    if args.interval < MIN_INTERVAL or args.duration < 0 or args.batch < 0 or args.max_pending < 1:
+        parser.error(f"间隔不小于{MIN_INTERVAL}秒，时长、批时长不能为负数，缓冲上限至少为1")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    agent = RemoteAgent(args.address, args.names, args.interval, args.collector, args.host_name,
+                        args.batch, args.max_pending)
+
+    def request_stop(signum, frame):
+        agent.stop()
+
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, request_stop)
+
+    def report_status():
+        while not agent._stopping.wait(args.batch or 1.0):
+            print(f"\r{agent.status()}", end="", file=sys.stderr, flush=True)
+
+    if not args.quiet:
+        threading.Thread(target=report_status, daemon=True).start()
+    agent.run(args.duration or float("inf"))
+    if not args.quiet:
+        print(f"\r{agent.status()}", file=sys.stderr)
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
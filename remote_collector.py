@@ -0,0 +1,192 @@
+import json
+import queue
+import socket
+import socketserver
+import threading
+from datetime import datetime
+
+from remote_protocol import (MSG_BATCH, MSG_HELLO, MSG_WELCOME, decode_batch, pack_ack, pack_json,
+                             read_message, series_name)
+from sample_store import SampleStore
+
+QUEUE_BATCHES = 256  # 已接收未写入存储的批数上限，写满后停止读取连接（TCP背压传到代理）
+PUT_TIMEOUT = 0.5  # 队列满时分段等待，便于关闭时退出
+
+
+class _AgentState:
+    """一个代理（按agent_id区分，重连后沿用）的接收状态"""
+
+    def __init__(self, agent_id, host, names, interval):
+        self.agent_id = agent_id
+        self.host = host  # 序列名中的主机标签（同名主机追加#2、#3）
+        self.names = names
+        self.interval = interval
+        self.series = [series_name(host, name) for name in names]
+        self.last_seq = 0  # 已写入存储（并确认）的最大批序号
+        self.queued_seq = 0  # 已放入写入队列的最大批序号
+        self.connection = None  # 最新连接，drain()写入后经它发送确认
+        self.receive_lock = threading.Lock()  # 同一代理的多个连接（重连时短暂重叠）按序放入队列
+        self.offset_ns = 0  # 本机时间 - 代理时间
+        self.active = 0  # 当前连接数（旧连接尚未断开时可能短暂为2）
+        self.connects = 0
+        self.rows = 0
+        self.dropped = 0  # 代理报告的因缓冲满丢弃的行数（累计值，取最大）
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        collector = self.server.collector
+        collector._connections.add(self.connection)
+        try:
+            message = read_message(self.rfile)
+            if message is None or message[0] != MSG_HELLO:
+                return
+            agent = collector._connect(json.loads(message[1]))
+            try:
+                with collector._lock:
+                    self.wfile.write(pack_json(MSG_WELCOME, {"acked": agent.last_seq, "host": agent.host}))
+                    agent.connection = self.connection
+                while not collector.closed:
+                    message = read_message(self.rfile)
+                    if message is None:
+                        return
+                    kind, payload = message
+                    if kind == MSG_BATCH and not collector._receive(agent, payload):
+                        return
+            finally:
+                with collector._lock:
+                    agent.active -= 1
+                    if agent.connection is self.connection:
+                        agent.connection = None
+        except (OSError, ValueError, KeyError) as e:
+            if not collector.closed:
+                collector.errors += 1
+                collector.last_error = str(e)
+        finally:
+            collector._connections.discard(self.connection)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class RemoteCollector:
+    """采集端：接收多个代理（remote_agent.py）的批量样本，以 主机:进程名 为序列名写入SampleStore
+
+    每个连接一个接收线程，解码后的批放入有界队列；drain()由引擎的采样线程（或poll的调用方）
+    调用，写入存储的始终只有一个线程。队列写满时接收线程阻塞、不再读取连接，背压经TCP传到代理。
+    批序号按agent_id去重，代理断线重连后从已确认的位置续传，不会重复写入。
+    确认由drain()在批写入存储后发送，采集端在写入前退出时未确认的批仍留在代理的缓冲中。
+    """
+
+    def __init__(self, host="0.0.0.0", port=0, queue_size=QUEUE_BATCHES):
+        self.queue = queue.Queue(queue_size)
+        self.agents = {}  # {agent_id: _AgentState}
+        self.closed = False
+        self.errors = 0
+        self.last_error = ""
+        self._lock = threading.Lock()
+        self._connections = set()
+        self._server = _Server((host, port), _Handler)  # 端口被占用时抛出OSError
+        self._server.collector = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.2,), daemon=True)
+        self._thread.start()
+
+    def _connect(self, hello):
+        with self._lock:
+            agent = self.agents.get(hello["agent_id"])
+            if agent is None:
+                used = {state.host for state in self.agents.values()}
+                host = hello["host"]
+                n = 1
+                while host in used:
+                    n += 1
+                    host = f"{hello['host']}#{n}"
+                agent = self.agents[hello["agent_id"]] = _AgentState(
+                    hello["agent_id"], host, list(hello["names"]), hello.get("interval"))
+                # 时钟偏差只在首次连接时估计，重连后沿用，续传的样本与之前的衔接
+                agent.offset_ns = SampleStore.to_ns(datetime.now()) - int(hello["clock_ns"])
+            agent.active += 1
+            agent.connects += 1
+        return agent
+
+    def _receive(self, agent, payload):
+        """解码一批放入队列（重发的已入队批直接忽略）；关闭中返回False"""
+        seq, dropped, timestamps, values = decode_batch(payload)
+        if values.shape[1] != len(agent.series):
+            raise ValueError(f"{agent.host} 的批序列数与HELLO不一致")
+        item = (agent, seq, timestamps + agent.offset_ns, values, dropped)
+        # 检查序号与放入队列在同一把锁内：重连时旧连接可能尚未断开，同一批不会入队两次，且按序号顺序入队
+        with agent.receive_lock:
+            if seq <= agent.queued_seq:
+                return True  # 重连后重发的已接收批，写入后由drain()确认
+            while True:
+                if self.closed:
+                    return False
+                try:
+                    self.queue.put(item, timeout=PUT_TIMEOUT)
+                    break
+                except queue.Full:
+                    continue
+            agent.queued_seq = seq
+        return True
+
+    def drain(self, store):
+        """把已接收的批写入store，并向各代理确认已写入的批序号；返回写入的行数"""
+        rows = 0
+        written = {}  # {agent_id: _AgentState}
+        while True:
+            try:
+                agent, seq, timestamps, values, dropped = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            for i, name in enumerate(agent.series):
+                store.extend(name, timestamps, values[:, i])
+            agent.rows += len(timestamps)
+            agent.dropped = max(agent.dropped, dropped)
+            agent.last_seq = max(agent.last_seq, seq)
+            written[agent.agent_id] = agent
+            rows += len(timestamps)
+        for agent in written.values():
+            self._ack(agent)
+        return rows
+
+    def _ack(self, agent):
+        """每个代理每次drain只确认一次（确认是累计的）；连接已断开时代理重连后由WELCOME得知"""
+        with self._lock:
+            connection = agent.connection
+            if connection is None:
+                return
+            try:
+                connection.sendall(pack_ack(agent.last_seq))
+            except OSError:
+                pass
+
+    def status(self):
+        connected = sum(agent.active > 0 for agent in list(self.agents.values()))
+        return f"远程 {connected}/{len(self.agents)} 台"
+
+    def summary(self):
+        """[(主机, 进程名列表, 已接收行数, 丢弃行数, 连接次数, 是否在线), ...]"""
+        return [(agent.host, agent.names, agent.rows, agent.dropped, agent.connects, agent.active > 0)
+                for agent in list(self.agents.values())]
+
+    def close(self):
+        self.closed = True
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+        self._server.server_close()
+        for connection in list(self._connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)  # 唤醒阻塞在读取上的接收线程
+            except OSError:
+                pass
@@ -0,0 +1,95 @@
+"""代理与采集端之间的TCP协议
+
+每条消息为 头部(8字节) + 负载：
+- HELLO（代理->采集端，JSON）：agent_id、主机名、进程名列表、采样间隔、代理当前时间
+- WELCOME（采集端->代理，JSON）：该agent_id已确认的最大批序号，代理从其后续传
+- BATCH（代理->采集端）：批头 + zlib压缩的int64矩阵 [行, 1+序列数]（时间戳和各进程内存，
+  按行做差分编码，内存变化小时压缩率很高）
+- ACK（采集端->代理）：已写入存储的最大批序号（累计确认）；代理据此释放缓冲，并限制未确认的批数（背压）
+"""
+import json
+import struct
+import zlib
+
+import numpy as np
+
+DEFAULT_PORT = 47800
+VERSION = 1
+MSG_HELLO, MSG_WELCOME, MSG_BATCH, MSG_ACK = 1, 2, 3, 4
+MAX_PAYLOAD = 16 * 1024 * 1024  # 单条消息负载上限，防止错误数据导致超大分配
+HOST_SEPARATOR = ":"  # 远程序列名：主机:进程名
+
+_HEADER = struct.Struct("!2sBBI")  # 魔数, 版本, 消息类型, 负载长度
+_MAGIC = b"MI"
+_BATCH = struct.Struct("!QIHI")  # 批序号, 行数, 序列数, 代理累计因缓冲满丢弃的行数
+_ACK = struct.Struct("!Q")
+
+
+def pack_message(kind, payload=b""):
+    return _HEADER.pack(_MAGIC, VERSION, kind, len(payload)) + payload
+
+
+def pack_json(kind, obj):
+    return pack_message(kind, json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+
+def pack_ack(seq):
+    return pack_message(MSG_ACK, _ACK.pack(seq))
+
+
+def unpack_ack(payload):
+    return _ACK.unpack(payload)[0]
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) < size:
+        return None
+    return data
+
+
+def read_message(stream):
+    """从socket.makefile("rb")读取一条消息，返回 (类型, 负载)；连接关闭时返回None，格式错误抛出ValueError"""
+    header = _read_exact(stream, _HEADER.size)
+    if header is None:
+        return None
+    magic, version, kind, size = _HEADER.unpack(header)
+    if magic != _MAGIC or version != VERSION:
+        raise ValueError("不是本工具的采集协议或版本不一致")
+    if size > MAX_PAYLOAD:
+        raise ValueError(f"消息过大：{size} 字节")
+    payload = _read_exact(stream, size) if size else b""
+    if payload is None:
+        return None
+    return kind, payload
+
+
+def encode_batch(seq, timestamps_ns, values, dropped=0):
+    """timestamps_ns: int64[n]，values: int64[n, 序列数] -> BATCH消息"""
+    matrix = np.column_stack([np.asarray(timestamps_ns, dtype=np.int64), np.asarray(values, dtype=np.int64)])
+    delta = np.diff(matrix, axis=0, prepend=np.zeros((1, matrix.shape[1]), dtype=np.int64))
+    body = zlib.compress(delta.astype("<i8").tobytes(), 1)
+    return pack_message(MSG_BATCH, _BATCH.pack(seq, matrix.shape[0], matrix.shape[1] - 1, dropped) + body)
+
+
+def decode_batch(payload):
+    """BATCH负载 -> (批序号, 累计丢弃行数, 时间戳int64[n], 数值int64[n, 序列数])"""
+    seq, rows, n_series, dropped = _BATCH.unpack_from(payload)
+    data = zlib.decompress(payload[_BATCH.size:])
+    if len(data) != rows * (n_series + 1) * 8:
+        raise ValueError("批数据长度与行数不一致")
+    matrix = np.cumsum(np.frombuffer(data, dtype="<i8").reshape(rows, n_series + 1), axis=0, dtype=np.int64)
+    return seq, dropped, matrix[:, 0], matrix[:, 1:]
+
+
+def parse_address(text, default_host="127.0.0.1"):
+    """"主机:端口" 或 "端口" -> (主机, 端口)，格式错误抛出ValueError"""
+    host, _, port = text.rpartition(":")
+    port = int(port)
+    if not 0 <= port <= 65535:
+        raise ValueError(f"端口超出范围：{port}")
+    return host or default_host, port
+
+
+def series_name(host, name):
+    return f"{host}{HOST_SEPARATOR}{name}"
@@ -0,0 +1,407 @@
+import os
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.chart import LineChart, Reference
+from openpyxl.drawing.image import Image
+from openpyxl.styles import Alignment, NamedStyle
+from openpyxl.utils import get_column_letter
+
+from downsample import downsample, MARKER_LIMIT
+from live_chart import ns_to_datenum
+from report_charts import render_charts, CHART_PNG, DEFAULT_CHART_MODE
+from process_metrics import METRIC_SCALES, METRIC_UNITS
+from run_index import align_runs, stat_deltas, COMPARE_POINTS
+from sample_store import SampleStore
+from stats import BYTES_PER_MB
+
+REPORT_NAME = "内存监控报告.xlsx"
+COMPARE_REPORT_NAME = "内存对比报告_{}.xlsx"
+EXCEL_MAX_ROWS = 1048576
+SHEET_DATA_ROWS = EXCEL_MAX_ROWS - 1  # 每个数据表除表头外最多写入的行数
+CHART_DPI = 100  # 与matplotlib默认dpi一致，用于按图片像素宽度降采样
+NATIVE_CHART_POINTS = 2000  # 原生图表每条曲线的点数上限，数据更多时引用降采样后的"图表数据"表
+CM_PER_PX = 2.54 / 96  # 图表尺寸与PNG模式的像素尺寸保持一致
+CHART_COLORS = ['blue', 'green', 'red', 'purple', 'orange', 'brown', 'pink', 'gray']
+STATS_HEADERS = ["进程名", "最大值 (MB)", "最小值 (MB)", "平均值 (MB)", "3σ值 (MB)",
+                 "P50 (MB)", "P95 (MB)", "P99 (MB)"]
+LEAK_HEADERS = ["趋势 (MB/h)", "阶跃次数", "判定"]
+JITTER_FIELDS = [
+    ("采样次数", "ticks"),
+    ("错过的采样时刻", "missed"),
+    ("设定间隔 (ms)", "interval_ms"),
+    ("实际周期均值 (ms)", "period_avg_ms"),
+    ("实际周期标准差 (ms)", "period_std_ms"),
+    ("周期最大偏差 (ms)", "period_max_dev_ms"),
+    ("采集耗时均值 (ms)", "duration_avg_ms"),
+    ("采集耗时最大值 (ms)", "duration_max_ms"),
+]
+
+
+def pivot_series(store, names):
+    """按时间对齐各序列（一次向量化完成）：返回 (datetime64[us]时间, MB矩阵[行, 进程])，缺失为NaN"""
+    snapshots = [store[name].snapshot() for name in names]
+    if not snapshots:
+        return np.empty(0, dtype="datetime64[us]"), np.empty((0, 0))
+    all_ts = np.unique(np.concatenate([ts for ts, _ in snapshots]))
+    matrix = np.full((len(all_ts), len(names)), np.nan)
+    for col, (timestamps, values) in enumerate(snapshots):
+        matrix[np.searchsorted(all_ts, timestamps), col] = values / BYTES_PER_MB
+    return all_ts.view("datetime64[ns]").astype("datetime64[us]"), matrix
+
+
+def _register_styles(wb):
+    """整列共用的命名样式，写入时按列引用，避免逐个单元格设置格式"""
+    center = Alignment(horizontal='center', vertical='center')
+    styles = {
+        "report_center": NamedStyle(name="report_center", alignment=center),
+        "report_time": NamedStyle(name="report_time", alignment=center, number_format='yyyy-mm-dd hh:mm:ss'),
+        "report_mb": NamedStyle(name="report_mb", alignment=center, number_format='0.00'),
+    }
+    for style in styles.values():
+        wb.add_named_style(style)
+    return styles
+
+
+def _styled_row(ws, values, styles):
+    row = []
+    for value, style in zip(values, styles):
+        cell = WriteOnlyCell(ws, value)
+        if value is not None and style is not None:
+            cell.style = style
+        row.append(cell)
+    return row
+
+
+def _write_data_sheets(wb, names, timestamps, matrix, title="内存监控数据"):
+    """写入时间对齐后的数据；超过Excel行数上限时拆分到多个工作表，返回各工作表及其数据行数"""
+    headers = ['时间'] + list(names)
+    header_styles = ["report_center"] * len(headers)
+    row_styles = ["report_time"] + ["report_mb"] * len(names)
+    sheets = []
+    for part, start in enumerate(range(0, max(len(timestamps), 1), SHEET_DATA_ROWS)):
+        ws = wb.create_sheet(title=title if part == 0 else f"{title}{part + 1}")
+        ws.column_dimensions['A'].width = 25
+        for col in range(2, 2 + len(names)):
+            ws.column_dimensions[get_column_letter(col)].width = 18
+        ws.append(_styled_row(ws, headers, header_styles))
+
+        end = min(start + SHEET_DATA_ROWS, len(timestamps))
+        times = timestamps[start:end].tolist()
+        block = matrix[start:end]
+        rows = np.where(np.isnan(block), None, block.astype(object)).tolist()
+        for time_value, values in zip(times, rows):
+            ws.append(_styled_row(ws, [time_value] + values, row_styles))
+        sheets.append((ws, end - start))
+    return sheets
+
+
+def _write_stats_sheet(wb, store, names, leaks=None):
+    """统计汇总；提供leaks（LeakMonitor）时追加趋势斜率、阶跃次数和泄漏判定"""
+    headers = STATS_HEADERS + (LEAK_HEADERS if leaks is not None else [])
+    ws = wb.create_sheet(title="统计汇总")
+    ws.column_dimensions['A'].width = 15
+    for col in range(2, len(headers) + 1):
+        ws.column_dimensions[get_column_letter(col)].width = 12
+    ws.append(headers)
+    styles = [None] + ["report_center"] * (len(headers) - 1)
+    for name in names:
+        if store[name]:
+            row = [name] + store.stats[name].summary(scale=BYTES_PER_MB)
+            if leaks is not None:
+                row += leaks.summary(name)
+            ws.append(_styled_row(ws, row, styles))
+    return ws
+
+
+def _instance_labels(instances, instance_info, names):
+    """按进程名（报告顺序）、PID排列的实例序列名"""
+    order = {name: i for i, name in enumerate(names)}
+    labels = [label for label in instances.keys() if instances[label] and label in instance_info]
+    return sorted(labels, key=lambda label: (order.get(instance_info[label][0], len(order)),
+                                             instance_info[label][1], instance_info[label][2]))
+
+
+def _write_instance_stats_sheet(wb, instances, instance_info, labels, leaks=None):
+    """按进程实例（PID）细分的统计，用于定位多实例进程中具体是哪个实例增长"""
+    headers = ["进程名", "PID", "启动时间"] + STATS_HEADERS[1:] + (LEAK_HEADERS if leaks is not None else [])
+    ws = wb.create_sheet(title="进程实例统计")
+    ws.column_dimensions['A'].width = 15
+    ws.column_dimensions['C'].width = 20
+    for col in (2, *range(4, len(headers) + 1)):
+        ws.column_dimensions[get_column_letter(col)].width = 12
+    ws.append(headers)
+    styles = [None, "report_center", "report_time"] + ["report_center"] * (len(headers) - 3)
+    for label in labels:
+        name, pid, create_time = instance_info[label]
+        started = datetime.fromtimestamp(create_time) if create_time else None
+        row = [name, pid, started] + instances.stats[label].summary(scale=BYTES_PER_MB)
+        if leaks is not None:
+            row += leaks.summary(label)
+        ws.append(_styled_row(ws, row, styles))
+    return ws
+
+
+def _write_metrics_sheet(wb, metrics, names, labels):
+    """附加指标汇总：每个进程（及实例）每项指标的最新值、最大/最小/平均值"""
+    ws = wb.create_sheet(title="附加指标")
+    ws.column_dimensions['A'].width = 22
+    for col in range(2, 8):
+        ws.column_dimensions[get_column_letter(col)].width = 12
+    ws.append(["序列", "指标", "单位", "最新值", "最大值", "最小值", "平均值"])
+    styles = [None, None, None] + ["report_mb"] * 4
+    for series_name in list(names) + list(labels):
+        for metric, store in metrics.items():
+            if series_name not in store or not store[series_name]:
+                continue
+            scale = METRIC_SCALES[metric]
+            stats = store.stats[series_name]
+            row = [series_name, metric, METRIC_UNITS[metric], store[series_name].last()[1] / scale,
+                   stats.max / scale, stats.min / scale, stats.mean / scale]
+            ws.append(_styled_row(ws, row, styles))
+    return ws
+
+
+def _write_profile_sheet(wb, profiler):
+    """监控工具自身开销：进程资源占用和各阶段耗时分布"""
+    ws = wb.create_sheet(title="工具开销")
+    ws.column_dimensions['A'].width = 16
+    for col in range(2, 9):
+        ws.column_dimensions[get_column_letter(col)].width = 12
+    process = profiler.process_summary()
+    ws.append(["项目", "数值"])
+    ws.append(["RSS (MB)", round(process["rss_mb"], 2)])
+    ws.append(["峰值RSS (MB)", round(process["peak_rss_mb"], 2)])
+    ws.append(["CPU时间 (s)", round(process["cpu_seconds"], 2)])
+    ws.append(["平均CPU占用 (%)", round(process["cpu_percent"], 2)])
+    ws.append([])
+    ws.append(["阶段", "次数", "平均 (ms)", "P50 (ms)", "P95 (ms)", "P99 (ms)", "最大 (ms)", "合计 (s)"])
+    for row in profiler.stage_rows():
+        ws.append(row)
+    return ws
+
+
+def _write_jitter_sheet(wb, jitter):
+    ws = wb.create_sheet(title="采样抖动")
+    ws.column_dimensions['A'].width = 24
+    ws.column_dimensions['B'].width = 14
+    ws.append(["项目", "数值"])
+    for label, key in JITTER_FIELDS:
+        value = jitter[key]
+        ws.append([label, round(value, 3) if isinstance(value, float) else value])
+    return ws
+
+
+def chart_series(store, name, width_px):
+    """报告图表数据：按图片像素宽度降采样（保留峰值），返回 (matplotlib日期数值, MB) 两个紧凑数组"""
+    timestamps, values = store[name].snapshot()
+    timestamps, values = downsample(timestamps, values, width_px)
+    return ns_to_datenum(timestamps), values / BYTES_PER_MB
+
+
+def _chart_jobs(store, names, merge_names):
+    """生成绘图任务列表：[(任务, 图片宽, 图片高, 占用行数), ...]，顺序即嵌入顺序"""
+    jobs = []
+    merge_names = [name for name in merge_names if name in store and store[name]]
+    if merge_names:
+        figsize = (12, 6)
+        series = [(name, *chart_series(store, name, figsize[0] * CHART_DPI), CHART_COLORS[i % len(CHART_COLORS)])
+                  for i, name in enumerate(merge_names)]
+        jobs.append(({"title": '多进程内存使用对比（合并图表）', "figsize": figsize, "legend": True,
+                      "series": series}, 800, 400, 35))
+    for name in names:
+        if not store[name]:
+            continue
+        figsize = (10, 4)
+        series = [(name, *chart_series(store, name, figsize[0] * CHART_DPI), 'blue')]
+        jobs.append(({"title": f'{name} 内存使用趋势', "figsize": figsize, "series": series}, 600, 300, 20))
+    return jobs
+
+
+def _add_png_charts(ws, store, names, merge_names, first_row):
+    """图表在进程池中并行绘制（Agg后端），PNG按顺序嵌入工作表"""
+    jobs = _chart_jobs(store, names, merge_names)
+    pngs = render_charts([job for job, _, _, _ in jobs])
+    current_row = first_row
+    for (_, width, height, rows), png in zip(jobs, pngs):
+        img = Image(BytesIO(png))
+        img.width = width
+        img.height = height
+        ws.add_image(img, f'A{current_row}')
+        current_row += rows
+
+
+def _add_native_charts(wb, ws, store, names, merge_names, first_row, source=None):
+    """原生折线图：引用数据表source=(工作表, 数据行数)中的时间列和各进程列（第1行为表头），不渲染图片"""
+    if source is None:
+        # 数据太多：每个进程降采样后重新对齐，写入单独的"图表数据"表供图表引用
+        chart_store = SampleStore(names)
+        for name in names:
+            if store[name]:
+                timestamps, values = store[name].snapshot()
+                chart_store.extend(name, *downsample(timestamps, values, NATIVE_CHART_POINTS))
+        timestamps, matrix = pivot_series(chart_store, names)
+        source = _write_data_sheets(wb, names, timestamps, matrix, title="图表数据")[0]
+    source_ws, source_rows = source
+    columns = {name: col for col, name in enumerate(names, start=2)}
+    categories = Reference(source_ws, min_col=1, min_row=2, max_row=source_rows + 1)
+
+    def line_chart(title, chart_names, width, height):
+        chart = LineChart()
+        chart.title = title
+        chart.x_axis.title = '时间'
+        chart.y_axis.title = '内存使用 (MB)'
+        chart.x_axis.number_format = 'hh:mm:ss'
+        chart.x_axis.delete = False
+        chart.y_axis.delete = False
+        chart.display_blanks = 'span'  # 各进程采样时刻不同，空单元格连线而不是断开
+        chart.width = width * CM_PER_PX
+        chart.height = height * CM_PER_PX
+        for name in chart_names:
+            chart.add_data(Reference(source_ws, min_col=columns[name], min_row=1, max_row=source_rows + 1),
+                           titles_from_data=True)
+        chart.set_categories(categories)
+        for series in chart.series:
+            series.smooth = False
+            if source_rows > MARKER_LIMIT:
+                series.marker.symbol = "none"
+        if len(chart_names) == 1:
+            chart.legend = None
+        return chart
+
+    current_row = first_row
+    merge_names = [name for name in merge_names if name in store and store[name]]
+    if merge_names:
+        ws.add_chart(line_chart('多进程内存使用对比（合并图表）', merge_names, 800, 400), f'A{current_row}')
+        current_row += 35
+    for name in names:
+        if not store[name]:
+            continue
+        ws.add_chart(line_chart(f'{name} 内存使用趋势', [name], 600, 300), f'A{current_row}')
+        current_row += 20
+
+
+def report_file_name(label=None):
+    """多个会话同时监控时，报告文件名带上会话标签以免互相覆盖"""
+    return REPORT_NAME.replace(".xlsx", f"_{label}.xlsx") if label else REPORT_NAME
+
+
+def write_report(save_path, store, names=None, merge_names=(), jitter=None, leaks=None, profiler=None,
+                 instances=None, instance_info=None, metrics=None, chart_mode=DEFAULT_CHART_MODE,
+                 file_name=REPORT_NAME):
+    """生成内存监控报告（write-only模式流式写入），返回报告路径
+
+    instances/instance_info为按PID细分的实例序列及其 (进程名, pid, 启动时间)，
+    metrics为附加指标 {指标: SampleStore}，提供时分别写入单独的工作表。
+    """
+    names = list(store.keys()) if names is None else [name for name in names if name in store]
+    wb = Workbook(write_only=True)
+    _register_styles(wb)
+
+    timestamps, matrix = pivot_series(store, names)
+    sheets = _write_data_sheets(wb, names, timestamps, matrix)
+    _write_stats_sheet(wb, store, names, leaks)
+    labels = _instance_labels(instances, instance_info or {}, names) if instances is not None else []
+    if labels:
+        _write_instance_stats_sheet(wb, instances, instance_info, labels, leaks)
+        instance_ts, instance_matrix = pivot_series(instances, labels)
+        _write_data_sheets(wb, labels, instance_ts, instance_matrix, title="进程实例数据")
+    if metrics:
+        _write_metrics_sheet(wb, metrics, names, labels)
+    if jitter:
+        _write_jitter_sheet(wb, jitter)
+    if profiler is not None:
+        _write_profile_sheet(wb, profiler)
+
+    # 图表放在第一个数据表的数据下方
+    first_ws, first_rows = sheets[0]
+    chart_row = first_rows + 3 if first_rows else 1
+    if chart_mode == CHART_PNG:
+        _add_png_charts(first_ws, store, names, merge_names, chart_row)
+    else:
+        source = sheets[0] if len(sheets) == 1 and first_rows <= NATIVE_CHART_POINTS else None
+        _add_native_charts(wb, first_ws, store, names, merge_names, chart_row, source)
+
+    excel_path = os.path.join(save_path, file_name)
+    wb.save(excel_path)
+    return excel_path
+
+
+def write_comparison_report(save_path, runs, names=None, points=COMPARE_POINTS):
+    """多次运行的对比报告：运行信息、相对基线（第一个运行）的统计差异、按相对时间对齐的叠加曲线
+
+    runs为RunData列表（run_index.RunIndex.load），names默认取基线的全部序列，返回报告路径。
+    """
+    baseline = runs[0]
+    names = [name for name in (names or baseline.names()) if any(name in run.stats for run in runs)]
+    wb = Workbook(write_only=True)
+    _register_styles(wb)
+
+    ws = wb.create_sheet(title="运行信息")
+    for col, width in zip("ABCDEF", (24, 16, 20, 12, 10, 40)):
+        ws.column_dimensions[col].width = width
+    ws.append(["运行ID", "标签", "开始时间", "时长 (s)", "序列数", "监控进程"])
+    for run in runs:
+        started = np.datetime64(run.started, "ns").astype("datetime64[us]").tolist() if run.started else None
+        duration = round((run.finished - run.started) / 1e9, 1) if run.started else None
+        ws.append(_styled_row(ws, [run.id, run.label, started, duration, len(run.stats),
+                                   "、".join(run.meta.get("names", run.names()))],
+                              [None, None, "report_time", "report_center", "report_center", None]))
+
+    ws = wb.create_sheet(title="统计差异")
+    ws.column_dimensions['A'].width = 15
+    ws.column_dimensions['C'].width = 24
+    for col in "BDEFG":
+        ws.column_dimensions[col].width = 12
+    ws.append(["序列", "指标", "对比运行", "基线值", "对比值", "差值", "变化 (%)"])
+    delta_styles = [None, None, None] + ["report_mb"] * 3 + ["report_center"]
+    for run in runs[1:]:
+        for name, field, old, new, diff, change in stat_deltas(baseline, run):
+            if name in names:
+                ws.append(_styled_row(ws, [name, field, run.title, old, new, diff, change], delta_styles))
+
+    # 对齐数据：每个序列一组列（各运行一列），第一列为经过时间（分钟）
+    grid, aligned = align_runs(runs, names, points)
+    columns = [f"{name} | {run.title}" for name in names for run in runs]
+    n_rows = len(grid)
+    data = np.hstack([aligned[name] for name in names]) if names else np.empty((n_rows, 0))
+    minutes = grid / 60
+    ws_data = wb.create_sheet(title="对齐数据")
+    ws_data.column_dimensions['A'].width = 14
+    for col in range(2, 2 + len(columns)):
+        ws_data.column_dimensions[get_column_letter(col)].width = 22
+    ws_data.append(_styled_row(ws_data, ["经过时间 (分钟)"] + columns, ["report_center"] * (len(columns) + 1)))
+    row_styles = ["report_mb"] * (len(columns) + 1)
+    for minute, values in zip(minutes.tolist(), np.where(np.isnan(data), None, data.astype(object)).tolist()):
+        ws_data.append(_styled_row(ws_data, [round(minute, 3)] + values, row_styles))
+
+    ws_charts = wb.create_sheet(title="对比图表")
+    categories = Reference(ws_data, min_col=1, min_row=2, max_row=n_rows + 1)
+    for i, name in enumerate(names):
+        chart = LineChart()
+        chart.title = f'{name} 内存使用对比'
+        chart.x_axis.title = '经过时间 (分钟)'
+        chart.y_axis.title = '内存使用 (MB)'
+        chart.x_axis.number_format = '0'
+        chart.x_axis.delete = False
+        chart.y_axis.delete = False
+        chart.display_blanks = 'span'
+        chart.width = 800 * CM_PER_PX
+        chart.height = 400 * CM_PER_PX
+        first_col = 2 + i * len(runs)
+        chart.add_data(Reference(ws_data, min_col=first_col, max_col=first_col + len(runs) - 1,
+                                 min_row=1, max_row=n_rows + 1), titles_from_data=True)
+        chart.set_categories(categories)
+        for series in chart.series:
+            series.smooth = False
+            if n_rows > MARKER_LIMIT:
+                series.marker.symbol = "none"
+        ws_charts.add_chart(chart, f'A{1 + i * 35}')
+
+    suffix = f"{baseline.id}_vs_{runs[1].id}" + (f"等{len(runs) - 1}个" if len(runs) > 2 else "")
+    excel_path = os.path.join(save_path, COMPARE_REPORT_NAME.format(suffix))
+    wb.save(excel_path)
+    return excel_path
@@ -0,0 +1,64 @@
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from downsample import MARKER_LIMIT
+
+# 报告图表类型（不依赖matplotlib/openpyxl，界面和命令行启动时可直接导入）
+CHART_NATIVE = "Excel图表"  # openpyxl原生折线图，引用数据表区域，可在Excel中缩放
+CHART_PNG = "PNG图片"  # matplotlib渲染的图片
+CHART_MODES = (CHART_NATIVE, CHART_PNG)
+DEFAULT_CHART_MODE = CHART_NATIVE
+# 中文字体设置（子进程不会继承主进程修改过的rcParams）
+CHART_RC = {"font.family": ["SimHei", "Microsoft YaHei"], "axes.unicode_minus": False}
+PARALLEL_MIN_CHARTS = 4  # 图表数少于该值时直接在当前进程绘制，省去启动进程池的开销
+
+
+def render_chart(job):
+    """在Agg画布上绘制一张折线图，返回PNG字节
+
+    job: {"title", "figsize", "legend", "series": [(标签, 日期数值数组, MB数组, 颜色), ...]}
+    只使用Figure对象接口，不依赖pyplot全局状态，可在任意进程/线程中调用。
+    matplotlib在首次绘图时才导入（Excel原生图表模式和命令行启动不需要）。
+    """
+    import matplotlib
+    import matplotlib.dates as mdates
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import MaxNLocator
+
+    with matplotlib.rc_context(CHART_RC):
+        fig = Figure(figsize=job["figsize"])
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        max_points = 1
+        for label, x, y, color in job["series"]:
+            ax.plot(x, y, marker='o' if len(x) <= MARKER_LIMIT else '', linestyle='-', label=label, color=color)
+            max_points = max(max_points, len(x))
+        ax.set_title(job["title"])
+        ax.set_xlabel('时间')
+        ax.set_ylabel('内存使用 (MB)')
+        if job.get("legend"):
+            ax.legend()
+        ax.xaxis_date()
+        ax.xaxis.set_major_locator(MaxNLocator(min(10, max_points)))
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+        for tick_label in ax.get_xticklabels():
+            tick_label.set_rotation(45)
+            tick_label.set_horizontalalignment('right')
+        fig.tight_layout()
+        buf = BytesIO()
+        fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+def render_charts(jobs, workers=None):
+    """并行绘制多张图表，按jobs顺序返回PNG字节列表"""
+    jobs = list(jobs)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1 or len(jobs) < PARALLEL_MIN_CHARTS:
+        return [render_chart(job) for job in jobs]
+    # spawn：子进程不继承Tk/采样线程状态，各平台行为一致
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        return list(pool.map(render_chart, jobs))
@@ -0,0 +1,196 @@
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from stats import BYTES_PER_MB
+
+RUNS_DIR = "监控记录"  # 运行索引目录（位于报告保存路径下）
+INDEX_NAME = "runs.db"
+COMPARE_POINTS = 2000  # 对比时每条曲线对齐后的点数上限
+STAT_FIELDS = ("max_mb", "min_mb", "mean_mb", "sigma3_mb", "p50_mb", "p95_mb", "p99_mb")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY, label TEXT, started INTEGER, finished INTEGER, created REAL, meta TEXT
+);
+CREATE TABLE IF NOT EXISTS run_stats (
+    run_id TEXT, name TEXT, file TEXT, count INTEGER,
+    max_mb REAL, min_mb REAL, mean_mb REAL, sigma3_mb REAL, p50_mb REAL, p95_mb REAL, p99_mb REAL,
+    slope REAL, steps INTEGER, verdict TEXT,
+    PRIMARY KEY (run_id, name)
+);
+"""
+
+
+def index_dir(save_path):
+    return os.path.join(save_path, RUNS_DIR)
+
+
+class RunData:
+    """索引中的一次运行：元数据和预先计算的统计直接来自索引，序列按需内存映射（不读入内存）"""
+
+    def __init__(self, root, row, stats):
+        self.id, self.label, self.started, self.finished, self.created, meta = row
+        self.meta = json.loads(meta)
+        self.stats = stats  # {序列名: {count, max_mb, ..., slope, steps, verdict, file}}
+        self._dir = os.path.join(root, self.id)
+        self._series = {}
+
+    @property
+    def title(self):
+        return self.label or self.id
+
+    def names(self):
+        return list(self.stats)
+
+    def series(self, name):
+        """返回 (时间戳ns, 数值) 两个int64只读内存映射视图"""
+        data = self._series.get(name)
+        if data is None:
+            data = self._series[name] = np.load(os.path.join(self._dir, self.stats[name]["file"]), mmap_mode="r")
+        return data[0], data[1]
+
+    def elapsed(self, name):
+        """(距运行开始的秒数, MB)，用于不同运行之间按相对时间对齐"""
+        timestamps, values = self.series(name)
+        return (timestamps - self.started) / 1e9, values / BYTES_PER_MB
+
+
+class RunIndex:
+    """本地运行索引：每次监控以唯一ID保存，元数据和统计存于SQLite，序列存为.npy文件
+
+    目录结构：root/runs.db、root/<运行ID>/<序号>.npy（2×n int64，第0行时间戳、第1行数值）。
+    序列文件写完后才写入索引，中途失败的运行不会出现在列表中。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, INDEX_NAME))
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def new_id():
+        return f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}"
+
+    def add_run(self, store, meta=None, leaks=None, label=None):
+        """保存SampleStore中的全部序列，返回运行ID；leaks（LeakMonitor）提供时一并保存泄漏判定"""
+        run_id = self.new_id()
+        run_dir = os.path.join(self.root, run_id)
+        os.makedirs(run_dir)
+        rows = []
+        started = finished = None
+        try:
+            for i, (name, series) in enumerate(store.items()):
+                if not series:
+                    continue
+                timestamps, values = series.snapshot()
+                file_name = f"{i}.npy"
+                np.save(os.path.join(run_dir, file_name), np.stack([timestamps, values]))
+                started = int(timestamps[0]) if started is None else min(started, int(timestamps[0]))
+                finished = int(timestamps[-1]) if finished is None else max(finished, int(timestamps[-1]))
+                slope, steps, verdict = leaks.summary(name) if leaks is not None else (None, None, None)
+                rows.append((run_id, name, file_name, store.stats[name].count,
+                             *store.stats[name].summary(scale=BYTES_PER_MB), slope, steps, verdict))
+            with self._conn:
+                self._conn.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                                   (run_id, label, started, finished, time.time(),
+                                    json.dumps(meta or {}, ensure_ascii=False)))
+                self._conn.executemany(f"INSERT INTO run_stats VALUES ({', '.join('?' * 14)})", rows)
+        except BaseException:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            raise
+        return run_id
+
+    def runs(self):
+        """[(ID, 标签, 开始ns, 结束ns, 序列数), ...]，按保存时间排列"""
+        return self._conn.execute(
+            "SELECT r.id, r.label, r.started, r.finished, COUNT(s.name) FROM runs r "
+            "LEFT JOIN run_stats s ON s.run_id = r.id GROUP BY r.id ORDER BY r.created").fetchall()
+
+    def resolve(self, key):
+        """运行ID（可为唯一前缀）或标签 -> 运行ID，找不到或不唯一时抛出KeyError"""
+        matches = [row[0] for row in self._conn.execute(
+            "SELECT id FROM runs WHERE id LIKE ? ESCAPE '\\' OR label = ? ORDER BY created",
+            (key.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%", key))]
+        if key in matches:
+            return key
+        if len(matches) != 1:
+            raise KeyError(f"{'找不到' if not matches else '不唯一的'}运行：{key}")
+        return matches[0]
+
+    def load(self, key):
+        run_id = self.resolve(key)
+        row = self._conn.execute("SELECT id, label, started, finished, created, meta FROM runs WHERE id = ?",
+                                 (run_id,)).fetchone()
+        columns = ("file", "count") + STAT_FIELDS + ("slope", "steps", "verdict")
+        stats = {}
+        for name, *values in self._conn.execute(
+                f"SELECT name, {', '.join(columns)} FROM run_stats WHERE run_id = ? ORDER BY rowid", (run_id,)):
+            stats[name] = dict(zip(columns, values))
+        return RunData(self.root, row, stats)
+
+    def remove(self, key):
+        run_id = self.resolve(key)
+        with self._conn:
+            self._conn.execute("DELETE FROM run_stats WHERE run_id = ?", (run_id,))
+            self._conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+        shutil.rmtree(os.path.join(self.root, run_id), ignore_errors=True)
+
+    def close(self):
+        self._conn.close()
+
+
+def align_runs(runs, names, points=COMPARE_POINTS):
+    """把各运行中的同名序列按相对开始时间对齐到同一网格
+
+    网格间隔取 最长时长/points 与基线（第一个运行）采样间隔中的较大者；每个格内取最大值
+    （保留峰值），没有样本的格为NaN。返回 (经过秒数网格, {序列名: MB矩阵[格, 运行]})。
+    """
+    curves = {name: [run.elapsed(name) if name in run.stats else (np.empty(0), np.empty(0)) for run in runs]
+              for name in names}
+    span = max((elapsed[-1] for series in curves.values() for elapsed, _ in series if len(elapsed)), default=0.0)
+    step = span / max(points - 1, 1)
+    for series in curves.values():
+        base = series[0][0]
+        if len(base) > 1:
+            step = max(step, float(np.median(np.diff(base))))
+            break
+    if step <= 0:
+        step = 1.0
+    n = int(span // step) + 1
+    grid = np.arange(n) * step
+    aligned = {}
+    for name, series in curves.items():
+        matrix = aligned[name] = np.full((n, len(runs)), np.nan)
+        for col, (elapsed, values) in enumerate(series):
+            if not len(elapsed):
+                continue
+            cells = np.minimum((np.maximum(elapsed, 0) / step).astype(np.int64), n - 1)
+            starts = np.flatnonzero(np.concatenate([[True], np.diff(cells) != 0]))
+            matrix[cells[starts], col] = np.maximum.reduceat(values, starts)
+    return grid, aligned
+
+
+def stat_deltas(baseline, candidate, fields=(("max_mb", "最大值 (MB)"), ("mean_mb", "平均值 (MB)"),
+                                             ("p95_mb", "P95 (MB)"), ("p99_mb", "P99 (MB)"),
+                                             ("slope", "趋势 (MB/h)"))):
+    """两次运行同名序列的统计差异：[(序列, 指标, 基线值, 对比值, 差值, 变化%), ...]"""
+    rows = []
+    for name, base in baseline.stats.items():
+        other = candidate.stats.get(name)
+        if other is None:
+            continue
+        for field, title in fields:
+            old, new = base[field], other[field]
+            if old is None or new is None:
+                continue
+            change = (new - old) / abs(old) * 100 if old else None
+            rows.append((name, title, old, new, round(new - old, 2), None if change is None else round(change, 1)))
+    return rows
@@ -0,0 +1,171 @@
+import numpy as np
+
+from stats import StreamingStats
+
+
+class SeriesStore:
+    """单个序列的列式存储：int64时间戳(ns) + int64数值
+
+    capacity为None时数组按2倍几何扩容；指定capacity时为定长环形缓冲区，
+    每个样本同时写入 i 和 i+capacity 两处，任何时刻最近capacity个样本都是连续内存，
+    可直接返回零拷贝视图。
+    """
+
+    def __init__(self, capacity=None, initial_size=1024):
+        self.capacity = capacity
+        size = 2 * capacity if capacity else initial_size
+        self._ts = np.zeros(size, dtype=np.int64)
+        self._values = np.zeros(size, dtype=np.int64)
+        self._count = 0  # 已写入样本总数（环形模式下可能大于capacity）
+
+    def append(self, timestamp_ns, value):
+        n = self._count
+        if self.capacity:
+            pos = n % self.capacity
+            self._ts[pos] = self._ts[pos + self.capacity] = timestamp_ns
+            self._values[pos] = self._values[pos + self.capacity] = value
+        else:
+            if n == len(self._ts):
+                self._ts = np.concatenate([self._ts, np.zeros(n, dtype=np.int64)])
+                self._values = np.concatenate([self._values, np.zeros(n, dtype=np.int64)])
+            self._ts[n] = timestamp_ns
+            self._values[n] = value
+        self._count = n + 1
+
+    def extend(self, timestamps_ns, values):
+        """批量追加（向量化），timestamps_ns/values为等长数组"""
+        k = len(values)
+        if not k:
+            return
+        n = self._count
+        if self.capacity:
+            if k > self.capacity:
+                timestamps_ns, values = timestamps_ns[-self.capacity:], values[-self.capacity:]
+                n += k - self.capacity
+            pos = (n + np.arange(len(values))) % self.capacity
+            self._ts[pos] = self._ts[pos + self.capacity] = timestamps_ns
+            self._values[pos] = self._values[pos + self.capacity] = values
+        else:
+            if n + k > len(self._ts):
+                size = max(2 * len(self._ts), n + k)
+                self._ts = np.concatenate([self._ts[:n], np.zeros(size - n, dtype=np.int64)])
+                self._values = np.concatenate([self._values[:n], np.zeros(size - n, dtype=np.int64)])
+            self._ts[n:n + k] = timestamps_ns
+            self._values[n:n + k] = values
+        self._count += k
+
+    def __len__(self):
+        if self.capacity:
+            return min(self._count, self.capacity)
+        return self._count
+
+    @property
+    def total_count(self):
+        """累计写入样本数（含环形模式下已被覆盖的样本）"""
+        return self._count
+
+    def _window(self):
+        n = self._count
+        if self.capacity and n > self.capacity:
+            start = n % self.capacity
+            return start, start + self.capacity
+        return 0, n
+
+    def snapshot(self):
+        """返回 (时间戳视图, 数值视图)，两者长度一致，均为零拷贝"""
+        start, end = self._window()
+        return self._ts[start:end], self._values[start:end]
+
+    @property
+    def timestamps(self):
+        return self.snapshot()[0]
+
+    @property
+    def values(self):
+        return self.snapshot()[1]
+
+    def datetimes(self):
+        """时间戳的datetime64[ns]视图（零拷贝），可直接用于matplotlib/pandas"""
+        return self.timestamps.view("datetime64[ns]")
+
+    def last(self):
+        """最近一个样本 (时间戳ns, 数值)，无数据时返回None"""
+        if not self._count:
+            return None
+        start, end = self._window()
+        return int(self._ts[end - 1]), int(self._values[end - 1])
+
+    def to_frame(self):
+        """转换为 DataFrame(Timestamp, Memory_Bytes)；pandas只在调用时导入"""
+        import pandas as pd
+
+        ts, values = self.snapshot()
+        return pd.DataFrame({"Timestamp": ts.view("datetime64[ns]"), "Memory_Bytes": values})
+
+
+class SampleStore:
+    """多序列样本存储 {序列名: SeriesStore}，追加时同步更新各序列的增量统计
+
+    统计覆盖整个监控过程，环形缓冲区覆盖掉的旧样本仍计入统计。
+    sinks中的对象（如SessionWriter、LeakMonitor）提供相同的append/extend接口，追加的样本同时转发给它们。
+    """
+
+    def __init__(self, names=(), capacity=None, sinks=()):
+        self.capacity = capacity
+        self.sinks = list(sinks)
+        self.series = {}
+        self.stats = {}  # {序列名: StreamingStats}
+        for name in names:
+            self.add_series(name)
+
+    @staticmethod
+    def to_ns(timestamp):
+        """datetime -> int64纳秒（保持本地时间，与datetime64[ns]一致）"""
+        return int(np.datetime64(timestamp, "ns").astype(np.int64))
+
+    def add_series(self, name):
+        if name not in self.series:
+            self.series[name] = SeriesStore(self.capacity)
+            self.stats[name] = StreamingStats()
+        return self.series[name]
+
+    def append(self, timestamp, values):
+        """追加一个采样周期的数据，values为 {序列名: 数值}"""
+        self.append_ns(self.to_ns(timestamp), values)
+
+    def append_ns(self, timestamp_ns, values):
+        for name, value in values.items():
+            self.add_series(name).append(timestamp_ns, value)
+            self.stats[name].add(value)
+            for sink in self.sinks:
+                sink.append(name, timestamp_ns, value)
+
+    def extend(self, name, timestamps_ns, values):
+        """批量追加单个序列的多个样本"""
+        self.add_series(name).extend(timestamps_ns, values)
+        stats = self.stats[name]
+        for value in values.tolist():
+            stats.add(value)
+        for sink in self.sinks:
+            sink.extend(name, timestamps_ns, values)
+
+    def __getitem__(self, name):
+        return self.series[name]
+
+    def __contains__(self, name):
+        return name in self.series
+
+    def __len__(self):
+        return len(self.series)
+
+    def __iter__(self):
+        return iter(self.series)
+
+    def keys(self):
+        return self.series.keys()
+
+    def items(self):
+        return self.series.items()
+
+    def values(self):
+        return self.series.values()
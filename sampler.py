@@ -0,0 +1,93 @@
+import time
+
+import psutil
+
+from collectors import create_collector, DEFAULT_MODE
+from process_metrics import read_metrics
+
+
+class ProcessSampler:
+    """进程内存采样引擎：每个采样周期只遍历一次进程表
+
+    per_pid=True时同时给出每个进程实例的内存（instance_values），实例按 (pid, 启动时间)
+    区分，PID被复用时不会与旧实例混在一起；metrics为启用的附加指标（见process_metrics）。
+    """
+
+    def __init__(self, proc_names, collector=None, per_pid=False, metrics=()):
+        self.proc_names = set(proc_names)
+        self.collector = collector or create_collector(DEFAULT_MODE)
+        self.per_pid = per_pid
+        self.metrics = tuple(metrics)
+        self.pid_index = {}  # {进程名: [pid, ...]}
+        self.procs = {}  # {pid: psutil.Process}，跨周期复用
+        self.last_scan_cost = 0.0  # 最近一次遍历进程表耗时（秒）
+        self.instances = {}  # {(pid, 启动时间): 实例序列名}
+        self.instance_info = {}  # {实例序列名: (进程名, pid, 启动时间)}
+        self.instance_values = {}  # 最近一次采样 {实例序列名: 字节}
+        self.metric_values = {}  # 最近一次采样 {指标: {进程名或实例序列名: 数值}}
+
+    def scan(self):
+        """遍历一次进程表，建立 进程名->PID 索引（只读取进程名）"""
+        start = time.perf_counter()
+        pid_index = {name: [] for name in self.proc_names}
+        procs = {}
+        # 只接收远程样本（没有本机进程）时不遍历进程表
+        for proc in psutil.process_iter(['name']) if pid_index else ():
+            name = proc.info['name']
+            if name in pid_index:
+                pid_index[name].append(proc.pid)
+                procs[proc.pid] = proc
+        self.pid_index = pid_index
+        self.procs = procs
+        self.last_scan_cost = time.perf_counter() - start
+        return pid_index
+
+    def sample(self):
+        """采样一次，返回 {进程名: 同名进程内存之和(字节)}"""
+        pid_index = self.scan()
+        values = self.collector.read(self.procs)
+        result = {}
+        for name, pids in pid_index.items():
+            result[name] = sum(values.get(pid, 0) for pid in pids)
+        if self.per_pid:
+            self.instance_values = {self._instance(name, pid): values[pid]
+                                    for name, pids in pid_index.items() for pid in pids if pid in values}
+        if self.metrics:
+            self.metric_values = self._read_metrics(pid_index)
+        return result
+
+    def _instance(self, name, pid):
+        """进程实例的序列名：进程名[pid]，PID被新进程复用时追加序号"""
+        try:
+            create_time = self.procs[pid].create_time()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            create_time = 0.0
+        key = (pid, create_time)
+        label = self.instances.get(key)
+        if label is None:
+            label = f"{name}[{pid}]"
+            reuse = 1
+            while label in self.instance_info:
+                reuse += 1
+                label = f"{name}[{pid}#{reuse}]"
+            self.instances[key] = label
+            self.instance_info[label] = (name, pid, create_time)
+        return label
+
+    def _read_metrics(self, pid_index):
+        """附加指标：同名进程求和，按PID细分时另给出每个实例的值"""
+        metric_values = {metric: {} for metric in self.metrics}
+        for name, pids in pid_index.items():
+            totals = dict.fromkeys(self.metrics, 0)
+            for pid in pids:
+                values = read_metrics(self.procs[pid], self.metrics)
+                for metric, value in values.items():
+                    totals[metric] += value
+                    if self.per_pid:
+                        metric_values[metric][self._instance(name, pid)] = value
+            for metric, total in totals.items():
+                metric_values[metric][name] = total
+        return metric_values
+
+    def close(self):
+        self.collector.close()
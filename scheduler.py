@@ -0,0 +1,83 @@
+import time
+
+from sample_store import SampleStore
+
+MIN_INTERVAL = 0.05  # 最小采样间隔（秒）
+TIMING_SERIES = ("period", "duration")  # 实际采样周期、单次采集耗时（ns）
+
+
+class TickScheduler:
+    """基于 time.monotonic() 截止时间的采样调度器
+
+    第k次采样的截止时间固定为 start + k*interval，与单次采集耗时无关，不会累积漂移。
+    采集耗时超过间隔时跳过已错过的截止时间（计入missed），而不是连续补采。
+    每个周期记录实际周期和采集耗时，用于界面和报告展示抖动。
+    """
+
+    def __init__(self, interval, sleep=time.sleep, clock=time.monotonic):
+        if interval < MIN_INTERVAL:
+            raise ValueError(f"采样间隔不能小于 {MIN_INTERVAL} 秒")
+        self.interval = interval
+        self.sleep = sleep  # sleep(秒)，返回True表示应提前结束（如收到停止信号）
+        self.clock = clock
+        self.timings = SampleStore(TIMING_SERIES)
+        self.missed = 0  # 错过的截止时间数
+        self.last_period = interval  # 本次与上次采样时刻的实际间隔（秒）
+
+    def ticks(self, duration, should_continue=lambda: True):
+        """迭代每个采样时刻；调用方在循环体内完成一次采集"""
+        start = self.clock()
+        end = start + duration
+        deadline = start
+        last_tick = None
+        while should_continue():
+            timeout = deadline - self.clock()
+            if timeout > 0 and self.sleep(timeout):
+                return
+            tick = self.clock()
+            if tick >= end or not should_continue():
+                return
+            self.last_period = tick - last_tick if last_tick is not None else self.interval
+            last_tick = tick
+            yield tick
+            finish = self.clock()
+            self.record(self.last_period, finish - tick)
+
+            deadline += self.interval
+            if finish > deadline:
+                skipped = int((finish - deadline) // self.interval) + 1
+                self.missed += skipped
+                deadline += skipped * self.interval
+
+    def record(self, period, duration):
+        self.timings.append_ns(time.time_ns(), {"period": int(period * 1e9), "duration": int(duration * 1e9)})
+
+    def jitter_summary(self):
+        """抖动统计（毫秒）：周期均值/标准差/最大偏差、采集耗时均值/最大值、错过次数"""
+        return summarize_timings(self.timings, self.interval, self.missed)
+
+
+def summarize_timings(timings, interval, missed):
+    period = timings.stats["period"]
+    duration = timings.stats["duration"]
+    if not period.count:
+        return None
+    interval_ms = interval * 1000
+    return {
+        "ticks": period.count,
+        "missed": missed,
+        "interval_ms": interval_ms,
+        "period_avg_ms": period.mean / 1e6,
+        "period_std_ms": period.std / 1e6,
+        "period_max_dev_ms": max(abs(period.max / 1e6 - interval_ms), abs(period.min / 1e6 - interval_ms)),
+        "duration_avg_ms": duration.mean / 1e6,
+        "duration_max_ms": duration.max / 1e6,
+    }
+
+
+def format_jitter(summary):
+    """状态栏显示用的简短抖动信息"""
+    if not summary:
+        return ""
+    return (f"周期 {summary['period_avg_ms']:.1f}±{summary['period_std_ms']:.1f} ms，"
+            f"采集 {summary['duration_avg_ms']:.1f} ms，错过 {summary['missed']}")
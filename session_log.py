@@ -0,0 +1,208 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from downsample import minmax_downsample
+from sample_store import SampleStore
+from stats import StreamingStats
+
+SESSION_SUFFIX = ".db"
+FLUSH_INTERVAL = 5.0  # 缓冲样本写入文件的间隔（秒）
+CHECKPOINT_INTERVAL = 60.0  # WAL检查点（落盘fsync）间隔（秒）
+LOAD_MAX_POINTS = 200000  # 打开会话时每个序列最多载入的点数，超过则按最小/最大值降采样
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS series (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS chunks (
+    series_id INTEGER, t0 INTEGER, t1 INTEGER, n INTEGER, ts BLOB, vals BLOB
+);
+CREATE INDEX IF NOT EXISTS chunks_series_t0 ON chunks (series_id, t0);
+"""
+
+
+def session_path(save_path, start_time, label=None):
+    """会话文件路径；带会话标签或同一秒内已有同名文件时追加后缀，多个会话互不覆盖"""
+    stem = f"监控会话_{start_time:%Y%m%d_%H%M%S}" + (f"_{label}" if label else "")
+    path = os.path.join(save_path, stem + SESSION_SUFFIX)
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(save_path, f"{stem}_{n}{SESSION_SUFFIX}")
+    return path
+
+
+class SessionWriter:
+    """会话文件写入：SQLite WAL模式，样本按序列缓冲后以int64数组块(BLOB)追加
+
+    - 每FLUSH_INTERVAL秒提交一次（进程崩溃最多丢失这段时间的数据）
+    - 每CHECKPOINT_INTERVAL秒做一次WAL检查点，数据fsync到主文件
+    可作为SampleStore的sink，append/extend接口与SampleStore一致。
+    """
+
+    def __init__(self, path, meta=None, flush_interval=FLUSH_INTERVAL, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._series_ids = {}
+        self._buffers = {}  # {序列名: ([时间戳], [数值])}
+        self._last_flush = self._last_checkpoint = time.monotonic()
+        self.set_meta(status="running", started=time.time(), **(meta or {}))
+
+    def set_meta(self, **items):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False)) for key, value in items.items()])
+            self._conn.commit()
+
+    def _series_id(self, name):
+        series_id = self._series_ids.get(name)
+        if series_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO series (name) VALUES (?)", (name,))
+            series_id = self._conn.execute("SELECT id FROM series WHERE name = ?", (name,)).fetchone()[0]
+            self._series_ids[name] = series_id
+        return series_id
+
+    def append(self, name, timestamp_ns, value):
+        with self._lock:
+            timestamps, values = self._buffers.setdefault(name, ([], []))
+            timestamps.append(timestamp_ns)
+            values.append(value)
+        self._maybe_flush()
+
+    def extend(self, name, timestamps_ns, values):
+        with self._lock:
+            timestamps, buffered = self._buffers.setdefault(name, ([], []))
+            timestamps.extend(np.asarray(timestamps_ns).tolist())
+            buffered.extend(np.asarray(values).tolist())
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows = []
+            for name, (timestamps, values) in self._buffers.items():
+                if not timestamps:
+                    continue
+                rows.append((self._series_id(name), timestamps[0], timestamps[-1], len(timestamps),
+                             np.asarray(timestamps, dtype=np.int64).tobytes(),
+                             np.asarray(values, dtype=np.int64).tobytes()))
+            self._buffers = {}
+            if rows:
+                self._conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+            now = time.monotonic()
+            self._last_flush = now
+            if now - self._last_checkpoint >= self.checkpoint_interval:
+                self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                self._last_checkpoint = now
+
+    def close(self):
+        self.flush()
+        self.set_meta(status="complete", finished=time.time())
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
+
+
+class SessionReader:
+    """按需读取会话文件（包括未正常结束的会话），不会一次载入全部数据"""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self.meta = {key: json.loads(value) for key, value in self._conn.execute("SELECT key, value FROM meta")}
+        self.series_ids = dict(self._conn.execute("SELECT name, id FROM series ORDER BY id"))
+
+    @property
+    def crashed(self):
+        """监控未正常结束（程序崩溃或被强制关闭）"""
+        return self.meta.get("status") != "complete"
+
+    def names(self):
+        return list(self.series_ids)
+
+    def count(self, name):
+        row = self._conn.execute("SELECT COALESCE(SUM(n), 0) FROM chunks WHERE series_id = ?",
+                                 (self.series_ids[name],)).fetchone()
+        return row[0]
+
+    def iter_chunks(self, name, start=None, end=None):
+        """按时间顺序逐块返回 (时间戳数组, 数值数组)，可限定时间范围[start, end]（ns）"""
+        query = "SELECT ts, vals FROM chunks WHERE series_id = ?"
+        params = [self.series_ids[name]]
+        if start is not None:
+            query += " AND t1 >= ?"
+            params.append(int(start))
+        if end is not None:
+            query += " AND t0 <= ?"
+            params.append(int(end))
+        for ts_blob, vals_blob in self._conn.execute(query + " ORDER BY t0", params):
+            timestamps = np.frombuffer(ts_blob, dtype=np.int64)
+            values = np.frombuffer(vals_blob, dtype=np.int64)
+            if start is not None or end is not None:
+                lo = np.searchsorted(timestamps, start) if start is not None else 0
+                hi = np.searchsorted(timestamps, end, side="right") if end is not None else len(timestamps)
+                timestamps, values = timestamps[lo:hi], values[lo:hi]
+            yield timestamps, values
+
+    def read(self, name, start=None, end=None):
+        """读取某序列（可限定时间范围）的全部样本"""
+        chunks = list(self.iter_chunks(name, start, end))
+        if not chunks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return (np.concatenate([ts for ts, _ in chunks]),
+                np.concatenate([values for _, values in chunks]))
+
+    def to_store(self, max_points=LOAD_MAX_POINTS, sinks=()):
+        """逐块载入为SampleStore：统计基于全部样本，超过max_points的序列按最小/最大值降采样
+
+        sinks（如LeakMonitor）在降采样前收到全部样本。
+        """
+        store = SampleStore()
+        for name in self.names():
+            total = self.count(name)
+            factor = max(1, -(-total // max_points)) if max_points else 1
+            series = store.add_series(name)
+            stats = StreamingStats()
+            block_size = factor * 2048  # 攒够一批再降采样，避免小块无法压缩
+            pending = []
+            pending_size = 0
+            for timestamps, values in self.iter_chunks(name):
+                for value in values.tolist():
+                    stats.add(value)
+                for sink in sinks:
+                    sink.extend(name, timestamps, values)
+                pending.append((timestamps, values))
+                pending_size += len(values)
+                if pending_size >= block_size:
+                    self._extend_block(series, pending, factor)
+                    pending, pending_size = [], 0
+            if pending:
+                self._extend_block(series, pending, factor)
+            store.stats[name] = stats
+        return store
+
+    @staticmethod
+    def _extend_block(series, chunks, factor):
+        timestamps = np.concatenate([ts for ts, _ in chunks])
+        values = np.concatenate([vals for _, vals in chunks])
+        if factor > 1:
+            timestamps, values = minmax_downsample(timestamps, values, max(1, len(values) // (2 * factor)))
+        series.extend(timestamps, values)
+
+    def close(self):
+        self._conn.close()
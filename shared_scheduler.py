@@ -0,0 +1,142 @@
+import math
+import threading
+import time
+from datetime import datetime
+
+from collectors import create_collector
+from profiler import STAGE_READ, STAGE_SCAN
+from sample_store import SampleStore
+from sampler import ProcessSampler
+from scheduler import TickScheduler
+
+TICK_MERGE_WINDOW = 0.005  # 截止时间相差不超过该值（秒）的采样合并为一次进程表遍历
+
+
+class _Subscription:
+    """一个会话在共享调度器中的调度状态；timing只用于记录该会话自己的周期抖动"""
+
+    def __init__(self, engine, start):
+        self.engine = engine
+        self.timing = TickScheduler(engine.interval)
+        self.deadline = start
+        self.end = start + engine.duration
+        self.last_tick = None
+
+
+class SharedScheduler:
+    """多个监控会话（MonitorEngine，线程模式）共用的采样线程
+
+    每个会话有自己的进程、间隔和时长，截止时间各自按 start + k*interval 计算。到期时刻相同
+    （相差不超过TICK_MERGE_WINDOW）的会话合并为一次采样：同一采集方式只遍历一次进程表，
+    读取各会话进程的并集，再由各会话取自己的部分。新会话的首次采样对齐到已有会话最近的
+    采样时刻，间隔成倍数关系的会话（如1秒和60秒）此后每次都能合并。
+    没有会话时线程退出，加入新会话时重新启动。
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._subscriptions = []
+        self._samplers = {}  # {采集方式: ProcessSampler}，跨周期复用
+        self._thread = None
+        self.scans = 0  # 实际采样（进程表遍历）次数
+        self.ticks = 0  # 各会话的采样次数之和
+
+    def add(self, engine):
+        """加入会话，返回该会话的TickScheduler（只用于抖动统计，调度由本对象完成）"""
+        with self._lock:
+            subscription = _Subscription(engine, self._first_deadline(engine.interval))
+            self._subscriptions.append(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return subscription.timing
+
+    def _first_deadline(self, interval):
+        """新会话的首次采样时刻：取已有会话网格上（d + k*间隔）不早于现在的最近时刻，
+        再按新会话的间隔前移到不早于现在，使新会话的网格包含该时刻
+
+        已有会话正在采样时其截止时间可能已过，不能直接截断为现在，否则新会话此后一直错开。
+        """
+        now = self.clock()
+        grid = []
+        for sub in self._subscriptions:
+            deadline, step = sub.deadline, sub.engine.interval
+            if deadline < now:
+                deadline += math.ceil((now - deadline) / step) * step
+            grid.append(deadline)
+        if not grid:
+            return now
+        return now + (min(grid) - now) % interval
+
+    def wake(self):
+        """会话请求停止时唤醒调度线程，及时收尾（可在信号处理函数中调用）"""
+        self._wake.set()
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                now = self.clock()
+                finished = [sub for sub in self._subscriptions if not sub.engine.monitoring or now >= sub.end]
+                for sub in finished:
+                    self._subscriptions.remove(sub)
+                subscriptions = list(self._subscriptions)
+                if not subscriptions:
+                    self._thread = None
+                    samplers, self._samplers = self._samplers, {}
+            for sub in finished:
+                sub.engine._finish()
+            if not subscriptions:
+                for sampler in samplers.values():
+                    sampler.close()
+                return
+
+            timeout = min(sub.deadline for sub in subscriptions) - self.clock()
+            if timeout > 0 and self._wake.wait(timeout):
+                self._wake.clear()  # 有会话加入或停止，重新计算
+                continue
+            tick = self.clock()
+            due = [sub for sub in subscriptions if sub.deadline <= tick + TICK_MERGE_WINDOW and tick < sub.end]
+            groups = {}
+            for sub in due:
+                groups.setdefault(sub.engine.collector_mode, []).append(sub)
+            for mode, group in groups.items():
+                self._sample(mode, group, tick)
+
+    def _sample(self, mode, group, tick):
+        sampler = self._samplers.get(mode)
+        if sampler is None:
+            sampler = self._samplers[mode] = ProcessSampler((), create_collector(mode))
+        sampler.proc_names = {name for sub in group for name in sub.engine.names}
+        sampler.per_pid = any(sub.engine.per_pid for sub in group)
+        sampler.metrics = tuple({metric: None for sub in group for metric in sub.engine.metrics})
+        start = self.clock()
+        values = sampler.sample()
+        collect_cost = self.clock() - start
+        timestamp_ns = SampleStore.to_ns(datetime.now())
+        self.scans += 1
+        self.ticks += len(group)
+        # 合并的一次采样只计一次扫描、读取耗时（多个会话共用同一profiler时不重复计数）
+        scan_cost = sampler.last_scan_cost
+        for profiler in {sub.engine.profiler for sub in group} - {None}:
+            profiler.record(STAGE_SCAN, scan_cost)
+            profiler.record(STAGE_READ, max(collect_cost - scan_cost, 0.0))
+        for sub in group:
+            sub.engine._record(timestamp_ns, values, sampler, collect_cost)
+        finish = self.clock()
+        for sub in group:
+            interval = sub.engine.interval
+            period = tick - sub.last_tick if sub.last_tick is not None else interval
+            sub.last_tick = tick
+            sub.timing.last_period = period
+            sub.timing.record(period, finish - tick)
+            sub.deadline += interval
+            if finish > sub.deadline:
+                skipped = int((finish - sub.deadline) // interval) + 1
+                sub.timing.missed += skipped
+                sub.deadline += skipped * interval
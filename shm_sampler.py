@@ -0,0 +1,233 @@
+import multiprocessing as mp
+import time
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from collectors import create_collector
+from sample_store import SampleStore
+from sampler import ProcessSampler
+from scheduler import TickScheduler, TIMING_SERIES, summarize_timings
+
+MAX_SERIES = 64  # 共享内存中预留的序列槽位数
+RING_CAPACITY = 65536  # 环形缓冲区行数（每行一个采样周期）
+# 头部字段：已写入行数、最近一次遍历进程表耗时(ns)、最近一次采集耗时(ns)、错过的截止时间数
+HEADER_COUNT, HEADER_SCAN_NS, HEADER_COLLECT_NS, HEADER_MISSED = 0, 1, 2, 3
+HEADER_SIZE = 4
+ROW_TIMINGS = 3  # 每行的时序字段：实际采样周期(ns)、采集耗时(ns)、槽位配置版本
+
+
+class SharedRing:
+    """共享内存环形缓冲区：单写（采样进程）单读（UI进程）
+
+    布局：int64头部 | int64时间戳[capacity] | int64数值[capacity, max_series] | int64时序[capacity, 3]
+    时序为每行的实际采样周期、采集耗时(ns)和采样时生效的槽位配置版本。未采集的槽位写入-1。
+    写入方先写数据再递增行数，读取方只读行数以内的数据。
+    """
+
+    def __init__(self, capacity=RING_CAPACITY, max_series=MAX_SERIES, name=None, create=False):
+        self.capacity = capacity
+        self.max_series = max_series
+        size = 8 * (HEADER_SIZE + capacity + capacity * max_series + capacity * ROW_TIMINGS)
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        buf = self.shm.buf
+        self.header = np.ndarray((HEADER_SIZE,), dtype=np.int64, buffer=buf)
+        self.timestamps = np.ndarray((capacity,), dtype=np.int64, buffer=buf, offset=8 * HEADER_SIZE)
+        self.values = np.ndarray((capacity, max_series), dtype=np.int64, buffer=buf,
+                                 offset=8 * (HEADER_SIZE + capacity))
+        self.timings = np.ndarray((capacity, ROW_TIMINGS), dtype=np.int64, buffer=buf,
+                                  offset=8 * (HEADER_SIZE + capacity + capacity * max_series))
+        if create:
+            self.header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def count(self):
+        return int(self.header[HEADER_COUNT])
+
+    def write(self, timestamp_ns, slot_values, period_ns=0, duration_ns=0, version=0):
+        """写入一行，slot_values为 {槽位: 数值}"""
+        n = self.count
+        pos = n % self.capacity
+        row = self.values[pos]
+        row[:] = -1
+        for slot, value in slot_values.items():
+            row[slot] = value
+        self.timings[pos] = (period_ns, duration_ns, version)
+        self.timestamps[pos] = timestamp_ns
+        self.header[HEADER_COUNT] = n + 1
+
+    def read_since(self, start):
+        """读取start之后写入的行，返回 (新的读取位置, [(时间戳视图, 数值视图, 时序视图), ...], 丢失行数)
+
+        返回的是共享内存上的零拷贝视图，回绕处拆成两段。
+        """
+        count = self.count
+        lost = 0
+        if count - start > self.capacity:
+            lost = count - self.capacity - start
+            start = count - self.capacity
+        chunks = []
+        while start < count:
+            pos = start % self.capacity
+            end = min(count, start + self.capacity - pos)
+            rows = slice(pos, pos + end - start)
+            chunks.append((self.timestamps[rows], self.values[rows], self.timings[rows]))
+            start = end
+        return count, chunks, lost
+
+    def close(self):
+        # 释放对共享内存的numpy引用后才能关闭
+        self.header = self.timestamps = self.values = self.timings = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _sampler_main(shm_name, capacity, max_series, conn, slots, duration, interval, collector_mode):
+    """采样子进程入口：按截止时间调度采样写入共享内存，采样间隙处理控制命令"""
+    ring = SharedRing(capacity, max_series, name=shm_name)
+    slots = dict(slots)  # {进程名: 槽位}
+    sampler = ProcessSampler(slots.keys(), create_collector(collector_mode))
+    version = 0  # 已生效的add/remove命令的版本号，随每行写入
+
+    def wait(timeout):
+        """等待至下一个采样时刻，期间处理控制命令；收到stop返回True"""
+        nonlocal version
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not conn.poll(remaining):
+                return False
+            command, *args = conn.recv()
+            if command == "stop":
+                return True
+            if command == "add":
+                name, slot, version = args
+                slots[name] = slot
+                sampler.proc_names.add(name)
+            elif command == "remove":
+                name, version = args
+                slots.pop(name, None)
+                sampler.proc_names.discard(name)
+
+    scheduler = TickScheduler(interval, sleep=wait)
+    try:
+        for tick in scheduler.ticks(duration):
+            timestamp = datetime.now()
+            values = sampler.sample()
+            ring.header[HEADER_SCAN_NS] = int(sampler.last_scan_cost * 1e9)
+            ring.header[HEADER_COLLECT_NS] = int(sampler.collector.last_cost * 1e9)
+            ring.header[HEADER_MISSED] = scheduler.missed
+            ring.write(SampleStore.to_ns(timestamp), {slots[name]: value for name, value in values.items()},
+                       int(scheduler.last_period * 1e9), int((time.monotonic() - tick) * 1e9), version)
+    finally:
+        sampler.close()
+        ring.close()
+        conn.close()
+
+
+class SamplerProcess:
+    """在独立子进程中运行采样引擎，UI通过共享内存读取样本、通过管道发送控制命令
+
+    采样不再与Tk主循环/matplotlib绘图/报告生成争抢GIL。子进程用spawn启动：
+    Tk进程是多线程的，fork出的子进程可能继承被其他线程持有的锁。
+    槽位释放后可立即复用：每次add/remove递增配置版本，子进程随每行写入已生效的版本，
+    drain()只把不早于分配版本的行计入新进程名，子进程尚未处理remove时写入的旧数据被丢弃。
+    """
+
+    def __init__(self, proc_names, duration, interval, collector_mode,
+                 capacity=RING_CAPACITY, max_series=MAX_SERIES):
+        self.slots = {name: i for i, name in enumerate(proc_names)}
+        if len(self.slots) > max_series:
+            raise ValueError(f"最多支持 {max_series} 个监控进程")
+        self.max_series = max_series
+        self.ring = SharedRing(capacity, max_series, create=True)
+        ctx = mp.get_context("spawn")
+        self._conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_sampler_main,
+            args=(self.ring.name, capacity, max_series, child_conn, self.slots,
+                  duration, interval, collector_mode),
+            daemon=True
+        )
+        self._version = 0  # 最近发送的add/remove命令的版本号
+        self._since = {}  # {进程名: 分配槽位时的版本号}，初始进程为0
+        self._read_pos = 0
+        self.lost = 0  # UI读取不及时被覆盖的行数
+        # 与TickScheduler一致的时序记录接口，供界面/报告展示抖动
+        self.interval = interval
+        self.timings = SampleStore(TIMING_SERIES)
+        self.missed = 0
+
+    def start(self):
+        self.process.start()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def _send(self, *command):
+        try:
+            self._conn.send(command)
+        except (BrokenPipeError, OSError):
+            pass
+
+    def add(self, name):
+        if name in self.slots:
+            return
+        used = set(self.slots.values())
+        slot = next((i for i in range(self.max_series) if i not in used), None)
+        if slot is None:
+            raise ValueError(f"最多支持 {self.max_series} 个监控进程")
+        self._version += 1
+        self.slots[name] = slot
+        self._since[name] = self._version
+        self._send("add", name, slot, self._version)
+
+    def remove(self, name):
+        if self.slots.pop(name, None) is not None:
+            self._since.pop(name, None)
+            self._version += 1
+            self._send("remove", name, self._version)
+
+    def stop(self, timeout=5):
+        self._send("stop")
+        self.process.join(timeout)
+
+    def jitter_summary(self):
+        return summarize_timings(self.timings, self.interval, self.missed)
+
+    def costs(self):
+        """最近一次 (遍历进程表耗时, 采集耗时)，单位秒"""
+        header = self.ring.header
+        return header[HEADER_SCAN_NS] / 1e9, header[HEADER_COLLECT_NS] / 1e9
+
+    def drain(self, store):
+        """把新写入的样本追加到store，返回新增行数"""
+        self._read_pos, chunks, lost = self.ring.read_since(self._read_pos)
+        self.lost += lost
+        self.missed = int(self.ring.header[HEADER_MISSED])
+        rows = 0
+        for timestamps, values, timings in chunks:
+            rows += len(timestamps)
+            for i, name in enumerate(TIMING_SERIES):
+                self.timings.extend(name, timestamps, timings[:, i])
+            versions = timings[:, len(TIMING_SERIES)]
+            for name, slot in list(self.slots.items()):
+                column = values[:, slot]
+                valid = (column >= 0) & (versions >= self._since.get(name, 0))
+                if valid.any():
+                    store.extend(name, timestamps[valid], column[valid])
+        return rows
+
+    def close(self):
+        if self.process.is_alive():
+            self.stop()
+        self._conn.close()
+        self.ring.close()
+        self.ring.unlink()
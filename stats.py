@@ -0,0 +1,107 @@
+import math
+
+PERCENTILES = (0.5, 0.95, 0.99)
+BYTES_PER_MB = 1024 * 1024  # 内存统计、图表和报告统一以MB显示
+
+
+class P2Quantile:
+    """P²算法流式分位数估计（Jain & Chlamtac），固定5个标记点，O(1)内存和时间"""
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q = self.heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # 调整中间3个标记点的高度
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = self._parabolic(i, d)
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def value(self):
+        q = self.heights
+        if not q:
+            return 0.0
+        if len(q) < 5:
+            return q[min(len(q) - 1, int(round(self.p * (len(q) - 1))))]
+        return q[2]
+
+
+class StreamingStats:
+    """单序列的增量统计：Welford均值/方差、最大/最小值、P²分位数，每个样本O(1)"""
+
+    def __init__(self, percentiles=PERCENTILES):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.quantiles = {p: P2Quantile(p) for p in percentiles}
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+        for quantile in self.quantiles.values():
+            quantile.add(x)
+
+    @property
+    def variance(self):
+        """样本方差（ddof=1）"""
+        return self._m2 / (self.count - 1) if self.count >= 2 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def percentile(self, p):
+        return self.quantiles[p].value()
+
+    def summary(self, scale=1.0, ndigits=2):
+        """返回 [最大值, 最小值, 平均值, 3σ值, p50, p95, p99]，按scale换算单位并保留ndigits位小数"""
+        if not self.count:
+            return [0] * (4 + len(self.quantiles))
+        values = [self.max, self.min, self.mean, 3 * self.std]
+        values += [q.value() for q in self.quantiles.values()]
+        return [round(v / scale, ndigits) for v in values]
@@ -0,0 +1,59 @@
+import numpy as np
+
+from leak_detector import VERDICT_LEAK, VERDICT_OK, VERDICT_STEP, LeakMonitor
+from stats import BYTES_PER_MB
+
+NS_PER_SECOND = 10 ** 9
+HOURS = 2
+
+
+def _monitor(curve, step_seconds=1, noise_mb=0.3):
+    """按curve(秒)->MB生成HOURS小时的带噪声序列，逐个样本送入LeakMonitor"""
+    monitor = LeakMonitor()
+    rng = np.random.default_rng(1)
+    seconds = np.arange(0, HOURS * 3600, step_seconds)
+    values = np.array([curve(t) for t in seconds]) + rng.normal(0, noise_mb, len(seconds))
+    monitor.extend("app.exe", seconds * NS_PER_SECOND, (values * BYTES_PER_MB).astype(np.int64))
+    return monitor
+
+
+def _messages(monitor):
+    return [message for _, message in monitor.alerts]
+
+
+def test_flat_never_alerts():
+    monitor = _monitor(lambda t: 200.0, step_seconds=5)
+    assert monitor.verdict("app.exe") == VERDICT_OK
+    assert monitor.alerts == []
+
+
+def test_leak_alerts_once():
+    monitor = _monitor(lambda t: 200.0 + 20.0 * t / 3600, step_seconds=5)
+    assert monitor.verdict("app.exe") == VERDICT_LEAK
+    assert monitor.leaking() == ["app.exe"]
+    messages = _messages(monitor)
+    assert len(messages) == 1 and "疑似内存泄漏" in messages[0]
+
+
+def test_step_is_not_a_leak():
+    monitor = _monitor(lambda t: 200.0 + (50.0 if t > 1800 else 0.0), step_seconds=5)
+    assert monitor.verdict("app.exe") == VERDICT_STEP
+    messages = _messages(monitor)
+    assert len(messages) == 1 and "阶跃" in messages[0]
+
+
+def test_short_sawtooth_never_alerts():
+    # 每2分钟回收一次的锯齿：上升段短于告警所需的持续时间
+    monitor = _monitor(lambda t: 200.0 + 60.0 * (t % 120) / 120)
+    assert monitor.verdict("app.exe") == VERDICT_OK
+    assert monitor.alerts == []
+
+
+def test_long_sawtooth_alert_retracted():
+    # 每10分钟回收一次：首个上升段持续足够久会告警，回收后斜率回落，告警撤销
+    monitor = _monitor(lambda t: 200.0 + 60.0 * (t % 600) / 600, step_seconds=5)
+    assert monitor.verdict("app.exe") == VERDICT_OK
+    assert monitor.leaking() == []
+    messages = _messages(monitor)
+    assert len(messages) == 2
+    assert "疑似内存泄漏" in messages[0] and "撤销" in messages[1]
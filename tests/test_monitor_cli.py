@@ -0,0 +1,26 @@
+import sqlite3
+
+import monitor_cli
+import monitor_engine
+from session_log import SessionReader
+
+
+def test_started_sessions_closed_when_later_session_fails(tmp_path, monkeypatch):
+    created = []
+    session_writer = monitor_engine.SessionWriter
+
+    def failing_second_writer(path, meta=None):
+        if created:
+            raise sqlite3.OperationalError("disk I/O error")
+        created.append(path)
+        return session_writer(path, meta=meta)
+
+    monkeypatch.setattr(monitor_engine, "SessionWriter", failing_second_writer)
+    code = monitor_cli.main(["absent.exe", "-d", "60", "-i", "0.1", "-o", str(tmp_path), "-q",
+                             "--add-session", "other.exe", "1", "60", "--no-index", "--no-report"])
+    assert code == monitor_cli.EXIT_IO_ERROR
+    reader = SessionReader(created[0])
+    try:
+        assert not reader.crashed  # 第一个会话已正常收尾，不会显示为未正常结束
+    finally:
+        reader.close()
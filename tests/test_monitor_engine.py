@@ -0,0 +1,31 @@
+from monitor_engine import MonitorEngine
+from process_metrics import METRIC_THREADS
+
+
+class _Collector:
+    backend = "fake"
+    metric = "rss"
+
+
+class _MergedSampler:
+    """共享调度器的合并采样结果：本会话的a和另一个按PID细分的会话的b"""
+
+    collector = _Collector()
+    last_scan_cost = 0.0
+    instance_info = {"a[1]": ("a", 1, 0.0), "b[2]": ("b", 2, 0.0)}
+    instance_values = {"a[1]": 100, "b[2]": 200}
+    metric_values = {METRIC_THREADS: {"a": 3, "b": 4, "a[1]": 3, "b[2]": 4}}
+
+
+def test_shared_record_keeps_only_own_series():
+    engine = MonitorEngine(["a"], 10, 1.0, session=False, metrics=[METRIC_THREADS])
+    engine._record(1, {"a": 100, "b": 200}, _MergedSampler(), collect_cost=0.0)
+    assert list(engine.store) == ["a"]
+    assert list(engine.metrics[METRIC_THREADS]) == ["a"]  # 本会话未按PID细分，不记录任何实例
+
+
+def test_shared_record_per_pid_keeps_own_instances():
+    engine = MonitorEngine(["a"], 10, 1.0, session=False, per_pid=True, metrics=[METRIC_THREADS])
+    engine._record(1, {"a": 100, "b": 200}, _MergedSampler(), collect_cost=0.0)
+    assert list(engine.instances) == ["a[1]"]
+    assert sorted(engine.metrics[METRIC_THREADS]) == ["a", "a[1]"]
@@ -0,0 +1,91 @@
+import io
+import socket
+import threading
+
+import numpy as np
+
+from remote_collector import RemoteCollector
+from remote_protocol import MSG_ACK, encode_batch, read_message, unpack_ack
+from sample_store import SampleStore
+
+
+def _payload(seq, rows=3):
+    timestamps = np.arange(rows, dtype=np.int64) * 1_000_000_000
+    values = np.full((rows, 1), 1024 * 1024, dtype=np.int64)
+    return read_message(io.BytesIO(encode_batch(seq, timestamps, values)))[1]
+
+
+def _hello(agent_id="a"):
+    return {"agent_id": agent_id, "host": "node", "names": ["server"], "interval": 1.0, "clock_ns": 0}
+
+
+def _acks(sock):
+    """读取socket中已到达的全部ACK"""
+    sock.settimeout(0.2)
+    data = b""
+    try:
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+    except socket.timeout:
+        pass
+    stream = io.BytesIO(data)
+    acks = []
+    message = read_message(stream)
+    while message is not None:
+        assert message[0] == MSG_ACK
+        acks.append(unpack_ack(message[1]))
+        message = read_message(stream)
+    return acks
+
+
+def test_duplicate_batch_from_overlapping_connections_queued_once():
+    collector = RemoteCollector("127.0.0.1", 0, queue_size=1)
+    try:
+        agent = collector._connect(_hello())
+        collector._connect(_hello())  # 重连时旧连接尚未断开
+        assert collector._receive(agent, _payload(1))
+        assert collector.queue.full()
+        blocked = threading.Thread(target=collector._receive, args=(agent, _payload(2)))
+        blocked.start()
+        # 另一个连接重发同一批：等前一个连接放入队列后发现序号已入队，不再重复放入
+        duplicate = threading.Thread(target=collector._receive, args=(agent, _payload(2)))
+        duplicate.start()
+        duplicate.join(0.2)
+        assert blocked.is_alive() and duplicate.is_alive()  # 队列满，未drain前都不会返回
+        store = SampleStore()
+        rows = 0
+        while blocked.is_alive() or duplicate.is_alive():
+            rows += collector.drain(store)
+            blocked.join(0.05)
+            duplicate.join(0.05)
+        rows += collector.drain(store)
+        assert rows == 6
+        assert len(store["node:server"]) == 6
+        assert collector.queue.empty()
+    finally:
+        collector.close()
+
+
+def test_ack_sent_only_after_batch_written():
+    collector = RemoteCollector("127.0.0.1", 0)
+    local, remote = socket.socketpair()
+    try:
+        agent = collector._connect(_hello())
+        agent.connection = local
+        assert collector._receive(agent, _payload(1))
+        assert collector._receive(agent, _payload(2))
+        assert _acks(remote) == []  # 已入队但未写入存储，不确认
+        assert agent.last_seq == 0
+        store = SampleStore()
+        assert collector.drain(store) == 6
+        assert agent.last_seq == 2
+        assert _acks(remote) == [2]  # 一次drain只发送一个累计确认
+        assert collector._receive(agent, _payload(2))  # 重发已写入的批：不入队
+        assert collector.drain(store) == 0
+    finally:
+        collector.close()
+        local.close()
+        remote.close()
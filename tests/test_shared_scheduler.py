@@ -0,0 +1,88 @@
+import threading
+import time
+
+import shared_scheduler
+from profiler import STAGE_READ, STAGE_SCAN, StageProfiler
+from shared_scheduler import SharedScheduler
+
+SCAN_SECONDS = 0.03
+
+
+class _SlowSampler:
+    """代替ProcessSampler：每次采样耗时SCAN_SECONDS，开始采样时置位scanning"""
+
+    scanning = threading.Event()
+
+    def __init__(self, proc_names, collector=None):
+        self.proc_names = set(proc_names)
+        self.per_pid = False
+        self.metrics = ()
+        self.last_scan_cost = SCAN_SECONDS
+
+    def sample(self):
+        _SlowSampler.scanning.set()
+        time.sleep(SCAN_SECONDS)
+        return {name: 0 for name in self.proc_names}
+
+    def close(self):
+        pass
+
+
+class _Engine:
+    def __init__(self, interval, duration):
+        self.names = ["p"]
+        self.interval = interval
+        self.duration = duration
+        self.collector_mode = "fake"
+        self.per_pid = False
+        self.metrics = {}
+        self.monitoring = True
+        self.profiler = None
+        self.ticks = 0
+        self.done = threading.Event()
+
+    def _record(self, timestamp_ns, values, sampler, collect_cost=None):
+        self.ticks += 1
+
+    def _finish(self):
+        self.monitoring = False
+        self.done.set()
+
+
+def test_session_added_during_scan_joins_grid(monkeypatch):
+    monkeypatch.setattr(shared_scheduler, "ProcessSampler", _SlowSampler)
+    monkeypatch.setattr(shared_scheduler, "create_collector", lambda mode: None)
+    _SlowSampler.scanning.clear()
+    scheduler = SharedScheduler()
+    first = _Engine(0.1, 1.0)
+    second = _Engine(0.2, 0.8)
+    scheduler.add(first)
+    assert _SlowSampler.scanning.wait(1.0)
+    time.sleep(0.01)  # 第一个会话的采样进行中，截止时间已过
+    scheduler.add(second)
+    assert first.done.wait(3.0) and second.done.wait(3.0)
+    assert second.ticks >= 3
+    # 第二个会话的每次采样都与第一个会话合并
+    assert scheduler.ticks == first.ticks + second.ticks
+    assert scheduler.scans == first.ticks
+
+
+def test_first_session_starts_immediately():
+    scheduler = SharedScheduler(clock=lambda: 10.0)
+    assert scheduler._first_deadline(0.5) == 10.0
+
+
+def test_merged_scan_profiled_once(monkeypatch):
+    monkeypatch.setattr(shared_scheduler, "ProcessSampler", _SlowSampler)
+    monkeypatch.setattr(shared_scheduler, "create_collector", lambda mode: None)
+    scheduler = SharedScheduler()
+    profiler = StageProfiler()
+    engines = [_Engine(0.1, 0.5), _Engine(0.1, 0.5)]
+    for engine in engines:
+        engine.profiler = profiler  # 界面中多个会话共用同一个profiler
+        scheduler.add(engine)
+    assert all(engine.done.wait(3.0) for engine in engines)
+    assert scheduler.scans < scheduler.ticks
+    assert profiler.histograms[STAGE_SCAN].count == scheduler.scans
+    assert profiler.histograms[STAGE_READ].count == scheduler.scans
+
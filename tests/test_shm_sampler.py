@@ -0,0 +1,21 @@
+from collectors import DEFAULT_MODE
+from sample_store import SampleStore
+from shm_sampler import SamplerProcess
+
+
+def test_reused_slot_drops_rows_of_removed_name():
+    sampler = SamplerProcess(["a.exe", "b.exe"], 10, 1.0, DEFAULT_MODE)  # 不启动子进程，直接写入共享内存
+    try:
+        sampler.remove("a.exe")
+        sampler.add("c.exe")
+        assert sampler.slots["c.exe"] == 0  # 复用a.exe释放的槽位
+        ring = sampler.ring
+        ring.write(1, {0: 100, 1: 200}, version=0)  # 子进程尚未处理remove：槽位0仍是a.exe的数据
+        ring.write(2, {1: 201}, version=1)
+        ring.write(3, {0: 300, 1: 202}, version=2)
+        store = SampleStore()
+        assert sampler.drain(store) == 3
+        assert store["c.exe"].snapshot()[1].tolist() == [300]
+        assert store["b.exe"].snapshot()[1].tolist() == [200, 201, 202]
+    finally:
+        sampler.close()